@@ -10,10 +10,10 @@ setup(
         "flask",
         "flask-cors",
         "requests",
+        "aiohttp",
         "scikit-learn",
         "sentence_transformers",
         "python-dotenv",
-        "google-search-results",
     ],
     entry_points={
         "console_scripts": [
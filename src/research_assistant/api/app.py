@@ -1,12 +1,13 @@
 import os
 import sys
-from flask import Flask, request, jsonify, Blueprint
+from flask import Flask, Response, request, jsonify, Blueprint, stream_with_context
 from flask_cors import CORS
 import asyncio
 from typing import Dict, Any
 from functools import wraps
 import google.generativeai as genai
 from dotenv import load_dotenv
+import json
 import logging
 import time
 
@@ -18,8 +19,22 @@ logger = logging.getLogger(__name__)
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 # Import all necessary modules
-from research_assistant.retrieval.lit_review_engine import search_papers
-from research_assistant.ranking.paper_ranker import rank_papers_by_relevance
+from research_assistant.retrieval.lit_review_engine import (
+    search_papers, search_papers_many_async, search_papers_stream, register_paper_observer,
+)
+from research_assistant.retrieval.response_cache import get_response_cache
+from research_assistant.retrieval.identity import resolve_papers
+from research_assistant.ranking.paper_ranker import (
+    DEFAULT_WEIGHTS, RankingConfig, compute_ranking_scores, compute_ranking_scores_batch, materialize_ranking,
+    paper_text, prune_candidates, prune_candidates_batch, select_top_k,
+)
+from research_assistant.ranking.sessions import session_store, InvalidCursorError
+from research_assistant.ranking.model_registry import registry as model_registry
+from research_assistant.ranking.query_cache import get_query_cache
+from research_assistant.ranking.embedding_service import get_embedding_service, start_embedding_service
+from research_assistant.ranking.embedding_server import get_embedding_client, start_embedding_server
+from research_assistant.ranking.vector_index import index_papers, search_local_papers
+from research_assistant.ranking.lexical_model import get_lexical_model
 from research_assistant.draft.formatter import LaTeXFormatter
 from research_assistant.draft.templates import ResearchTemplates
 from research_assistant.draft.generator import ResearchDraftGenerator
@@ -374,33 +389,173 @@ async def refine_section(generator=None):
             'error': str(e)
         }), 500
 
+# Candidate sources of the search endpoints:
+#   "live"   retrieval backend: Semantic Scholar/Google Scholar, or the FTS5 paper
+#            corpus when RA_RETRIEVAL_BACKEND=local
+#   "index"  ANN index of the papers retrieved before (ranking/vector_index.py)
+#   "auto"   the index, going live when it does not cover the query
+SOURCES = ('live', 'index', 'auto')
+
+# Minimum cosine similarity for a paper from the paper index to count as a hit
+INDEX_MIN_SIMILARITY = float(os.getenv("RA_INDEX_MIN_SIMILARITY", "0.5"))
+
+def _observe_retrieved_papers(query, papers):
+    """Grow the paper index and the lexical statistics with every batch of retrieved papers."""
+    get_lexical_model().add_documents([paper_text(paper) for paper in papers])
+    index_papers(papers)
+
+def _index_candidates(query, source, max_results):
+    """Collect candidate papers from the paper index, if the source uses it."""
+    if source not in ('index', 'auto'):
+        return []
+    return [paper for paper in search_local_papers(query, k=2 * max_results)
+            if paper['ann_score'] >= INDEX_MIN_SIMILARITY]
+
+def _needs_live(source, index_results, max_results):
+    return source == 'live' or (source == 'auto' and len(index_results) < 2 * max_results)
+
+def _merge_live(index_results, live_results):
+    # Indexed and live copies of the same paper are merged into one candidate
+    return resolve_papers(index_results + live_results)
+
+def _retrieve_candidates(query, source, max_results):
+    """Collect candidate papers from the paper index and/or the live sources."""
+    results = _index_candidates(query, source, max_results)
+    if _needs_live(source, results, max_results):
+        results = _merge_live(results, search_papers(query, max_results=max_results))
+    return results
+
+def _retrieve_candidates_many(queries, source, max_results):
+    """Collect the candidates of several queries, querying the live sources for all of them concurrently."""
+    results = [_index_candidates(query, source, max_results) for query in queries]
+    live = [i for i, index_results in enumerate(results) if _needs_live(source, index_results, max_results)]
+    if live:
+        live_results = asyncio.run(search_papers_many_async([queries[i] for i in live], max_results=max_results))
+        for i, papers in zip(live, live_results):
+            results[i] = _merge_live(results[i], papers)
+    return results
+
+# Default lexical scorer and pruning depth of the ranking stage (0 disables pruning)
+LEXICAL_SCORER = os.getenv("RA_LEXICAL_SCORER", "tfidf")
+PRUNE_DEPTH = int(os.getenv("RA_PRUNE_DEPTH", "0"))
+
+# Upper bound on max_results, the number of results requested from every source
+MAX_RESULTS = int(os.getenv("RA_MAX_RESULTS", "20"))
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _parse_positive_int(data, name, default=None, maximum=None, allow_zero=False):
+    """Read an optional positive integer field from a request body, rejecting JSON booleans (allow_zero also accepts 0)."""
+    value = data.get(name, default)
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < (0 if allow_zero else 1):
+        raise ValueError(f"{name} must be a {'non-negative' if allow_zero else 'positive'} integer")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"{name} must be at most {maximum}")
+    return value
+
+def _parse_weights(data, default=DEFAULT_WEIGHTS):
+    """
+    Read {"similarity", "citation", "recency"} relevance weights from a request body.
+    Missing weights keep their default; the weights are then scaled to sum to 1 so
+    that relevance scores stay on the percentage scale the UI displays.
+    """
+    weights = data.get('weights')
+    if weights is None:
+        return default
+    if not isinstance(weights, dict):
+        raise ValueError("weights must be an object with similarity, citation and recency weights")
+    values = tuple(weights.get(name, value) for name, value in zip(('similarity', 'citation', 'recency'), default))
+    if not all(_is_number(value) and value >= 0 for value in values) or sum(values) == 0:
+        raise ValueError("weights must be non-negative numbers, not all zero")
+    total = sum(values)
+    return tuple(value / total for value in values)
+
+def _ranking_config(data):
+    """Build the ranking settings of a request, falling back to the server defaults."""
+    lexical_scorer = data.get('lexical_scorer', LEXICAL_SCORER)
+    if lexical_scorer not in ('tfidf', 'bm25'):
+        raise ValueError(f"Unknown lexical scorer: {lexical_scorer}")
+    prune_depth = _parse_positive_int(data, 'prune_depth', PRUNE_DEPTH, allow_zero=True)
+    similarity_weight, citation_weight, recency_weight = _parse_weights(data)
+    return RankingConfig(lexical_scorer=lexical_scorer, prune_depth=prune_depth or None,
+                         similarity_weight=similarity_weight, citation_weight=citation_weight,
+                         recency_weight=recency_weight)
+
+def _simplify_results(ranked_papers):
+    """Return only the fields needed for the results table."""
+    return [{
+        "title": paper.get("title", ""),
+        "authors": paper.get("authors", ""),
+        "year": paper.get("year", ""),
+        "venue": paper.get("venue", ""),
+        "link": paper.get("url", ""),
+        "score": round(paper.get("relevance_score", 0), 2)
+    } for paper in ranked_papers]
+
+def _session_page_response(session, offset, page_size):
+    """Serialize one page of a ranking session together with the cursor of the next page."""
+    page, next_cursor = session.page(offset, page_size)
+    return jsonify({
+        "results": _simplify_results(page),
+        "session_id": session.session_id,
+        "next_cursor": next_cursor,
+        "total": len(session.papers)
+    })
+
 # Search Blueprint routes
 @search_bp.route('', methods=['POST'])
 def search():
+    """
+    Search and rank papers for a query, or return a following page of an earlier search.
+
+    The "source" field selects where candidates come from (see SOURCES): "live" asks the
+    retrieval backend, "index" answers from the ANN index of papers retrieved before, and
+    "auto" uses the index and goes live when it does not cover the query. The retrieval
+    backend itself is chosen with RA_RETRIEVAL_BACKEND; its "local" value means the FTS5
+    paper corpus, which is reached through source "live", not through the index.
+    """
     data = request.json
     query = data.get('query', '')
+    source = data.get('source', 'live')
+    cursor = data.get('cursor')
+    
+    try:
+        max_results = _parse_positive_int(data, 'max_results', 3, maximum=MAX_RESULTS)
+        # Optional pagination: page_size limits the results, cursor fetches a following page
+        page_size = _parse_positive_int(data, 'page_size')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if cursor:
+        try:
+            session, offset = session_store.resolve(cursor)
+        except InvalidCursorError as e:
+            return jsonify({"error": str(e)}), 400
+        return _session_page_response(session, offset, page_size)
     
     if not query:
         return jsonify({"error": "No query provided"}), 400
+    if source not in SOURCES:
+        return jsonify({"error": f"Unknown source: {source}"}), 400
+    try:
+        config = _ranking_config(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     try:
-        # Use the existing functions
-        results = search_papers(query, max_results=3)
-        ranked_papers = rank_papers_by_relevance(papers=results, query=query)
+        results = _retrieve_candidates(query, source, max_results)
+        if not results:
+            return jsonify({"results": [], "session_id": None, "next_cursor": None, "total": 0})
         
-        # Return only the fields needed for the table
-        simplified_results = []
-        for paper in ranked_papers:
-            simplified_results.append({
-                "title": paper.get("title", ""),
-                "authors": paper.get("authors", ""),
-                "year": paper.get("year", ""),
-                "venue": paper.get("venue", ""),
-                "link": paper.get("url", ""),
-                "score": round(paper.get("relevance_score", 0), 2)
-            })
+        # Only the lexically best candidates are encoded when pruning is enabled
+        results, lexical_similarities = prune_candidates(results, query, config)
         
-        return jsonify({"results": simplified_results})
+        # Score the whole candidate pool once; pages are selected from the stored scores
+        scores = compute_ranking_scores(results, query, config=config, lexical_similarities=lexical_similarities)
+        session = session_store.create(query, results, scores)
+        return _session_page_response(session, 0, page_size)
     
     except Exception as e:
         import traceback
@@ -408,14 +563,223 @@ def search():
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
-def create_app():
-    """Create and configure the Flask application."""
+@search_bp.route('/rerank', methods=['POST'])
+def search_rerank():
+    """
+    Re-rank the papers of a previous search with new relevance weights.
+    The component scores stored with the search session are recombined, so
+    neither retrieval nor the encoder run again. The re-ranked results get a
+    session of their own for paging.
+    """
+    data = request.json
+    session_id = data.get('session_id')
+    semantic_weight = data.get('semantic_weight')
+
+    if not session_id:
+        return jsonify({"error": "No session_id provided"}), 400
+    if semantic_weight is not None and not (_is_number(semantic_weight) and 0 <= semantic_weight <= 1):
+        return jsonify({"error": "semantic_weight must be a number between 0 and 1"}), 400
+    try:
+        page_size = _parse_positive_int(data, 'page_size')
+        weights = _parse_weights(data)
+        session = session_store.get(session_id)
+        scores = session.scores.reweight(weights, semantic_weight)
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    reranked = session_store.create(session.query, session.papers, scores)
+    return _session_page_response(reranked, 0, page_size)
+
+# Minimum seconds between two provisional rankings sent by /api/search/stream
+STREAM_RANKING_INTERVAL = float(os.getenv("RA_STREAM_RANKING_INTERVAL", "0.25"))
+
+def _ndjson(event):
+    return json.dumps(event) + "\n"
+
+def _provisional_ranking(papers, query, config, page_size):
+    """Rank the papers found so far and return the top of the ordering."""
+    candidates, lexical_similarities = prune_candidates(papers, query, config)
+    scores = compute_ranking_scores(candidates, query, config=config, lexical_similarities=lexical_similarities)
+    return _simplify_results(materialize_ranking(candidates, scores, select_top_k(scores.relevance, page_size)))
+
+@search_bp.route('/stream', methods=['POST'])
+def search_stream():
+    """
+    Search like POST /api/search, streaming progress as newline-delimited JSON events:
+        {"event": "papers", "source": ..., "results": [...]}   new papers of a source, not ranked yet
+        {"event": "ranking", "results": [...], "total": n}      ranking of the papers found so far
+        {"event": "done", "results": [...], "session_id": ..., "next_cursor": ..., "total": n}
+        {"event": "error", "error": ...}
+    Papers from the paper index (source "index" or "auto") come first, with source "index".
+    Semantic Scholar hits are sent as soon as they arrive and each Google Scholar hit as
+    soon as its enrichment completes; the "done" event carries the final ranking and a
+    session that POST /api/search pages through like any other.
+    """
+    data = request.json
+    query = data.get('query', '')
+    source = data.get('source', 'live')
+
+    if not query:
+        return jsonify({"error": "No query provided"}), 400
+    if source not in SOURCES:
+        return jsonify({"error": f"Unknown source: {source}"}), 400
+    try:
+        max_results = _parse_positive_int(data, 'max_results', 3, maximum=MAX_RESULTS)
+        page_size = _parse_positive_int(data, 'page_size')
+        config = _ranking_config(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        try:
+            index_results = _index_candidates(query, source, max_results)
+            papers = list(index_results)
+            if papers:
+                yield _ndjson({"event": "papers", "source": "index", "results": _simplify_results(papers)})
+                yield _ndjson({"event": "ranking", "results": _provisional_ranking(papers, query, config, page_size),
+                               "total": len(papers)})
+            if _needs_live(source, index_results, max_results):
+                last_ranking = 0.0
+                for event_source, batch in search_papers_stream(query, max_results=max_results):
+                    if event_source == 'done':
+                        papers = _merge_live(index_results, batch)
+                        break
+                    if not batch:
+                        continue
+                    papers = papers + batch
+                    yield _ndjson({"event": "papers", "source": event_source, "results": _simplify_results(batch)})
+                    # Hits arriving in a burst are covered by the next (or the final) ranking
+                    if time.monotonic() - last_ranking >= STREAM_RANKING_INTERVAL:
+                        yield _ndjson({"event": "ranking", "results": _provisional_ranking(papers, query, config, page_size),
+                                       "total": len(papers)})
+                        last_ranking = time.monotonic()
+
+            if not papers:
+                yield _ndjson({"event": "done", "results": [], "session_id": None, "next_cursor": None, "total": 0})
+                return
+            results, lexical_similarities = prune_candidates(papers, query, config)
+            scores = compute_ranking_scores(results, query, config=config, lexical_similarities=lexical_similarities)
+            session = session_store.create(query, results, scores)
+            page, next_cursor = session.page(0, page_size)
+            yield _ndjson({"event": "done", "results": _simplify_results(page), "session_id": session.session_id,
+                           "next_cursor": next_cursor, "total": len(results)})
+        except Exception as e:
+            import traceback
+            logger.error(f"API error: {e}")
+            logger.error(traceback.format_exc())
+            yield _ndjson({"event": "error", "error": str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Upper bound on the number of queries accepted by /api/search/batch
+MAX_BATCH_QUERIES = int(os.getenv("RA_MAX_BATCH_QUERIES", "50"))
+
+@search_bp.route('/batch', methods=['POST'])
+def search_batch():
+    """Search and rank several related queries, sharing encoding work across them."""
+    data = request.json
+    queries = data.get('queries', [])
+    source = data.get('source', 'live')
+
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+        return jsonify({"error": "queries must be a non-empty list of strings"}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({"error": f"At most {MAX_BATCH_QUERIES} queries per batch"}), 400
+    if source not in SOURCES:
+        return jsonify({"error": f"Unknown source: {source}"}), 400
+    try:
+        max_results = _parse_positive_int(data, 'max_results', 3, maximum=MAX_RESULTS)
+        page_size = _parse_positive_int(data, 'page_size')
+        config = _ranking_config(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        candidates, lexical_similarities = prune_candidates_batch(
+            queries, _retrieve_candidates_many(queries, source, max_results), config)
+
+        # Rank every query in one pass; each query still gets its own session for paging
+        batch_scores = compute_ranking_scores_batch(queries, candidates, config=config,
+                                                    lexical_similarities=lexical_similarities)
+        batch_results = []
+        for query, papers, scores in zip(queries, candidates, batch_scores):
+            if not papers:
+                batch_results.append({"query": query, "results": [], "session_id": None, "next_cursor": None, "total": 0})
+                continue
+            session = session_store.create(query, papers, scores)
+            page, next_cursor = session.page(0, page_size)
+            batch_results.append({
+                "query": query,
+                "results": _simplify_results(page),
+                "session_id": session.session_id,
+                "next_cursor": next_cursor,
+                "total": len(papers)
+            })
+        return jsonify({"batches": batch_results})
+
+    except Exception as e:
+        import traceback
+        logger.error(f"API error: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+@search_bp.route('/models', methods=['GET'])
+def search_models():
+    """Report load time and memory use of the loaded embedding models."""
+    service = get_embedding_service()
+    client = get_embedding_client()
+    return jsonify({
+        "models": model_registry.stats(),
+        "embedding_service": service.stats() if service is not None else None,
+        "embedding_server_workers": client.num_workers if client is not None else None
+    })
+
+@search_bp.route('/cache-stats', methods=['GET'])
+def search_cache_stats():
+    """Report hit/miss counters of the ranking caches and the upstream response cache."""
+    cache = get_response_cache()
+    return jsonify({
+        "query_cache": get_query_cache().stats(),
+        "response_cache": cache.stats() if cache is not None else None
+    })
+
+def create_app(warm_models=True):
+    """
+    Create and configure the Flask application.
+
+    Args:
+        warm_models (bool): Load the embedding model now instead of on the first search
+    """
     app = Flask(__name__)
     CORS(app, resources={r"/api/*": {"origins": "*"}})  # Enable CORS for all routes
     
     # Register blueprints
     app.register_blueprint(draft_bp)
     app.register_blueprint(search_bp)
+
+    register_paper_observer(_observe_retrieved_papers)
+
+    # Encode on a pool of worker processes instead of under this process's GIL;
+    # the workers load the model, so it is not warmed in this process
+    if os.getenv("RA_EMBEDDING_SERVER", "0") == "1":
+        try:
+            start_embedding_server()
+        except Exception as e:
+            logger.error(f"Failed to start embedding server: {e}")
+    elif warm_models:
+        try:
+            model_registry.warm()
+        except Exception as e:
+            logger.error(f"Failed to warm embedding model: {e}")
+
+    # Coalesce the encode calls of concurrent requests into shared batches
+    # (wraps the embedding server when both are enabled)
+    if os.getenv("RA_EMBEDDING_SERVICE", "0") == "1":
+        try:
+            start_embedding_service()
+        except Exception as e:
+            logger.error(f"Failed to start embedding service: {e}")
     
     @app.route('/')
     def index():
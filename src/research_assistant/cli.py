@@ -79,6 +79,21 @@ def open_ui():
     webbrowser.open(f"file://{ui_path}")
     return True
 
+def load_corpus(paths, corpus_db=None):
+    """Load JSONL paper dumps into the local corpus used by the offline retrieval backend."""
+    from research_assistant.retrieval.local_corpus import LocalCorpus
+    
+    corpus = LocalCorpus(corpus_db)
+    for path in paths:
+        if not os.path.isfile(path):
+            print(f"Corpus file not found: {path}")
+            return 1
+        start = time.time()
+        count = corpus.load_jsonl(path)
+        print(f"Loaded {count} records from {path} in {time.time() - start:.1f}s")
+    print(f"Local corpus at {corpus.path} now holds {len(corpus)} papers")
+    return 0
+
 def main():
     """Main entry point for the CLI."""
     parser = argparse.ArgumentParser(description="Research Assistant")
@@ -86,9 +101,25 @@ def main():
     parser.add_argument("--ui-only", action="store_true", help="Open only the UI")
     parser.add_argument("--port", type=int, default=5000, help="Port for the API server")
     parser.add_argument("--ui-path", type=str, help="Path to the UI files")
+    parser.add_argument("--load-corpus", nargs="+", metavar="JSONL",
+                        help="Bulk-load JSONL paper dumps (e.g. Semantic Scholar dataset exports) into the local corpus and exit")
+    parser.add_argument("--corpus-db", type=str,
+                        help="Path to the local corpus database, used by --load-corpus and by the API server")
+    parser.add_argument("--encoder-backend", choices=["torch", "int8", "onnx", "onnx-int8"],
+                        help="Inference backend for the embedding model (default: torch)")
     
     args = parser.parse_args()
     
+    if args.encoder_backend:
+        # Read by the API server process when it loads the embedding model
+        os.environ["RA_ENCODER_BACKEND"] = args.encoder_backend
+    if args.corpus_db:
+        # Read by the API server process when it opens the local corpus
+        os.environ["RA_CORPUS_DB"] = args.corpus_db
+    
+    if args.load_corpus:
+        return load_corpus(args.load_corpus, args.corpus_db)
+    
     if args.api_only:
         api_process = start_api_server(args.port)
     elif args.ui_only:
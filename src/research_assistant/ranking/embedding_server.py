@@ -0,0 +1,183 @@
+"""
+Out-of-process embedding server for using every core of an API node.
+
+Encoding is CPU-bound and the Flask worker threads share one GIL, so a single
+API process cannot keep more than about one core busy with tokenization and
+the model's Python overhead. The server runs a pool of worker processes that
+each load the model once at startup. EmbeddingClient splits an encode call
+into chunks spread over the workers; every worker writes its vectors straight
+into a shared memory block owned by the client, so only texts and offsets are
+pickled and the embeddings are never copied through a pipe.
+
+The client exposes ``encode(texts)`` and a ``fingerprint``, so it can be
+registered in the model registry in place of the in-process model.
+"""
+
+import os
+import sys
+import math
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.ranking.model_registry import (
+    DEFAULT_MODEL_NAME, _load_sentence_transformer, model_fingerprint, registry, resolve_model_path,
+)
+
+logger = logging.getLogger(__name__)
+
+# Default maximum number of texts sent to a worker in one task
+DEFAULT_CHUNK_SIZE = 64
+
+# Model loaded by the initializer of each worker process
+_worker_model = None
+
+
+def _init_worker(path, backend, threads, loader):
+    """Load the model once in a worker process and size its intra-op thread pool."""
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = loader(path) if loader is not None else _load_sentence_transformer(path, backend)
+
+
+def _worker_dimension():
+    """Return the embedding dimension of the worker's model."""
+    return int(np.asarray(_worker_model.encode(["dimension probe"])).shape[1])
+
+
+def _worker_encode(texts, shm_name, row_offset, total_rows, dim):
+    """Encode texts and write them into rows of the client's shared memory block."""
+    embeddings = np.asarray(_worker_model.encode(texts), dtype=np.float32)
+    block = shared_memory.SharedMemory(name=shm_name)
+    try:
+        output = np.ndarray((total_rows, dim), dtype=np.float32, buffer=block.buf)
+        output[row_offset:row_offset + len(texts)] = embeddings
+        del output
+    finally:
+        block.close()
+    return len(texts)
+
+
+class EmbeddingClient:
+    """
+    Client of a pool of embedding worker processes.
+    """
+
+    def __init__(self, name_or_path=DEFAULT_MODEL_NAME, num_workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 backend=None, loader=None):
+        """
+        Start the worker processes and wait until the model is loaded in one of them.
+
+        Args:
+            name_or_path (str): Model name or path loaded by every worker
+            num_workers (int): Number of worker processes. Defaults to the CPU count.
+            chunk_size (int): Maximum number of texts per worker task
+            backend (str): Inference backend of the workers. Defaults to the registry's backend.
+            loader (callable): Picklable function loading a model from a path in the
+                workers, used instead of SentenceTransformer
+        """
+        cpu_count = os.cpu_count() or 1
+        self.num_workers = num_workers or cpu_count
+        self.chunk_size = chunk_size
+        self.backend = backend or registry.backend
+        path = resolve_model_path(name_or_path)
+        self.fingerprint = model_fingerprint(name_or_path)
+        # Workers share the cores instead of each starting one thread per core
+        threads = max(1, cpu_count // self.num_workers)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(path, self.backend, threads, loader),
+        )
+        self.dimension = self._pool.submit(_worker_dimension).result()
+
+    def encode(self, texts, **kwargs):
+        """
+        Encode texts on the worker processes.
+        Keyword arguments of SentenceTransformer.encode are accepted for
+        compatibility and ignored.
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            array: One embedding per text
+        """
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        # Spread small calls over all workers, cap large ones at chunk_size
+        size = max(1, min(self.chunk_size, math.ceil(len(texts) / self.num_workers)))
+        shape = (len(texts), self.dimension)
+        block = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        try:
+            futures = [self._pool.submit(_worker_encode, texts[start:start + size], block.name,
+                                         start, shape[0], shape[1])
+                       for start in range(0, len(texts), size)]
+            for future in futures:
+                future.result()
+            return np.ndarray(shape, dtype=np.float32, buffer=block.buf).copy()
+        finally:
+            block.close()
+            block.unlink()
+
+    def shutdown(self, wait=True):
+        """
+        Stop the worker processes.
+
+        Args:
+            wait (bool): Block until every worker has exited
+        """
+        self._pool.shutdown(wait=wait)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_embedding_client():
+    """
+    Return the running embedding server client, or None if it has not been started.
+
+    Returns:
+        EmbeddingClient: The shared client
+    """
+    return _client
+
+
+def start_embedding_server(name=DEFAULT_MODEL_NAME, num_workers=None):
+    """
+    Start the shared embedding server for a model and serve the model through it.
+    The number of worker processes defaults to RA_EMBED_PROCESSES, then the CPU count.
+
+    Args:
+        name (str): Model name or path the workers load
+        num_workers (int): Number of worker processes
+
+    Returns:
+        EmbeddingClient: The client of the running server
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if num_workers is None and os.environ.get('RA_EMBED_PROCESSES'):
+                num_workers = int(os.environ['RA_EMBED_PROCESSES'])
+            _client = EmbeddingClient(name, num_workers=num_workers)
+            # Searches asking the registry for this model now encode on the workers
+            registry.register(name, _client)
+            logger.info(f"Started embedding server with {_client.num_workers} worker processes")
+        return _client
+
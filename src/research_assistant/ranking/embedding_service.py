@@ -0,0 +1,265 @@
+"""
+In-process embedding service with dynamic micro-batching.
+
+Concurrent search requests each encode a query and a handful of new papers.
+Calling the model once per request keeps batches tiny, so most of the time is
+spent on per-call overhead and threads contend for the GIL. The service
+funnels every encode call through a queue: a worker takes the first waiting
+request and, when other requests are queued behind it, keeps collecting
+requests for up to ``max_latency_ms`` or until ``max_batch_size`` texts are
+gathered. It then encodes them in one call and resolves each caller's future
+with its slice of the result.
+
+The service exposes ``encode(texts)`` and a ``fingerprint``, so it can be
+registered in the model registry in place of the model it wraps.
+"""
+
+import os
+import sys
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.ranking.model_registry import DEFAULT_MODEL_NAME, model_fingerprint, registry
+
+logger = logging.getLogger(__name__)
+
+# Default maximum number of texts encoded in one model call
+DEFAULT_MAX_BATCH_SIZE = 64
+
+# Default time a worker waits for more requests before encoding a partial batch
+DEFAULT_MAX_LATENCY_MS = 5.0
+
+# Default number of worker threads calling the model
+DEFAULT_NUM_WORKERS = 1
+
+# Queued in place of a request to stop a worker
+_STOP = object()
+
+
+class _EncodeRequest:
+    """Texts of one caller together with the future its embeddings are delivered to."""
+
+    __slots__ = ('texts', 'future')
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+
+
+class EmbeddingService:
+    """
+    Queue and worker pool that coalesces concurrent encode calls into batches.
+    """
+
+    def __init__(self, model, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_latency_ms=DEFAULT_MAX_LATENCY_MS,
+                 num_workers=DEFAULT_NUM_WORKERS, fingerprint=None):
+        """
+        Start the worker threads.
+
+        Args:
+            model: Loaded model exposing ``encode``
+            max_batch_size (int): Maximum number of texts per model call. A single
+                request larger than this is encoded on its own.
+            max_latency_ms (float): Time budget for gathering a batch after the
+                first request arrives
+            num_workers (int): Number of threads calling the model
+            fingerprint (str): Identifier of the wrapped model. Defaults to its
+                model_fingerprint.
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.fingerprint = fingerprint or model_fingerprint(model)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self._workers = [threading.Thread(target=self._run, name=f"embedding-worker-{i}", daemon=True)
+                         for i in range(num_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, texts):
+        """
+        Queue texts for encoding.
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            Future: Resolves to an array with one embedding per text
+        """
+        request = _EncodeRequest(list(texts))
+        if not request.texts:
+            request.future.set_result(np.empty((0, 0), dtype=np.float32))
+            return request.future
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Embedding service has been shut down")
+            self.requests += 1
+        self._queue.put(request)
+        return request.future
+
+    def encode(self, texts, **kwargs):
+        """
+        Encode texts through the shared batches, blocking until they are done.
+        Keyword arguments of SentenceTransformer.encode are accepted for
+        compatibility and ignored; batching is controlled by the service.
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            array: One embedding per text
+        """
+        return self.submit(texts).result()
+
+    def _gather(self, first):
+        """
+        Collect requests following ``first`` until the batch is full or the latency budget is spent.
+        A lone request with nothing else queued is encoded right away, so a
+        single caller never waits for a batch that will not form.
+        """
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_latency
+        while size < self.max_batch_size:
+            try:
+                if len(batch) == 1:
+                    request = self._queue.get_nowait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                # Leave the stop marker for this or another worker once the batch is done
+                self._queue.put(_STOP)
+                break
+            if size + len(request.texts) > self.max_batch_size:
+                return batch, request
+            batch.append(request)
+            size += len(request.texts)
+        return batch, None
+
+    def _run(self):
+        carried = None
+        while True:
+            request = carried if carried is not None else self._queue.get()
+            if request is _STOP:
+                # Pass the marker on so that every worker stops
+                self._queue.put(_STOP)
+                return
+            batch, carried = self._gather(request)
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch):
+        texts = [text for request in batch for text in request.texts]
+        try:
+            embeddings = np.asarray(self.model.encode(texts), dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Batch of {len(texts)} texts failed to encode: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        with self._lock:
+            self.batches += 1
+            self.texts += len(texts)
+        start = 0
+        for request in batch:
+            end = start + len(request.texts)
+            request.future.set_result(embeddings[start:end])
+            start = end
+
+    def stats(self):
+        """
+        Return request and batch counters.
+
+        Returns:
+            dict: Counters and the mean number of texts per model call
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'texts': self.texts,
+                'mean_batch_size': round(self.texts / self.batches, 2) if self.batches else 0.0,
+                'queued': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_latency_ms': self.max_latency * 1000,
+                'workers': len(self._workers),
+            }
+
+    def shutdown(self, wait=True):
+        """
+        Stop the workers once the queued requests are encoded.
+
+        Args:
+            wait (bool): Block until every worker has exited
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    """
+    Return the running embedding service, or None if it has not been started.
+
+    Returns:
+        EmbeddingService: The shared service
+    """
+    return _service
+
+
+def start_embedding_service(name=DEFAULT_MODEL_NAME, max_batch_size=None, max_latency_ms=None, num_workers=None):
+    """
+    Start the shared embedding service for a model and serve the model through it.
+    Settings default to RA_EMBED_MAX_BATCH, RA_EMBED_MAX_LATENCY_MS and RA_EMBED_WORKERS.
+
+    Args:
+        name (str): Model name or path to wrap
+        max_batch_size (int): Maximum number of texts per model call
+        max_latency_ms (float): Time budget for gathering a batch
+        num_workers (int): Number of threads calling the model
+
+    Returns:
+        EmbeddingService: The running service
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            model = registry.get(name)
+            _service = EmbeddingService(
+                model,
+                max_batch_size=max_batch_size or int(os.environ.get('RA_EMBED_MAX_BATCH', DEFAULT_MAX_BATCH_SIZE)),
+                max_latency_ms=max_latency_ms if max_latency_ms is not None
+                else float(os.environ.get('RA_EMBED_MAX_LATENCY_MS', DEFAULT_MAX_LATENCY_MS)),
+                num_workers=num_workers or int(os.environ.get('RA_EMBED_WORKERS', DEFAULT_NUM_WORKERS)),
+                fingerprint=model_fingerprint(name),
+            )
+            # Searches asking the registry for this model now go through the service
+            registry.register(name, _service)
+            logger.info(f"Started embedding service: {_service.stats()}")
+        return _service
@@ -0,0 +1,346 @@
+"""
+Persistent on-disk store of paper embeddings.
+
+Embeddings are kept in a memory-mapped float16 matrix next to a SQLite index
+mapping the content hash of the encoded text to its row; a put only writes the
+index entries it changes. The same papers come back from Semantic Scholar over
+and over, so only papers that have never been seen before need to go through
+the encoder. The store is tied to the model
+fingerprint it was built with and is reset when the model changes.
+
+Vectors are L2-normalized before they are stored, so cosine similarity with a
+normalized query is a plain dot product. Unit vectors lose nothing that
+matters for ranking in float16, which halves the size of the store.
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.utils.utils import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes so that old stores are rebuilt
+STORE_FORMAT_VERSION = 3
+
+# On-disk precision of the stored embeddings
+STORE_DTYPE = np.float16
+
+# Default number of rows kept before least recently used embeddings are evicted
+DEFAULT_MAX_ROWS = 100000
+
+# Initial number of rows allocated in the vectors file; it doubles as it fills up
+INITIAL_CAPACITY = 1024
+
+# "used" orders the entries from least to most recently used
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    row INTEGER NOT NULL,
+    used INTEGER NOT NULL
+);
+"""
+
+
+def normalize_rows(vectors):
+    """
+    Scale every row to unit length, leaving all-zero rows at zero.
+
+    Args:
+        vectors (array): One vector per row
+
+    Returns:
+        array: float32 unit vectors
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def content_hash(text):
+    """
+    Hash the exact text that is passed to the encoder.
+
+    Args:
+        text (str): Text that is embedded
+
+    Returns:
+        str: Hex digest identifying the text
+    """
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Size-bounded LRU store of normalized embeddings backed by a memory-mapped float16 matrix.
+    """
+
+    def __init__(self, directory, fingerprint, max_rows=DEFAULT_MAX_ROWS):
+        """
+        Open (or create) a store.
+
+        Args:
+            directory (str): Directory holding the vectors and index files
+            fingerprint (str): Identifier of the model the embeddings come from.
+                An existing store built with another model is discarded.
+            max_rows (int): Maximum number of embeddings kept on disk
+        """
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.max_rows = max_rows
+        self._vectors_path = os.path.join(directory, 'vectors.f16')
+        self._legacy_paths = [os.path.join(directory, 'vectors.f32'), os.path.join(directory, 'index.json')]
+        self._index_path = os.path.join(directory, 'index.sqlite')
+        self._lock = threading.Lock()
+        self._rows = OrderedDict()  # content hash -> row, least recently used first
+        self._touched = OrderedDict()  # keys read since the last write, in order of use
+        self._clock = 0
+        self._free_rows = []
+        self._dim = None
+        self._capacity = 0
+        self._vectors = None
+        os.makedirs(directory, exist_ok=True)
+        # Only used under self._lock
+        self._conn = sqlite3.connect(self._index_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(INDEX_SCHEMA)
+        self._open()
+
+    def _open(self):
+        index = {name: json.loads(value) for name, value in self._conn.execute("SELECT name, value FROM meta")}
+        expected_bytes = index.get('capacity', 0) * (index.get('dim') or 0) * np.dtype(STORE_DTYPE).itemsize
+        if (index.get('version') != STORE_FORMAT_VERSION
+                or index.get('fingerprint') != self.fingerprint
+                or not os.path.exists(self._vectors_path)
+                or os.path.getsize(self._vectors_path) != expected_bytes):
+            if index:
+                logger.info(f"Discarding embedding store at {self.directory} (model or format changed)")
+            self._reset()
+            return
+
+        self._dim = index['dim']
+        self._capacity = index['capacity']
+        self._rows = OrderedDict(self._conn.execute("SELECT key, row FROM entries ORDER BY used"))
+        self._clock = self._conn.execute("SELECT COALESCE(MAX(used), 0) FROM entries").fetchone()[0]
+        used = set(self._rows.values())
+        self._free_rows = [row for row in range(self._capacity) if row not in used]
+        if self._capacity:
+            self._vectors = np.memmap(self._vectors_path, dtype=STORE_DTYPE, mode='r+',
+                                      shape=(self._capacity, self._dim))
+        # The store may have been built with a larger max_rows
+        if self._capacity > self.max_rows:
+            self._shrink()
+
+    def _shrink(self):
+        """Evict the least recently used rows and compact the vectors file down to max_rows."""
+        while len(self._rows) > self.max_rows:
+            self._rows.popitem(last=False)
+        keys = list(self._rows)
+        vectors = np.array(self._vectors[[self._rows[key] for key in keys]]) if keys else None
+        self._vectors.flush()
+        self._vectors = None
+        self._capacity = self.max_rows
+        with open(self._vectors_path, 'r+b') as f:
+            f.truncate(self._capacity * self._dim * np.dtype(STORE_DTYPE).itemsize)
+        self._vectors = np.memmap(self._vectors_path, dtype=STORE_DTYPE, mode='r+',
+                                  shape=(self._capacity, self._dim))
+        if keys:
+            self._vectors[:len(keys)] = vectors
+            self._vectors.flush()
+        self._rows = OrderedDict((key, row) for row, key in enumerate(keys))
+        self._free_rows = list(range(len(keys), self._capacity))
+        # Compaction moves every row, so the index is rewritten once here
+        self._conn.execute("DELETE FROM entries")
+        self._conn.executemany("INSERT INTO entries (key, row, used) VALUES (?, ?, ?)",
+                               [(key, row, row + 1) for key, row in self._rows.items()])
+        self._clock = len(self._rows)
+        self._save_meta()
+
+    def _reset(self):
+        self._vectors = None
+        self._rows = OrderedDict()
+        self._touched = OrderedDict()
+        self._free_rows = []
+        self._dim = None
+        self._capacity = 0
+        self._clock = 0
+        self._conn.execute("DELETE FROM entries")
+        self._conn.execute("DELETE FROM meta")
+        self._conn.commit()
+        for path in [self._vectors_path] + self._legacy_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _grow(self, needed):
+        """Extend the vectors file so that at least ``needed`` rows fit."""
+        new_capacity = max(self._capacity, INITIAL_CAPACITY)
+        while new_capacity < needed:
+            new_capacity *= 2
+        new_capacity = min(new_capacity, self.max_rows)
+        if new_capacity <= self._capacity:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self._dim * np.dtype(STORE_DTYPE).itemsize)
+        self._free_rows.extend(range(self._capacity, new_capacity))
+        self._capacity = new_capacity
+        self._vectors = np.memmap(self._vectors_path, dtype=STORE_DTYPE, mode='r+',
+                                  shape=(self._capacity, self._dim))
+
+    def _save_meta(self):
+        meta = {
+            'version': STORE_FORMAT_VERSION,
+            'fingerprint': self.fingerprint,
+            'dim': self._dim,
+            'capacity': self._capacity,
+        }
+        self._conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                               [(name, json.dumps(value)) for name, value in meta.items()])
+        self._conn.commit()
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def get_many(self, keys):
+        """
+        Look up embeddings by content hash.
+
+        Args:
+            keys (list): Content hashes
+
+        Returns:
+            dict: Content hash -> unit-length float32 embedding for every key found
+        """
+        with self._lock:
+            found = [(key, self._rows[key]) for key in keys if key in self._rows]
+            if not found:
+                return {}
+            for key, _ in found:
+                self._rows.move_to_end(key)
+                self._touched[key] = None
+                self._touched.move_to_end(key)
+            vectors = self._vectors[[row for _, row in found]]
+        # Renormalize after widening so that float16 rounding does not skew norms
+        vectors = normalize_rows(vectors)
+        return {key: vectors[i] for i, (key, _) in enumerate(found)}
+
+    def put_many(self, keys, vectors):
+        """
+        Store embeddings, evicting the least recently used ones when the store is full.
+        Vectors are normalized to unit length before they are stored.
+
+        Args:
+            keys (list): Content hashes
+            vectors (array): Embeddings, one row per key
+        """
+        vectors = normalize_rows(vectors)
+        if len(keys) == 0:
+            return
+        with self._lock:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self._dim}")
+
+            pending = OrderedDict()
+            for key, vector in zip(keys, vectors):
+                if key not in self._rows:
+                    pending[key] = vector
+            # Never try to keep more rows than the store can hold
+            while len(pending) > self.max_rows:
+                pending.popitem(last=False)
+            if not pending:
+                return
+
+            capacity = self._capacity
+            self._grow(len(self._rows) + len(pending))
+            evicted = []
+            while len(self._free_rows) < len(pending):
+                key, row = self._rows.popitem(last=False)
+                self._touched.pop(key, None)
+                self._free_rows.append(row)
+                evicted.append(key)
+
+            if evicted:
+                # Unmap evicted keys before their rows are overwritten
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in evicted])
+                self._conn.commit()
+
+            rows = [self._free_rows.pop() for _ in pending]
+            self._vectors[rows] = np.stack(list(pending.values()))
+            self._vectors.flush()
+            for key, row in zip(pending, rows):
+                self._rows[key] = row
+
+            # Write only what changed: recency of keys read since the last put, and the new rows
+            self._conn.executemany("UPDATE entries SET used = ? WHERE key = ?",
+                                   [(self._tick(), key) for key in self._touched])
+            self._touched = OrderedDict()
+            self._conn.executemany("INSERT OR REPLACE INTO entries (key, row, used) VALUES (?, ?, ?)",
+                                   [(key, row, self._tick()) for key, row in zip(pending, rows)])
+            if self._capacity != capacity:
+                self._save_meta()
+            else:
+                self._conn.commit()
+
+    def clear(self):
+        """Remove every stored embedding."""
+        with self._lock:
+            self._reset()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(fingerprint, max_rows=None, namespace='embeddings'):
+    """
+    Return the process-wide embedding store for a model fingerprint.
+
+    Args:
+        fingerprint (str): Model fingerprint (see model_registry.model_fingerprint)
+        max_rows (int): Maximum store size. Defaults to RA_EMBEDDING_STORE_ROWS or 100000.
+        namespace (str): Cache subdirectory, keeping e.g. paper and query embeddings apart
+
+    Returns:
+        EmbeddingStore: The store, or None if the fingerprint is unknown or the
+            store is disabled with RA_EMBEDDING_STORE=0
+    """
+    if fingerprint is None or os.environ.get('RA_EMBEDDING_STORE', '1') == '0':
+        return None
+    with _stores_lock:
+        store = _stores.get((namespace, fingerprint))
+        if store is None:
+            if max_rows is None:
+                max_rows = int(os.environ.get('RA_EMBEDDING_STORE_ROWS', DEFAULT_MAX_ROWS))
+            # One directory per model name and backend; new weights reset its contents
+            name = hashlib.sha1(re.sub(r'@[0-9a-f]+', '', fingerprint).encode('utf-8')).hexdigest()[:12]
+            store = EmbeddingStore(get_cache_dir(namespace, name), fingerprint, max_rows=max_rows)
+            _stores[(namespace, fingerprint)] = store
+        return store
@@ -0,0 +1,329 @@
+"""
+Corpus-level lexical statistics for TF-IDF scoring.
+
+Fitting a TfidfVectorizer on the handful of papers being ranked is slow and
+gives meaningless IDF values. Instead, document frequencies are accumulated
+incrementally from every paper the retrieval layer has seen and persisted to
+a SQLite database, each save writing only what changed since the last one;
+ranking only transforms texts with these statistics and never fits.
+Tokenization and IDF smoothing match TfidfVectorizer(stop_words='english',
+ngram_range=(1, 2)) so that scores stay comparable with the previous path.
+"""
+
+import os
+import sys
+import json
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.ranking.embedding_store import content_hash
+from research_assistant.utils.utils import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Bump when the tokenizer or file layout changes so that old statistics are rebuilt
+LEXICAL_FORMAT_VERSION = 2
+
+# Persist the shared model after this many new documents
+AUTOSAVE_EVERY = 200
+
+# Saves only write the terms and documents counted since the previous save
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS doc_freq (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seen (
+    key TEXT PRIMARY KEY
+);
+"""
+
+
+def l2_normalize_rows(matrix):
+    """Scale every row of a sparse matrix to unit length, leaving empty rows at zero."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return csr_matrix(matrix.multiply(1.0 / norms[:, np.newaxis]))
+
+
+def build_analyzer():
+    """Return the tokenizer used for lexical scoring (English stop words, unigrams and bigrams)."""
+    return TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).build_analyzer()
+
+
+class CorpusLexicalModel:
+    """
+    Incrementally built document-frequency table over every retrieved paper.
+    """
+
+    def __init__(self, path=None):
+        """
+        Initialize the model, loading saved statistics if a path is given.
+
+        Args:
+            path (str): SQLite database the statistics are persisted to
+        """
+        self.path = path
+        self._analyzer = build_analyzer()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._autosave_thread = None
+        self.doc_freq = Counter()
+        self.n_docs = 0
+        self.total_terms = 0
+        # Changes since the last save; documents already saved are only looked up in the database
+        self._new_seen = set()
+        self._saving_seen = set()
+        self._dirty_terms = set()
+        self._unsaved = 0
+        self._conn = None
+        if path:
+            self._open()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # One connection shared by all threads, only used under self._db_lock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        meta = {name: json.loads(value) for name, value in self._conn.execute("SELECT name, value FROM meta")}
+        if meta.get('version') != LEXICAL_FORMAT_VERSION:
+            # Statistics of another tokenizer or layout are rebuilt from scratch
+            for table in ('meta', 'doc_freq', 'seen'):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute("INSERT INTO meta (name, value) VALUES ('version', ?)",
+                               (json.dumps(LEXICAL_FORMAT_VERSION),))
+            self._conn.commit()
+            return
+        self.n_docs = meta.get('n_docs', 0)
+        self.total_terms = meta.get('total_terms', 0)
+        self.doc_freq = Counter(dict(self._conn.execute("SELECT term, df FROM doc_freq")))
+
+    def _known(self, keys):
+        """Return the content hashes among keys that have been counted. Called under self._lock."""
+        known = {key for key in keys if key in self._new_seen or key in self._saving_seen}
+        rest = [key for key in keys if key not in known]
+        if self._conn is not None and rest:
+            with self._db_lock:
+                for start in range(0, len(rest), 500):
+                    chunk = rest[start:start + 500]
+                    known.update(row[0] for row in self._conn.execute(
+                        f"SELECT key FROM seen WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+        return known
+
+    def save(self):
+        """Persist the statistics changed since the last save to ``path``."""
+        if not self.path:
+            return
+        with self._save_lock:
+            # Snapshot the changes under the model lock and write without it, so scoring is not held up
+            with self._lock:
+                terms = [(term, self.doc_freq[term]) for term in self._dirty_terms]
+                meta = [('n_docs', json.dumps(self.n_docs)), ('total_terms', json.dumps(self.total_terms))]
+                self._saving_seen, self._new_seen = self._new_seen, set()
+                self._dirty_terms = set()
+                unsaved, self._unsaved = self._unsaved, 0
+            try:
+                with self._db_lock:
+                    self._conn.executemany(
+                        "INSERT INTO doc_freq (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = excluded.df",
+                        terms)
+                    self._conn.executemany("INSERT OR IGNORE INTO seen (key) VALUES (?)",
+                                           [(key,) for key in self._saving_seen])
+                    self._conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", meta)
+                    self._conn.commit()
+            except BaseException:
+                with self._db_lock:
+                    self._conn.rollback()
+                with self._lock:
+                    self._dirty_terms.update(term for term, _ in terms)
+                    self._new_seen |= self._saving_seen
+                    self._unsaved += unsaved
+                raise
+            finally:
+                with self._lock:
+                    self._saving_seen = set()
+
+    def _autosave(self):
+        """Save on a background thread, unless a save is already running."""
+        with self._lock:
+            if self._autosave_thread is not None and self._autosave_thread.is_alive():
+                return
+            self._autosave_thread = threading.Thread(target=self._save_logged, name="lexical-model-save", daemon=True)
+            self._autosave_thread.start()
+
+    def _save_logged(self):
+        try:
+            self.save()
+        except Exception as e:
+            logger.error(f"Failed to save lexical model: {e}")
+
+    def wait_for_save(self, timeout=None):
+        """Block until a background save started by add_documents has finished."""
+        thread = self._autosave_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def dirty(self):
+        return self._unsaved > 0
+
+    @property
+    def avg_doc_length(self):
+        return self.total_terms / self.n_docs if self.n_docs else 0.0
+
+    def analyze(self, text):
+        """Split a text into the terms the model counts."""
+        return self._analyzer(text)
+
+    def add_documents(self, texts):
+        """
+        Update document frequencies with texts not seen before.
+
+        Args:
+            texts (list): Document texts
+
+        Returns:
+            int: Number of new documents counted
+        """
+        by_key = {content_hash(text): text for text in texts}
+        with self._lock:
+            known = self._known(list(by_key))
+        new_docs = [(key, self.analyze(text)) for key, text in by_key.items() if key not in known]
+        if not new_docs:
+            return 0
+        added = 0
+        with self._lock:
+            # Another thread may have counted some of them while these were analyzed
+            known = self._known([key for key, _ in new_docs])
+            for key, terms in new_docs:
+                if key in known:
+                    continue
+                unique_terms = set(terms)
+                self._new_seen.add(key)
+                self.doc_freq.update(unique_terms)
+                self._dirty_terms.update(unique_terms)
+                self.n_docs += 1
+                self.total_terms += len(terms)
+                added += 1
+            self._unsaved += added
+            should_save = self._unsaved >= AUTOSAVE_EVERY
+        if should_save:
+            self._autosave()
+        return added
+
+    def statistics(self, terms):
+        """
+        Consistent snapshot of the corpus statistics for a set of terms.
+
+        Args:
+            terms (list): Terms to look up
+
+        Returns:
+            tuple: (number of documents, average document length, array of document frequencies)
+        """
+        with self._lock:
+            df = np.fromiter((self.doc_freq.get(term, 0) for term in terms), dtype=np.float64, count=len(terms))
+            return self.n_docs, self.avg_doc_length, df
+
+    def idf(self, terms):
+        """
+        Smoothed inverse document frequencies, as computed by TfidfVectorizer.
+
+        Args:
+            terms (list): Terms to look up
+
+        Returns:
+            array: log((1 + n) / (1 + df)) + 1 for every term
+        """
+        n_docs, _, df = self.statistics(terms)
+        return np.log((1 + n_docs) / (1 + df)) + 1
+
+    def term_counts(self, texts, vocabulary=None):
+        """
+        Count terms per text into a sparse matrix.
+
+        Args:
+            texts (list): Texts to count
+            vocabulary (dict): Term -> column mapping, extended in place with new terms
+
+        Returns:
+            tuple: (csr_matrix of term counts, vocabulary)
+        """
+        vocabulary = {} if vocabulary is None else vocabulary
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            for term, count in Counter(self.analyze(text)).items():
+                indices.append(vocabulary.setdefault(term, len(vocabulary)))
+                data.append(count)
+            indptr.append(len(indices))
+        counts = csr_matrix((np.asarray(data, dtype=np.float64), indices, indptr),
+                            shape=(len(texts), len(vocabulary)))
+        return counts, vocabulary
+
+    def transform(self, query, texts):
+        """
+        TF-IDF vectors for a query and documents over a shared set of columns.
+
+        Args:
+            query (str): Search query
+            texts (list): Document texts
+
+        Returns:
+            tuple: (query_vec, tfidf_matrix) L2-normalized sparse vectors
+        """
+        doc_counts, vocabulary = self.term_counts(texts)
+        n_columns = len(vocabulary)
+        # Like a fitted vectorizer, ignore query terms that occur in none of the documents
+        query_counts, _ = self.term_counts([query], dict(vocabulary))
+        query_counts = query_counts[:, :n_columns]
+        idf = self.idf(sorted(vocabulary, key=vocabulary.get))
+        query_vec = l2_normalize_rows(query_counts.multiply(idf))
+        tfidf_matrix = l2_normalize_rows(doc_counts.multiply(idf))
+        return query_vec, tfidf_matrix
+
+
+_lexical_model = None
+_lexical_model_lock = threading.Lock()
+
+
+def get_lexical_model():
+    """
+    Return the process-wide lexical model stored in the cache directory.
+
+    Returns:
+        CorpusLexicalModel: The shared model
+    """
+    global _lexical_model
+    with _lexical_model_lock:
+        if _lexical_model is None:
+            _lexical_model = CorpusLexicalModel(os.path.join(get_cache_dir('lexical'), 'model.sqlite'))
+        return _lexical_model
+
+
+def save_lexical_model():
+    """Persist the shared lexical model if it has unsaved documents."""
+    model = _lexical_model
+    if model is not None and model.dirty:
+        try:
+            model.save()
+        except Exception as e:
+            logger.error(f"Failed to save lexical model: {e}")
+
+
+atexit.register(save_lexical_model)
@@ -0,0 +1,356 @@
+"""
+Process-wide registry of sentence embedding models.
+
+Loading a SentenceTransformer from disk dominates the latency of a search
+request, so every model is loaded at most once per process and the same
+instance is shared by all Flask worker threads. Inference with a loaded model
+is read-only, which makes sharing it across threads safe.
+"""
+
+import os
+import time
+import platform
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Name of the model shipped with the repository under data/
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Directory holding locally downloaded models (project_root/data)
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../data'))
+
+# Inference backends a model can be loaded with:
+#   torch      float32 PyTorch forward pass (reference)
+#   int8       PyTorch with dynamically quantized int8 Linear layers
+#   onnx       float32 ONNX Runtime graph
+#   onnx-int8  dynamically quantized int8 ONNX Runtime graph
+ENCODER_BACKENDS = ('torch', 'int8', 'onnx', 'onnx-int8')
+DEFAULT_ENCODER_BACKEND = 'torch'
+
+# Subdirectories holding exported graphs; they are derived from the weights and
+# do not change the model's identity
+EXPORT_DIRS = ('onnx', 'openvino')
+
+
+def get_encoder_backend():
+    """
+    Return the inference backend selected with RA_ENCODER_BACKEND (defaults to "torch").
+
+    Raises:
+        ValueError: If the configured backend is unknown
+    """
+    backend = os.environ.get('RA_ENCODER_BACKEND', DEFAULT_ENCODER_BACKEND).strip().lower()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend} (expected one of {', '.join(ENCODER_BACKENDS)})")
+    return backend
+
+
+def onnx_quantization_config():
+    """
+    Return the ONNX Runtime quantization target, from RA_ONNX_QUANTIZATION or the CPU architecture.
+
+    Returns:
+        str: One of "arm64", "avx2", "avx512" or "avx512_vnni"
+    """
+    configured = os.environ.get('RA_ONNX_QUANTIZATION')
+    if configured:
+        return configured
+    return 'arm64' if platform.machine().lower() in ('arm64', 'aarch64') else 'avx2'
+
+
+def resolve_model_path(name_or_path=None):
+    """
+    Resolve a model name or path to the location the model is loaded from.
+
+    Args:
+        name_or_path (str): Model name (e.g. "all-MiniLM-L6-v2"), path to a model
+            directory, or None for the default model
+
+    Returns:
+        str: Absolute path of a local model directory, or the name unchanged so
+            that sentence_transformers can fetch it from the hub
+    """
+    name_or_path = os.fspath(name_or_path or DEFAULT_MODEL_NAME)
+    if os.path.isdir(name_or_path):
+        return os.path.abspath(name_or_path)
+    local_path = os.path.join(MODELS_DIR, name_or_path)
+    if os.path.isdir(local_path):
+        return local_path
+    return name_or_path
+
+
+@lru_cache(maxsize=None)
+def _directory_signature(path):
+    """
+    Hash the names, sizes and modification times of the files in a model directory.
+    Computed once per process, matching the lifetime of a loaded model.
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in sorted(os.walk(path)):
+        if root == path:
+            dirs[:] = [d for d in dirs if d not in EXPORT_DIRS]
+        dirs.sort()
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            rel = os.path.relpath(os.path.join(root, name), path)
+            digest.update(f"{rel}:{stat.st_size}:{int(stat.st_mtime)};".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _load_sentence_transformer(path, backend=DEFAULT_ENCODER_BACKEND):
+    """
+    Load a SentenceTransformer model from a path or hub name with an inference backend.
+
+    Args:
+        path (str): Resolved model path or hub name
+        backend (str): One of ENCODER_BACKENDS
+
+    Returns:
+        SentenceTransformer: The loaded model
+    """
+    from sentence_transformers import SentenceTransformer
+    if backend == 'torch':
+        return SentenceTransformer(path)
+    if backend == 'int8':
+        import torch
+        model = SentenceTransformer(path, device='cpu')
+        # Quantizes the weights of every Linear layer once; activations are quantized on the fly
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == 'onnx':
+        return SentenceTransformer(path, backend='onnx')
+    if backend == 'onnx-int8':
+        return SentenceTransformer(path, backend='onnx',
+                                   model_kwargs={'file_name': _quantized_onnx_file(path)})
+    raise ValueError(f"Unknown encoder backend: {backend}")
+
+
+def _quantized_onnx_file(path):
+    """
+    Return the quantized ONNX graph of a local model, exporting it on first use.
+
+    Args:
+        path (str): Local model directory
+
+    Returns:
+        str: Graph path relative to the model directory
+    """
+    config = onnx_quantization_config()
+    file_name = f"onnx/model_quantized_{config}.onnx"
+    if os.path.isfile(os.path.join(path, file_name)):
+        return file_name
+    if not os.path.isdir(path):
+        raise ValueError(f"Quantized ONNX graphs can only be exported for local models, not {path}")
+
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    logger.info(f"Exporting {config} quantized ONNX graph for {path}")
+    model = SentenceTransformer(path, backend='onnx')
+    export_dynamic_quantized_onnx_model(model, config, path, file_suffix=f"quantized_{config}")
+    return file_name
+
+
+def _current_rss_bytes():
+    """Return the resident set size of this process in bytes, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def _parameter_bytes(model):
+    """Return the memory held by the model parameters in bytes, or None if unknown."""
+    try:
+        return int(sum(p.numel() * p.element_size() for p in model.parameters()))
+    except Exception:
+        return None
+
+
+class ModelRegistry:
+    """
+    Thread-safe cache of loaded embedding models keyed by their resolved path.
+    """
+
+    def __init__(self, loader=None, backend=None):
+        """
+        Initialize an empty registry.
+
+        Args:
+            loader (callable): Function loading a model from a resolved path.
+                Defaults to constructing a SentenceTransformer.
+            backend (str): Inference backend models are loaded with.
+                Defaults to RA_ENCODER_BACKEND.
+        """
+        self.backend = backend or get_encoder_backend()
+        self._loader = loader or (lambda path: _load_sentence_transformer(path, self.backend))
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, name_or_path=None):
+        """
+        Return the model for a name or path, loading it on first use.
+
+        Concurrent callers asking for the same model wait for a single load
+        instead of each loading their own copy.
+
+        Args:
+            name_or_path (str): Model name, path, or None for the default model
+
+        Returns:
+            The loaded model
+        """
+        key = resolve_model_path(name_or_path)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._load(key)
+        return model
+
+    def _load(self, key):
+        rss_before = _current_rss_bytes()
+        start = time.perf_counter()
+        model = self._loader(key)
+        load_seconds = time.perf_counter() - start
+        rss_after = _current_rss_bytes()
+
+        stats = {
+            'path': key,
+            'backend': self.backend,
+            'load_seconds': round(load_seconds, 3),
+            'parameter_bytes': _parameter_bytes(model),
+            'rss_delta_bytes': (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+        }
+        with self._lock:
+            self._models[key] = model
+            self._stats[key] = stats
+        logger.info(f"Loaded embedding model {key} in {stats['load_seconds']}s "
+                    f"(parameters: {stats['parameter_bytes']} bytes, rss delta: {stats['rss_delta_bytes']} bytes)")
+        return model
+
+    def key_of(self, model):
+        """
+        Return the resolved name or path a loaded model handle is registered under.
+
+        Args:
+            model: A model handle returned by this registry
+
+        Returns:
+            str: The registry key, or None if the handle is unknown
+        """
+        with self._lock:
+            for key, candidate in self._models.items():
+                if candidate is model:
+                    return key
+        return None
+
+    def register(self, name_or_path, model):
+        """
+        Register an already constructed model handle under a name or path.
+
+        Args:
+            name_or_path (str): Model name or path the handle is served for
+            model: Object exposing an ``encode(texts)`` method
+        """
+        key = resolve_model_path(name_or_path)
+        with self._lock:
+            self._models[key] = model
+            self._stats.setdefault(key, {'path': key, 'backend': self.backend, 'load_seconds': None,
+                                         'parameter_bytes': _parameter_bytes(model),
+                                         'rss_delta_bytes': None})
+
+    def warm(self, names=None):
+        """
+        Load models ahead of the first request.
+
+        Args:
+            names (list): Model names or paths to load. Defaults to the default model.
+
+        Returns:
+            dict: Load statistics for the warmed models keyed by resolved path
+        """
+        for name in names or [DEFAULT_MODEL_NAME]:
+            self.get(name)
+        return self.stats()
+
+    def stats(self):
+        """
+        Return load time and memory statistics for every loaded model.
+
+        Returns:
+            dict: Statistics keyed by resolved model path
+        """
+        with self._lock:
+            return {key: dict(value) for key, value in self._stats.items()}
+
+    def clear(self):
+        """Drop every loaded model so that the next request loads it again."""
+        with self._lock:
+            self._models.clear()
+            self._stats.clear()
+
+
+# Registry shared by the whole process
+registry = ModelRegistry()
+
+
+def get_model(model=None):
+    """
+    Return an embedding model for a name, a path or an already loaded handle.
+
+    Args:
+        model: Model name, path to a model directory, a loaded model exposing
+            ``encode``, or None for the default model
+
+    Returns:
+        The model handle to encode with
+    """
+    if model is None or isinstance(model, (str, os.PathLike)):
+        return registry.get(model)
+    return model
+
+
+def model_fingerprint(model=None):
+    """
+    Identify the weights behind a model so that caches built with it can be invalidated.
+
+    Args:
+        model: Model name, path, a handle loaded through the registry, or None for
+            the default model
+
+    Returns:
+        str: A string that changes whenever the model or its inference backend
+            changes, or None when the model cannot be identified (e.g. an
+            arbitrary handle passed by a caller)
+    """
+    if model is None or isinstance(model, (str, os.PathLike)):
+        key = resolve_model_path(model)
+    else:
+        fingerprint = getattr(model, 'fingerprint', None)
+        if fingerprint:
+            return fingerprint
+        key = registry.key_of(model)
+        if key is None:
+            return None
+    if os.path.isdir(key):
+        key = f"{os.path.basename(key)}@{_directory_signature(key)}"
+    # Quantized backends produce slightly different vectors, so they get their own caches
+    return key if registry.backend == 'torch' else f"{key}+{registry.backend}"
@@ -1,6 +1,7 @@
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy.sparse import csr_matrix
+from dataclasses import dataclass
+from typing import Optional
+import datetime
 import numpy as np
 
 # Add the project root to the Python path
@@ -8,120 +9,624 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
+from research_assistant.ranking.model_registry import get_model, model_fingerprint
+from research_assistant.ranking.embedding_store import content_hash, get_embedding_store, normalize_rows
+from research_assistant.ranking.query_cache import get_query_cache
+from research_assistant.ranking.lexical_model import get_lexical_model, l2_normalize_rows
 
-def get_paper_embeddings(papers, query, model_path=None):
+
+def paper_text(paper):
+    """
+    Text used to represent a paper for embedding and lexical scoring.
+    Args:
+        paper (dict): Paper dictionary
+    Returns:
+        str: Title and abstract combined
+    """
+    # Combine title and abstract for better semantic representation
+    return f"{paper.get('title', '')}. {paper.get('abstract', '')}"
+
+def encode_query(query, model=None):
+    """
+    Generate the embedding of a search query, reusing the query embedding cache.
+    Args:
+        query (str): Search query
+        model: Model name, path or loaded model
+    Returns:
+        array: Unit-length query embedding
+    """
+    model = get_model(model)
+    fingerprint = model_fingerprint(model)
+    if fingerprint is None:
+        return normalize_rows(model.encode([query])[0])
+    return normalize_rows(get_query_cache().encode(model, fingerprint, query))
+
+def encode_queries(queries, model=None):
+    """
+    Generate the embeddings of several queries with a single encoder call.
+    Args:
+        queries (list): Search queries
+        model: Model name, path or loaded model
+    Returns:
+        array: One unit-length embedding per query
+    """
+    model = get_model(model)
+    fingerprint = model_fingerprint(model)
+    if fingerprint is None:
+        return normalize_rows(model.encode(list(queries)))
+    return normalize_rows(get_query_cache().encode_many(model, fingerprint, queries))
+
+def encode_papers(papers, model=None):
+    """
+    Generate embeddings for papers, reusing the persistent embedding store.
+    Args:
+        papers (list): List of paper dictionaries
+        model: Model name, path or loaded model
+    Returns:
+        array: One unit-length embedding per paper
+    """
+    model = get_model(model)
+    store = get_embedding_store(model_fingerprint(model))
+    paper_texts = [paper_text(paper) for paper in papers]
+    if store is None:
+        return normalize_rows(model.encode(paper_texts))
+    return encode_with_store(model, store, paper_texts)
+
+def get_paper_embeddings(papers, query, model=None, model_path=None):
     """
     Generate embeddings for papers and query using a BERT model.
     
     Args:
         papers (list): List of paper dictionaries
         query (str): Original search query
-        model_path (str): Path to the local BERT model directory
+        model: Model name, path to a local model directory or a loaded model.
+            Defaults to the bundled all-MiniLM-L6-v2 model.
+        model_path (str): Deprecated alias for a model path
         
     Returns:
-        query_embedding (array): BERT embedding for the query
-        paper_embeddings (array): BERT embeddings for the papers
+        query_embedding (array): Unit-length BERT embedding for the query
+        paper_embeddings (array): Unit-length BERT embeddings for the papers
     """
-    # Set default model path if not provided
-    if model_path is None:
-        # Path relative to project root
-        model_path = os.path.abspath(os.path.join(
-            os.path.dirname(__file__), 
-            '../../../data/all-MiniLM-L6-v2'
-        ))
-    
-    # Load model
-    model = SentenceTransformer(model_path)
-    
-    # Prepare text content from papers
-    paper_texts = []
-    for paper in papers:
-        # Combine title and abstract for better semantic representation
-        text = f"{paper.get('title', '')}. {paper.get('abstract', '')}"
-        paper_texts.append(text)
+    # Models are loaded once per process by the model registry
+    model = get_model(model if model is not None else model_path)
     
     # Generate embeddings
-    query_embedding = model.encode([query])[0]
-    paper_embeddings = model.encode(paper_texts)
+    query_embedding = encode_query(query, model)
+    paper_embeddings = encode_papers(papers, model)
     
     return query_embedding, paper_embeddings
 
-def get_paper_vectors(papers, query):
+def semantic_similarity(query_embedding, paper_embeddings):
+    """
+    Cosine similarity of unit-length paper embeddings to a unit-length query embedding.
+    Args:
+        query_embedding (array): Normalized query embedding
+        paper_embeddings (array): Normalized paper embeddings, one per row
+    Returns:
+        array: One similarity per paper
+    """
+    return np.asarray(paper_embeddings, dtype=np.float32) @ np.asarray(query_embedding, dtype=np.float32)
+
+def encode_with_store(model, store, texts):
+    """
+    Encode texts, reusing embeddings already held in the embedding store.
+    Only texts the store has never seen are passed to the model.
+    Args:
+        model: Loaded model exposing ``encode``
+        store (EmbeddingStore): Store the embeddings are read from and written to
+        texts (list): Texts to embed
+    Returns:
+        array: Unit-length embeddings in the order of ``texts``
+    """
+    keys = [content_hash(text) for text in texts]
+    cached = store.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    if missing:
+        new_embeddings = normalize_rows(model.encode([texts[i] for i in missing]))
+        store.put_many([keys[i] for i in missing], new_embeddings)
+        cached.update((keys[i], new_embeddings[j]) for j, i in enumerate(missing))
+    return np.stack([cached[key] for key in keys])
+
+def get_paper_vectors(papers, query, lexical_model=None):
     """
     Generate TF-IDF vectors for papers and query.
+    IDF values come from the corpus-level lexical model, built incrementally from
+    every retrieved paper, so nothing is fitted on the papers being ranked.
     Args:
         papers (list): List of paper dictionaries
         query (str): Original search query
+        lexical_model (CorpusLexicalModel): Statistics to use instead of the shared model
     Returns:
         query_vec (array): TF-IDF vector for the query
         tfidf_matrix (array): TF-IDF matrix for the papers
     """
-    
-    # Load model
-    tfidf_vectorizer = TfidfVectorizer(
-            max_features=5000,
-            stop_words='english',
-            ngram_range=(1, 2)
-        )
+    lexical_model = lexical_model or get_lexical_model()
     
     # Prepare text content from papers
-    paper_texts = [f"{p.get('title', '')}. {p.get('abstract', '')}" for p in papers]
+    paper_texts = [paper_text(p) for p in papers]
 
-    # FIT the vectorizer on paper_texts first
-    tfidf_vectorizer.fit(paper_texts)
-    
-    # Generate vectors
-    query_vec = tfidf_vectorizer.transform([query])
-    tfidf_matrix = tfidf_vectorizer.transform(paper_texts)
+    # Transform only; document frequencies are maintained by the lexical model
+    query_vec, tfidf_matrix = lexical_model.transform(query, paper_texts)
 
     return query_vec, tfidf_matrix
 
 
-def rank_papers_by_relevance(papers, query):
+class BM25Scorer:
     """
-    Rank papers by relevance to the query using BERT embeddings.
-    
+    Okapi BM25 over a fixed set of candidate papers.
+
+    Term frequencies are counted once into a sparse papers x terms matrix and
+    turned into saturated, IDF-weighted BM25 term weights up front, so scoring
+    a query is a single sparse matrix-vector product. IDF and the average
+    document length come from the corpus-level lexical model when it has
+    statistics, and from the candidate set otherwise.
+    """
+
+    def __init__(self, texts, lexical_model=None, k1=1.5, b=0.75):
+        """
+        Precompute document lengths, postings and term weights.
+
+        Args:
+            texts (list): Document texts
+            lexical_model (CorpusLexicalModel): Corpus statistics and tokenizer
+            k1 (float): Term frequency saturation
+            b (float): Document length normalization
+        """
+        self.lexical_model = lexical_model or get_lexical_model()
+        counts, self.vocabulary = self.lexical_model.term_counts(texts)
+        self.doc_lengths = np.asarray(counts.sum(axis=1)).ravel()
+
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        n_docs, avg_doc_length, corpus_df = self.lexical_model.statistics(terms)
+        local_df = np.bincount(counts.indices, minlength=len(terms)).astype(np.float64)
+        if n_docs >= len(texts):
+            doc_freq = np.maximum(corpus_df, local_df)
+        else:
+            n_docs, doc_freq = len(texts), local_df
+            avg_doc_length = self.doc_lengths.mean() if len(texts) else 0.0
+        self.idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        # Saturated term frequency for every non-zero (paper, term) entry
+        rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+        length_norm = k1 * (1 - b + b * self.doc_lengths / max(avg_doc_length, 1e-9))
+        tf = counts.data
+        weights = tf * (k1 + 1) / (tf + length_norm[rows]) * self.idf[counts.indices]
+        self.weights = csr_matrix((weights, counts.indices, counts.indptr), shape=counts.shape)
+
+    def query_matrix(self, queries):
+        """Term counts of queries restricted to terms that occur in the documents."""
+        counts, _ = self.lexical_model.term_counts(queries, dict(self.vocabulary))
+        return counts[:, :len(self.vocabulary)]
+
+    def score(self, query):
+        """
+        BM25 score of every document for a query.
+
+        Args:
+            query (str): Search query
+
+        Returns:
+            array: One score per document
+        """
+        return self.score_batch([query])[0]
+
+    def score_batch(self, queries):
+        """
+        BM25 scores for several queries at once.
+
+        Args:
+            queries (list): Search queries
+
+        Returns:
+            array: queries x documents score matrix
+        """
+        return np.asarray((self.query_matrix(queries) @ self.weights.T).todense())
+
+
+@dataclass
+class RankingConfig:
+    """
+    Settings for rank_papers_by_relevance.
+
+    Attributes:
+        lexical_scorer (str): "tfidf" (cosine over corpus TF-IDF) or "bm25"
+        semantic_weight (float): Weight of the semantic similarity in the
+            similarity score; the lexical similarity gets the rest
+        bm25_k1 (float): BM25 term frequency saturation
+        bm25_b (float): BM25 document length normalization
+        reference_year (int): Year recency is measured from. Defaults to the current year.
+        prune_depth (int): Two-stage ranking: keep only the papers with the best
+            lexical scores, and encode and rank only those. None ranks every paper.
+        similarity_weight (float): Weight of the similarity in the relevance score
+        citation_weight (float): Weight of the citation score in the relevance score
+        recency_weight (float): Weight of the recency score in the relevance score
+    """
+    lexical_scorer: str = 'tfidf'
+    semantic_weight: float = 0.75
+    bm25_k1: float = 1.5
+    bm25_b: float = 0.75
+    reference_year: Optional[int] = None
+    prune_depth: Optional[int] = None
+    similarity_weight: float = 0.6
+    citation_weight: float = 0.25
+    recency_weight: float = 0.15
+
+    @property
+    def weights(self):
+        """(similarity, citation, recency) weights of the relevance score."""
+        return (self.similarity_weight, self.citation_weight, self.recency_weight)
+
+
+def get_lexical_similarities(papers, query, config=None, lexical_model=None):
+    """
+    Lexical similarity of every paper to the query, scaled to [0, 1].
     Args:
         papers (list): List of paper dictionaries
         query (str): Original search query
-        
+        config (RankingConfig): Selects the TF-IDF or BM25 scorer
+        lexical_model (CorpusLexicalModel): Statistics to use instead of the shared model
     Returns:
-        list: Ranked list of paper dictionaries with added relevance scores
+        array: One similarity per paper
+    """
+    config = config or RankingConfig()
+    if config.lexical_scorer == 'tfidf':
+        query_vec, tfidf_matrix = get_paper_vectors(papers, query, lexical_model=lexical_model)
+        return (tfidf_matrix @ query_vec.T).toarray().flatten()
+    if config.lexical_scorer == 'bm25':
+        scorer = BM25Scorer([paper_text(p) for p in papers], lexical_model=lexical_model,
+                            k1=config.bm25_k1, b=config.bm25_b)
+        scores = scorer.score(query)
+        # BM25 is unbounded; scale by the best candidate to blend with cosine similarities
+        top = scores.max() if len(scores) else 0
+        return scores / top if top > 0 else scores
+    raise ValueError(f"Unknown lexical scorer: {config.lexical_scorer}")
+
+
+def get_lexical_similarity_matrix(papers, queries, candidates, config=None, lexical_model=None):
+    """
+    Lexical similarities of several queries over a shared pool of papers.
+    Papers are tokenized once for all queries. Each row is scaled as
+    get_lexical_similarities would scale it over the query's own candidates.
+    Args:
+        papers (list): Deduplicated paper dictionaries shared by the queries
+        queries (list): Search queries
+        candidates (list): For every query, the indices of its papers in ``papers``
+        config (RankingConfig): Selects the TF-IDF or BM25 scorer
+        lexical_model (CorpusLexicalModel): Statistics to use instead of the shared model
+    Returns:
+        array: queries x papers similarity matrix, zero outside each query's candidates
+    """
+    config = config or RankingConfig()
+    lexical_model = lexical_model or get_lexical_model()
+    texts = [paper_text(p) for p in papers]
+    similarities = np.zeros((len(queries), len(papers)))
+    if config.lexical_scorer == 'tfidf':
+        doc_counts, vocabulary = lexical_model.term_counts(texts)
+        n_columns = len(vocabulary)
+        query_counts, _ = lexical_model.term_counts(queries, dict(vocabulary))
+        query_counts = csr_matrix(query_counts[:, :n_columns])
+        idf = lexical_model.idf(sorted(vocabulary, key=vocabulary.get))
+        tfidf_matrix = l2_normalize_rows(doc_counts.multiply(idf))
+        for i, columns in enumerate(candidates):
+            # Keep only query terms found in this query's candidates, as a per-query transform would
+            present = np.asarray(doc_counts[columns].sum(axis=0)).ravel() > 0
+            query_vec = l2_normalize_rows(query_counts[i].multiply(idf * present))
+            similarities[i, columns] = (tfidf_matrix[columns] @ query_vec.T).toarray().ravel()
+        return similarities
+    if config.lexical_scorer == 'bm25':
+        scorer = BM25Scorer(texts, lexical_model=lexical_model, k1=config.bm25_k1, b=config.bm25_b)
+        scores = scorer.score_batch(queries)
+        for i, columns in enumerate(candidates):
+            row = scores[i, columns]
+            top = row.max() if len(row) else 0
+            similarities[i, columns] = row / top if top > 0 else row
+        return similarities
+    raise ValueError(f"Unknown lexical scorer: {config.lexical_scorer}")
+
+
+def _to_number(value):
+    """Parse a citation count or year that may be an int, a numeric string, '' or None."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def numeric_field(papers, field):
+    """
+    Extract a numeric field from every paper into an array.
+    Args:
+        papers (list): List of paper dictionaries
+        field (str): Field name, e.g. 'citations' or 'year'
+    Returns:
+        array: float64 values, NaN where the field is missing or not numeric
+    """
+    return np.fromiter((_to_number(paper.get(field)) for paper in papers), dtype=np.float64, count=len(papers))
+
+def citation_scores(papers):
+    """Logarithmic citation score; papers without a citation count score 0."""
+    citations = np.nan_to_num(numeric_field(papers, 'citations'), nan=0.0)
+    return np.log1p(np.maximum(citations, 0) / 10)
+
+def recency_scores(papers, reference_year=None):
+    """Recency score favouring recent publications; papers without a year score 0."""
+    if reference_year is None:
+        reference_year = datetime.date.today().year
+    years = numeric_field(papers, 'year')
+    scores = 1 / (1 + 0.1 * (reference_year - years))
+    return np.where(np.isnan(years), 0.0, scores)
+
+# Default (similarity, citation, recency) weights of the relevance score
+DEFAULT_WEIGHTS = RankingConfig().weights
+
+def combine_scores(similarity, citation, recency, weights=DEFAULT_WEIGHTS):
+    """Relevance score in percent from the component score arrays."""
+    similarity_weight, citation_weight, recency_weight = weights
+    return (similarity_weight * similarity + citation_weight * citation + recency_weight * recency) * 100
+
+@dataclass
+class RankingScores:
+    """
+    Per-paper component scores of a ranking, aligned with the ranked paper list.
+
+    Attributes:
+        similarity (array): Blended semantic/lexical similarity
+        citation (array): Citation score
+        recency (array): Recency score
+        relevance (array): Combined relevance score in percent
+        semantic (array): Semantic part of the similarity, if known
+        lexical (array): Lexical part of the similarity, if known
+    """
+    similarity: np.ndarray
+    citation: np.ndarray
+    recency: np.ndarray
+    relevance: np.ndarray
+    semantic: Optional[np.ndarray] = None
+    lexical: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.relevance)
+
+    @classmethod
+    def from_components(cls, semantic, lexical, citation, recency, config=None):
+        """
+        Blend the similarity components and combine them into relevance scores.
+        Args:
+            semantic (array): Semantic similarity
+            lexical (array): Lexical similarity
+            citation (array): Citation score
+            recency (array): Recency score
+            config (RankingConfig): Supplies the semantic weight and relevance weights
+        Returns:
+            RankingScores: The combined scores
+        """
+        config = config or RankingConfig()
+        similarity = config.semantic_weight * semantic + (1 - config.semantic_weight) * lexical
+        return cls(similarity, citation, recency, combine_scores(similarity, citation, recency, config.weights),
+                   semantic, lexical)
+
+    def reweight(self, weights=DEFAULT_WEIGHTS, semantic_weight=None):
+        """
+        Recombine the stored component scores with other weights.
+        Only array arithmetic is involved; nothing is encoded or retrieved again.
+        Args:
+            weights (tuple): (similarity, citation, recency) weights
+            semantic_weight (float): New semantic/lexical blend, or None to keep the
+                current similarity. Requires the semantic and lexical components.
+        Returns:
+            RankingScores: New scores sharing the component arrays
+        """
+        similarity = self.similarity
+        if semantic_weight is not None:
+            if self.semantic is None or self.lexical is None:
+                raise ValueError("Similarity components are not available for re-blending")
+            similarity = semantic_weight * self.semantic + (1 - semantic_weight) * self.lexical
+        return RankingScores(similarity, self.citation, self.recency,
+                             combine_scores(similarity, self.citation, self.recency, weights),
+                             self.semantic, self.lexical)
+
+def select_top_k(scores, top_k=None, offset=0):
+    """
+    Indices of the highest scores, best first.
+    Uses argpartition so that only the selected scores are sorted.
+    Args:
+        scores (array): Relevance scores
+        top_k (int): Number of indices to return, or None for all
+        offset (int): Number of best indices to skip (for pagination)
+    Returns:
+        array: Indices into ``scores``
     """
+    n = len(scores)
+    end = n if top_k is None else min(offset + top_k, n)
+    if end <= offset:
+        return np.empty(0, dtype=np.int64)
+    if end >= n:
+        order = np.argsort(-scores, kind='stable')
+    else:
+        top = np.argpartition(-scores, end - 1)[:end]
+        order = top[np.argsort(-scores[top], kind='stable')]
+    return order[offset:end]
+
+def materialize_ranking(papers, scores, indices):
+    """
+    Copy the selected papers into dictionaries carrying their scores, in ranking order.
+    Args:
+        papers (list): List of paper dictionaries
+        scores (RankingScores): Component scores aligned with ``papers``
+        indices (array): Indices of the papers to return
+    Returns:
+        list: Paper dictionaries with added scores
+    """
+    ranked_papers = []
+    for i in indices:
+        paper_copy = papers[i].copy()
+        paper_copy['similarity_score'] = float(scores.similarity[i])
+        paper_copy['citation_score'] = float(scores.citation[i])
+        paper_copy['recency_score'] = float(scores.recency[i])
+        paper_copy['relevance_score'] = float(scores.relevance[i])
+        ranked_papers.append(paper_copy)
+    return ranked_papers
+
+def prune_candidates(papers, query, config=None, lexical_model=None):
+    """
+    First stage of two-stage ranking: keep the papers with the best lexical scores.
+    Lexical scoring is cheap compared to encoding, so large candidate sets are
+    cut down to ``config.prune_depth`` papers before any of them is encoded.
+    Args:
+        papers (list): List of paper dictionaries
+        query (str): Original search query
+        config (RankingConfig): Ranking settings; pruning is skipped when prune_depth is None
+        lexical_model (CorpusLexicalModel): Statistics to use instead of the shared model
+    Returns:
+        tuple: (surviving papers in their original order, their lexical similarities)
+    """
+    config = config or RankingConfig()
     if not papers:
-        print("No papers to rank")
-        return []
+        return papers, np.empty(0)
+    lexical_similarities = get_lexical_similarities(papers, query, config, lexical_model)
+    if config.prune_depth is None or len(papers) <= config.prune_depth:
+        return papers, lexical_similarities
+    keep = np.sort(select_top_k(lexical_similarities, config.prune_depth))
+    return [papers[i] for i in keep], lexical_similarities[keep]
+
+def prune_candidates_batch(queries, papers_per_query, config=None):
+    """
+    Prune the candidates of several queries (see prune_candidates).
+    Args:
+        queries (list): Search queries
+        papers_per_query (list): For every query, the list of its candidate papers
+        config (RankingConfig): Ranking settings; pruning is skipped when prune_depth is None
+    Returns:
+        tuple: (surviving papers per query, their lexical similarities per query), with
+            None as similarities when nothing was pruned, so that
+            compute_ranking_scores_batch scores every query over the shared pool
+    """
+    if config is None or config.prune_depth is None:
+        return papers_per_query, None
+    pruned = [prune_candidates(papers, query, config) for query, papers in zip(queries, papers_per_query)]
+    return [papers for papers, _ in pruned], [similarities for _, similarities in pruned]
+
+def compute_ranking_scores(papers, query, model=None, config=None, lexical_similarities=None):
+    """
+    Compute the component and relevance scores of every paper.
+    Args:
+        papers (list): List of paper dictionaries
+        query (str): Original search query
+        model: Model name, path or loaded model used for the embeddings
+        config (RankingConfig): Ranking settings
+        lexical_similarities (array): Lexical similarities already computed for
+            ``papers`` (e.g. by prune_candidates)
+    Returns:
+        RankingScores: Scores aligned with ``papers``
+    """
+    config = config or RankingConfig()
     
     # Get embeddings
-    query_embedding, paper_embeddings = get_paper_embeddings(papers, query)
+    query_embedding, paper_embeddings = get_paper_embeddings(papers, query, model=model)
 
-    # Get TF-IDF vectors
-    query_vec, tfidf_matrix = get_paper_vectors(papers, query)
-    
-    # Calculate similarity scores
-    semantic_similarities = cosine_similarity([query_embedding], paper_embeddings)[0]
+    # Embeddings are unit length, so cosine similarity is a single matrix-vector product
+    semantic_similarities = semantic_similarity(query_embedding, paper_embeddings)
+
+    # Calculate TF-IDF or BM25 similarity scores
+    if lexical_similarities is None:
+        lexical_similarities = get_lexical_similarities(papers, query, config)
+
+    # Component scores for all papers in one pass
+    citation = citation_scores(papers)
+    recency = recency_scores(papers, config.reference_year)
+    return RankingScores.from_components(semantic_similarities, lexical_similarities, citation, recency, config)
+
+def compute_ranking_scores_batch(queries, papers_per_query, model=None, config=None, lexical_similarities=None):
+    """
+    Compute ranking scores for several queries at once.
+    Papers retrieved by more than one query are encoded and tokenized once,
+    all queries go through the encoder in one call, and semantic similarities
+    come from a single queries x papers matrix.
+    Args:
+        queries (list): Search queries
+        papers_per_query (list): For every query, the list of its candidate papers
+        model: Model name, path or loaded model used for the embeddings
+        config (RankingConfig): Ranking settings
+        lexical_similarities (list): For every query, lexical similarities already
+            computed for its papers (e.g. by prune_candidates_batch)
+    Returns:
+        list: One RankingScores per query, aligned with that query's papers
+    """
+    config = config or RankingConfig()
+    model = get_model(model)
+
+    # Deduplicate papers across queries by their text
+    unique_papers, positions, candidates = [], {}, []
+    for papers in papers_per_query:
+        columns = []
+        for paper in papers:
+            key = content_hash(paper_text(paper))
+            if key not in positions:
+                positions[key] = len(unique_papers)
+                unique_papers.append(paper)
+            columns.append(positions[key])
+        candidates.append(np.asarray(columns, dtype=np.int64))
+
+    if not unique_papers:
+        return [RankingScores(*(np.empty(0),) * 4) for _ in queries]
+
+    query_embeddings = encode_queries(queries, model)
+    paper_embeddings = encode_papers(unique_papers, model)
+    semantic_similarities = query_embeddings @ paper_embeddings.T
+    if lexical_similarities is None:
+        matrix = get_lexical_similarity_matrix(unique_papers, queries, candidates, config)
+        lexical_similarities = [matrix[i, columns] for i, columns in enumerate(candidates)]
+
+    citation = citation_scores(unique_papers)
+    recency = recency_scores(unique_papers, config.reference_year)
+    return [RankingScores.from_components(semantic_similarities[i, columns], np.asarray(lexical_similarities[i]),
+                                          citation[columns], recency[columns], config)
+            for i, columns in enumerate(candidates)]
 
-    # Calculate TF-IDF similarity scores
-    lexical_similarities = (tfidf_matrix @ query_vec.T).toarray().flatten()
+def rank_papers_by_relevance_batch(queries, papers_per_query, model=None, config=None, top_k=None):
+    """
+    Rank the candidate papers of several queries in one pass.
+    Args:
+        queries (list): Search queries
+        papers_per_query (list): For every query, the list of its candidate papers
+        model: Model name, path or loaded model used for the embeddings
+        config (RankingConfig): Ranking settings
+        top_k (int): Return only the top_k papers of each query. Defaults to all papers.
+    Returns:
+        list: For every query, a ranked list of paper dictionaries with added relevance scores
+    """
+    if len(queries) != len(papers_per_query):
+        raise ValueError("Expected one list of papers per query")
+    papers_per_query, lexical_similarities = prune_candidates_batch(queries, papers_per_query, config)
+    batch_scores = compute_ranking_scores_batch(queries, papers_per_query, model=model, config=config,
+                                                lexical_similarities=lexical_similarities)
+    return [materialize_ranking(papers, scores, select_top_k(scores.relevance, top_k))
+            for papers, scores in zip(papers_per_query, batch_scores)]
 
-    semantic_weight = 0.75
-    lexical_weight = 1 - semantic_weight
+def rank_papers_by_relevance(papers, query, model=None, config=None, top_k=None, offset=0):
+    """
+    Rank papers by relevance to the query using BERT embeddings.
     
-    # Add scores to paper dictionaries
-    ranked_papers = []
-    for i, paper in enumerate(papers):
-        paper_copy = paper.copy()
-        paper_copy['similarity_score'] = float((semantic_weight * semantic_similarities[i]) + (lexical_weight * lexical_similarities[i]))
-        paper_copy['citation_score'] = float(np.log1p(int(paper.get('citations', 0))/10)) # Citation score is based on the logarithmic scale, falls back to 0 if no citations
-        # Recency score based on the year of publication (favours recent publications)
-        if paper.get('year') == '':
-            paper_copy['recency_score'] = 0
-        else:
-            paper_copy['recency_score'] = float(1 / (1 + 0.1 * (2025 - int(paper.get('year')))))
-        paper_copy['relevance_score'] = (0.6 * paper_copy['similarity_score'] + 0.25 * paper_copy['citation_score'] + 0.15 * paper_copy['recency_score'])  * 100
-        ranked_papers.append(paper_copy)
+    Args:
+        papers (list): List of paper dictionaries
+        query (str): Original search query
+        model: Model name, path or loaded model used for the embeddings
+        config (RankingConfig): Ranking settings (lexical scorer, weights, reference year, pruning depth)
+        top_k (int): Return only top_k papers. Defaults to all papers.
+        offset (int): Skip the best ``offset`` papers (for pagination)
+        
+    Returns:
+        list: Ranked list of paper dictionaries with added relevance scores
+    """
+    if not papers:
+        print("No papers to rank")
+        return []
     
-    # Sort by relevance score (descending)
-    ranked_papers.sort(key=lambda x: x['relevance_score'], reverse=True)
+    # Prune to the lexically best candidates (if configured) before encoding
+    papers, lexical_similarities = prune_candidates(papers, query, config)
+    scores = compute_ranking_scores(papers, query, model=model, config=config,
+                                    lexical_similarities=lexical_similarities)
     
-    return ranked_papers
\ No newline at end of file
+    # Select the requested papers and build dictionaries only for those
+    return materialize_ranking(papers, scores, select_top_k(scores.relevance, top_k, offset))
@@ -0,0 +1,198 @@
+"""
+In-process LRU cache of query embeddings.
+
+Users re-run the same literature-review query many times with only case or
+whitespace differences, so queries are normalized before lookup and their
+embeddings are reused instead of going through the encoder again. The cache
+can optionally be backed by an on-disk embedding store so that it survives
+restarts.
+"""
+
+import os
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.ranking.embedding_store import content_hash, get_embedding_store
+
+# Default number of query embeddings kept in memory
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def normalize_query(query):
+    """
+    Normalize a query so that trivially different spellings share a cache entry.
+
+    Args:
+        query (str): Raw search query
+
+    Returns:
+        str: Query with unicode, case and whitespace differences removed
+    """
+    return " ".join(unicodedata.normalize('NFKC', query).casefold().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings keyed by model fingerprint and normalized query.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, use_disk=False):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries (int): Maximum number of embeddings kept in memory
+            use_disk (bool): Fall back to an on-disk store for queries evicted
+                from memory or encoded by a previous process
+        """
+        self.max_entries = max_entries
+        self.use_disk = use_disk
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def encode(self, model, fingerprint, query):
+        """
+        Return the embedding of a query, encoding it only on a cache miss.
+
+        Args:
+            model: Loaded model exposing ``encode``
+            fingerprint (str): Fingerprint of the model (see model_registry.model_fingerprint)
+            query (str): Raw search query
+
+        Returns:
+            array: Query embedding
+        """
+        normalized = normalize_query(query)
+        key = (fingerprint, normalized)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+        store = get_embedding_store(fingerprint, namespace='query_embeddings') if self.use_disk else None
+        disk_key = content_hash(normalized)
+        embedding = store.get_many([disk_key]).get(disk_key) if store is not None else None
+        if embedding is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            embedding = np.asarray(model.encode([normalized])[0], dtype=np.float32)
+            if store is not None:
+                store.put_many([disk_key], embedding[np.newaxis, :])
+            with self._lock:
+                self.misses += 1
+
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return embedding
+
+    def encode_many(self, model, fingerprint, queries):
+        """
+        Return the embeddings of several queries, encoding all cache misses in one call.
+
+        Args:
+            model: Loaded model exposing ``encode``
+            fingerprint (str): Fingerprint of the model
+            queries (list): Raw search queries
+
+        Returns:
+            array: One embedding per query
+        """
+        normalized = [normalize_query(query) for query in queries]
+        embeddings = {}
+        with self._lock:
+            for text in normalized:
+                embedding = self._entries.get((fingerprint, text))
+                if embedding is not None:
+                    self._entries.move_to_end((fingerprint, text))
+                    embeddings[text] = embedding
+                    self.hits += 1
+        missing = [text for text in dict.fromkeys(normalized) if text not in embeddings]
+
+        store = get_embedding_store(fingerprint, namespace='query_embeddings') if self.use_disk and missing else None
+        disk_hits = 0
+        if store is not None:
+            stored = store.get_many([content_hash(text) for text in missing])
+            for text in missing:
+                embedding = stored.get(content_hash(text))
+                if embedding is not None:
+                    embeddings[text] = embedding
+                    disk_hits += 1
+            missing = [text for text in missing if text not in embeddings]
+
+        if missing:
+            encoded = np.asarray(model.encode(missing), dtype=np.float32)
+            embeddings.update(zip(missing, encoded))
+            if store is not None:
+                store.put_many([content_hash(text) for text in missing], encoded)
+
+        with self._lock:
+            self.disk_hits += disk_hits
+            self.misses += len(missing)
+            for text, embedding in embeddings.items():
+                self._entries[(fingerprint, text)] = embedding
+                self._entries.move_to_end((fingerprint, text))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return np.stack([embeddings[text] for text in normalized])
+
+    def stats(self):
+        """
+        Return hit/miss counters for sizing the cache.
+
+        Returns:
+            dict: Counters, current size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Drop every cached embedding and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache():
+    """
+    Return the process-wide query embedding cache.
+    Its size is read from RA_QUERY_CACHE_SIZE and disk backing is enabled with RA_QUERY_CACHE_DISK=1.
+
+    Returns:
+        QueryEmbeddingCache: The shared cache
+    """
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryEmbeddingCache(
+                max_entries=int(os.environ.get('RA_QUERY_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+                use_disk=os.environ.get('RA_QUERY_CACHE_DISK', '0') == '1',
+            )
+        return _query_cache
@@ -0,0 +1,168 @@
+"""
+Server-side store of ranked search results.
+
+A search computes the component scores of its whole candidate pool once and
+keeps them here, so that later pages are served by selecting from the stored
+scores instead of re-running retrieval and ranking. Clients page through a
+session with an opaque cursor.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+import threading
+from collections import OrderedDict
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.ranking.paper_ranker import select_top_k, materialize_ranking
+
+# Default number of sessions kept before the least recently used one is dropped
+DEFAULT_MAX_SESSIONS = 256
+
+# Default lifetime of a session in seconds
+DEFAULT_TTL_SECONDS = 1800
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor is malformed or its session has expired."""
+
+
+def encode_cursor(session_id, offset):
+    """
+    Build an opaque cursor pointing at a position in a ranking session.
+
+    Args:
+        session_id (str): Session identifier
+        offset (int): Rank of the first paper of the next page
+
+    Returns:
+        str: URL-safe cursor
+    """
+    payload = json.dumps({'s': session_id, 'o': offset}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor built with encode_cursor.
+
+    Args:
+        cursor (str): Cursor returned with a previous page
+
+    Returns:
+        tuple: (session_id, offset)
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        session_id, offset = str(payload['s']), int(payload['o'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    if offset < 0:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    return session_id, offset
+
+
+class RankingSession:
+    """
+    Candidate papers of one search together with their ranking scores.
+    """
+
+    def __init__(self, session_id, query, papers, scores):
+        self.session_id = session_id
+        self.query = query
+        self.papers = papers
+        self.scores = scores
+        self.last_access = time.monotonic()
+
+    def page(self, offset=0, limit=None):
+        """
+        Return one page of the ranking.
+
+        Args:
+            offset (int): Rank of the first paper of the page
+            limit (int): Page size, or None for every remaining paper
+
+        Returns:
+            tuple: (ranked paper dictionaries, cursor of the next page or None)
+        """
+        indices = select_top_k(self.scores.relevance, limit, offset)
+        next_offset = offset + len(indices)
+        next_cursor = encode_cursor(self.session_id, next_offset) if next_offset < len(self.papers) else None
+        return materialize_ranking(self.papers, self.scores, indices), next_cursor
+
+
+class RankingSessionStore:
+    """
+    Thread-safe LRU store of ranking sessions with a time-to-live.
+    """
+
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, query, papers, scores):
+        """
+        Store the ranking of a search.
+
+        Args:
+            query (str): Search query
+            papers (list): Candidate paper dictionaries
+            scores (RankingScores): Scores aligned with ``papers``
+
+        Returns:
+            RankingSession: The new session
+        """
+        session = RankingSession(uuid.uuid4().hex, query, papers, scores)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id):
+        """
+        Look up a session.
+
+        Args:
+            session_id (str): Session identifier
+
+        Returns:
+            RankingSession: The session
+
+        Raises:
+            InvalidCursorError: If the session does not exist or has expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or now - session.last_access > self.ttl_seconds:
+                self._sessions.pop(session_id, None)
+                raise InvalidCursorError("Search session expired, please search again")
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def resolve(self, cursor):
+        """
+        Return the session and offset a cursor points at.
+
+        Args:
+            cursor (str): Cursor returned with a previous page
+
+        Returns:
+            tuple: (RankingSession, offset)
+        """
+        session_id, offset = decode_cursor(cursor)
+        return self.get(session_id), offset
+
+
+# Store shared by the API process
+session_store = RankingSessionStore()
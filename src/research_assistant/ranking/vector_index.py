@@ -0,0 +1,505 @@
+"""
+Local approximate nearest neighbour index over every paper ever retrieved.
+
+Papers are stored as L2-normalized MiniLM embeddings, so cosine similarity is
+a dot product. Small indexes are searched exhaustively; once enough papers
+have been collected the index trains an inverted file (IVF): a spherical
+k-means coarse quantizer whose cells are the only ones scanned at query time.
+New papers are inserted incrementally into their nearest cell and the
+quantizer is retrained whenever the index has grown well past its last
+training size. Training runs on a background thread over a snapshot of the
+vectors, so searches keep using the current cells until the new ones are
+swapped in.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import logging
+import threading
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.ranking.model_registry import get_model, model_fingerprint
+from research_assistant.ranking.embedding_store import content_hash
+from research_assistant.ranking.paper_ranker import paper_text, encode_papers, encode_query
+from research_assistant.utils.utils import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Below this many papers an exhaustive scan is as fast as probing cells
+MIN_TRAIN_SIZE = 1024
+
+# Retrain the quantizer once the index has grown by this factor since the last training
+RETRAIN_GROWTH = 4
+
+# Number of cells scanned per query
+DEFAULT_NPROBE = 8
+
+# Rows scored per block when assigning vectors to centroids
+ASSIGN_BLOCK_ROWS = 65536
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores, k):
+    """Indices of the k largest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def _assign(vectors, centroids):
+    """Index of the nearest centroid for every vector."""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = vectors[start:start + ASSIGN_BLOCK_ROWS]
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def _spherical_kmeans(vectors, nlist, iterations=10, seed=0):
+    """Cluster normalized vectors into ``nlist`` cells by cosine similarity."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty cells with random points so that every cell stays in use
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class PaperIndex:
+    """
+    Incrementally built IVF index of paper embeddings with the paper metadata attached.
+    """
+
+    def __init__(self, fingerprint=None, nprobe=DEFAULT_NPROBE, min_train_size=MIN_TRAIN_SIZE,
+                 background_training=True):
+        """
+        Initialize an empty index.
+
+        Args:
+            fingerprint (str): Fingerprint of the model that produced the embeddings
+            nprobe (int): Number of cells scanned per query once the index is trained
+            min_train_size (int): Number of papers needed before the quantizer is trained
+            background_training (bool): Train the quantizer on a background thread
+                instead of in the thread that inserted the papers
+        """
+        self.fingerprint = fingerprint
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.background_training = background_training
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._training = False
+        self._training_thread = None
+        self._vectors = None
+        self._count = 0
+        self._keys = {}
+        self._papers = []
+        self._centroids = None
+        self._lists = []
+        self._trained_size = 0
+        self._dirty = False
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    @property
+    def is_trained(self):
+        return self._centroids is not None
+
+    @property
+    def vectors(self):
+        """Normalized embeddings of every indexed paper."""
+        return self._vectors[:self._count] if self._vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+    def _reserve(self, extra, dim):
+        needed = self._count + extra
+        if self._vectors is None:
+            self._vectors = np.empty((max(needed, 64), dim), dtype=np.float32)
+        elif needed > len(self._vectors):
+            grown = np.empty((max(needed, 2 * len(self._vectors)), dim), dtype=np.float32)
+            grown[:self._count] = self._vectors[:self._count]
+            self._vectors = grown
+
+    def add(self, keys, vectors, papers):
+        """
+        Insert papers that are not indexed yet.
+
+        Args:
+            keys (list): Content hashes identifying the papers
+            vectors (array): Paper embeddings, one row per key
+            papers (list): Paper dictionaries stored alongside the embeddings
+
+        Returns:
+            int: Number of papers actually inserted
+        """
+        vectors = _normalize(vectors)
+        with self._lock:
+            new = []
+            for i, key in enumerate(keys):
+                if key not in self._keys:
+                    self._keys[key] = -1  # reserve, also dedupes keys within this batch
+                    new.append(i)
+            if not new:
+                return 0
+
+            self._reserve(len(new), vectors.shape[1])
+            first_id = self._count
+            self._vectors[first_id:first_id + len(new)] = vectors[new]
+            for offset, i in enumerate(new):
+                self._keys[keys[i]] = first_id + offset
+                self._papers.append(dict(papers[i]))
+            self._count += len(new)
+            self._dirty = True
+
+            # New papers go to their nearest cell until a retrained quantizer replaces the cells
+            if self.is_trained:
+                ids = np.arange(first_id, self._count)
+                for paper_id, cell in zip(ids, _assign(self._vectors[first_id:self._count], self._centroids)):
+                    self._lists[cell].append(int(paper_id))
+            retrain = not self._training and self._count >= self.min_train_size and (
+                not self.is_trained or self._count >= RETRAIN_GROWTH * self._trained_size)
+            if retrain:
+                self._training = True
+
+        if retrain:
+            if self.background_training:
+                self._training_thread = threading.Thread(target=self._train_scheduled, name="paper-index-training",
+                                                         daemon=True)
+                self._training_thread.start()
+            else:
+                self._train_scheduled()
+        return len(new)
+
+    def _train_scheduled(self):
+        try:
+            self.train()
+        except Exception as e:
+            logger.error(f"Failed to train paper index: {e}")
+        finally:
+            with self._lock:
+                self._training = False
+
+    def wait_for_training(self, timeout=None):
+        """
+        Block until a background training started by ``add`` has finished.
+
+        Args:
+            timeout (float): Maximum seconds to wait
+        """
+        thread = self._training_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def train(self, nlist=None):
+        """
+        Train the coarse quantizer on every indexed paper and rebuild the cells.
+        Clustering runs without holding the index lock; papers inserted meanwhile
+        are assigned to the new cells when they are swapped in.
+
+        Args:
+            nlist (int): Number of cells. Defaults to 4*sqrt(n), keeping at least
+                39 papers per cell.
+        """
+        with self._lock:
+            # Rows are only ever appended, so this view stays valid after the lock is released
+            vectors = self.vectors
+        if nlist is None:
+            nlist = max(1, min(int(4 * np.sqrt(len(vectors))), len(vectors) // 39))
+        nlist = min(nlist, len(vectors))
+        if nlist < 1:
+            return
+        start = time.perf_counter()
+        centroids = _spherical_kmeans(vectors, nlist)
+        assignments = _assign(vectors, centroids)
+        order = np.argsort(assignments, kind='stable')
+        bounds = np.searchsorted(assignments[order], np.arange(nlist + 1))
+        lists = [order[bounds[c]:bounds[c + 1]].tolist() for c in range(nlist)]
+        with self._lock:
+            trained = len(vectors)
+            for paper_id, cell in zip(range(trained, self._count),
+                                      _assign(self._vectors[trained:self._count], centroids)):
+                lists[cell].append(paper_id)
+            self._centroids = centroids
+            self._lists = lists
+            self._trained_size = trained
+            self._dirty = True
+        logger.info(f"Trained paper index with {nlist} cells over {trained} papers "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    def search(self, query_vector, k=10, nprobe=None):
+        """
+        Find the indexed papers closest to a query embedding.
+
+        Args:
+            query_vector (array): Query embedding
+            k (int): Number of neighbours to return
+            nprobe (int): Number of cells to scan. Defaults to the index setting.
+
+        Returns:
+            tuple: (ids, scores) arrays of the k best papers, best first
+        """
+        query = _normalize(query_vector).reshape(-1)
+        with self._lock:
+            if self._count == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            if not self.is_trained:
+                scores = self.vectors @ query
+                ids = _top_k(scores, k)
+                return ids, scores[ids]
+            cells = _top_k(self._centroids @ query, nprobe or self.nprobe)
+            candidates = np.fromiter(
+                (paper_id for cell in cells for paper_id in self._lists[cell]), dtype=np.int64
+            )
+            vectors = self._vectors[candidates]
+        scores = vectors @ query
+        best = _top_k(scores, k)
+        return candidates[best], scores[best]
+
+    def search_papers(self, query_vector, k=10, nprobe=None):
+        """
+        Find the indexed papers closest to a query embedding.
+
+        Args:
+            query_vector (array): Query embedding
+            k (int): Number of papers to return
+            nprobe (int): Number of cells to scan
+
+        Returns:
+            list: Copies of the paper dictionaries with an added 'ann_score'
+        """
+        ids, scores = self.search(query_vector, k, nprobe)
+        results = []
+        for paper_id, score in zip(ids, scores):
+            paper = dict(self._papers[paper_id])
+            paper['ann_score'] = float(score)
+            results.append(paper)
+        return results
+
+    def save(self, directory):
+        """
+        Persist the index to a directory.
+
+        Args:
+            directory (str): Target directory, created if needed
+        """
+        os.makedirs(directory, exist_ok=True)
+        with self._save_lock:
+            # Snapshot under the index lock and write without it, so searches are not held up
+            with self._lock:
+                arrays = {'vectors': self.vectors}
+                if self.is_trained:
+                    arrays['centroids'] = self._centroids
+                    arrays['list_sizes'] = np.array([len(cell) for cell in self._lists], dtype=np.int64)
+                    arrays['list_ids'] = np.array([i for cell in self._lists for i in cell], dtype=np.int64)
+                keys = list(self._keys.items())
+                papers = self._papers[:self._count]
+                trained_size = self._trained_size
+                self._dirty = False
+            meta = {
+                'fingerprint': self.fingerprint,
+                'trained_size': trained_size,
+                'keys': [key for key, _ in sorted(keys, key=lambda item: item[1])],
+                'papers': papers,
+            }
+            tmp_arrays = os.path.join(directory, 'index.tmp.npz')
+            tmp_meta = os.path.join(directory, 'papers.json.tmp')
+            try:
+                np.savez(tmp_arrays, **arrays)
+                with open(tmp_meta, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+                os.replace(tmp_arrays, os.path.join(directory, 'index.npz'))
+                os.replace(tmp_meta, os.path.join(directory, 'papers.json'))
+            except Exception:
+                self._dirty = True
+                raise
+
+    @classmethod
+    def load(cls, directory, **kwargs):
+        """
+        Load an index saved with ``save``.
+
+        Args:
+            directory (str): Directory the index was saved to
+            **kwargs: Extra arguments for the constructor (nprobe, min_train_size)
+
+        Returns:
+            PaperIndex: The loaded index
+        """
+        with open(os.path.join(directory, 'papers.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        index = cls(fingerprint=meta.get('fingerprint'), **kwargs)
+        with np.load(os.path.join(directory, 'index.npz')) as arrays:
+            vectors = arrays['vectors']
+            index._count = len(vectors)
+            index._vectors = np.array(vectors, dtype=np.float32) if len(vectors) else None
+            if 'centroids' in arrays:
+                index._centroids = arrays['centroids']
+                ids = arrays['list_ids']
+                bounds = np.concatenate([[0], np.cumsum(arrays['list_sizes'])])
+                index._lists = [ids[bounds[c]:bounds[c + 1]].tolist() for c in range(len(index._centroids))]
+        index._keys = {key: i for i, key in enumerate(meta['keys'])}
+        index._papers = meta['papers']
+        index._trained_size = meta.get('trained_size', 0)
+        return index
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+
+def recall_at_k(index, queries, k=10, nprobe=None):
+    """
+    Measure how many of the exact nearest neighbours the index returns.
+
+    Args:
+        index (PaperIndex): Index to evaluate
+        queries (array): Query embeddings, one per row
+        k (int): Number of neighbours compared
+        nprobe (int): Number of cells scanned per query
+
+    Returns:
+        dict: Mean recall@k and mean search latency in milliseconds
+    """
+    queries = _normalize(queries)
+    vectors = index.vectors
+    recalls = []
+    elapsed = 0.0
+    for query in queries:
+        exact = set(_top_k(vectors @ query, k).tolist())
+        start = time.perf_counter()
+        ids, _ = index.search(query, k, nprobe)
+        elapsed += time.perf_counter() - start
+        recalls.append(len(exact & set(ids.tolist())) / max(len(exact), 1))
+    return {
+        'recall_at_k': float(np.mean(recalls)) if recalls else 0.0,
+        'mean_latency_ms': 1000 * elapsed / max(len(queries), 1),
+    }
+
+
+_paper_index = None
+_paper_index_lock = threading.Lock()
+_autosave_thread = None
+
+# Persist the shared index after this many insertions
+AUTOSAVE_EVERY = 256
+
+
+def _index_directory():
+    return get_cache_dir('paper_index')
+
+
+def get_paper_index(model=None):
+    """
+    Return the process-wide paper index, loading it from the cache directory.
+    An index built with another model is discarded.
+
+    Args:
+        model: Model name, path or loaded model the index is built with
+
+    Returns:
+        PaperIndex: The shared index
+    """
+    global _paper_index
+    fingerprint = model_fingerprint(get_model(model))
+    with _paper_index_lock:
+        if _paper_index is None or _paper_index.fingerprint != fingerprint:
+            directory = _index_directory()
+            index = None
+            if os.path.exists(os.path.join(directory, 'papers.json')):
+                try:
+                    index = PaperIndex.load(directory)
+                except Exception as e:
+                    logger.error(f"Failed to load paper index: {e}")
+            if index is None or index.fingerprint != fingerprint:
+                index = PaperIndex(fingerprint=fingerprint)
+            _paper_index = index
+        return _paper_index
+
+
+def index_papers(papers, model=None):
+    """
+    Add retrieved papers to the shared local index.
+
+    Args:
+        papers (list): Paper dictionaries
+        model: Model name, path or loaded model used for the embeddings
+
+    Returns:
+        int: Number of papers newly indexed
+    """
+    index = get_paper_index(model)
+    keys = [content_hash(paper_text(paper)) for paper in papers]
+    new = [i for i, key in enumerate(keys) if key not in index]
+    if not new:
+        return 0
+    new_papers = [papers[i] for i in new]
+    added = index.add([keys[i] for i in new], encode_papers(new_papers, model), new_papers)
+    if added and len(index) % AUTOSAVE_EVERY < added:
+        _autosave()
+    return added
+
+
+def _autosave():
+    """Save the shared index on a background thread, unless a save is already running."""
+    global _autosave_thread
+    with _paper_index_lock:
+        if _autosave_thread is not None and _autosave_thread.is_alive():
+            return
+        _autosave_thread = threading.Thread(target=save_paper_index, name="paper-index-save", daemon=True)
+        _autosave_thread.start()
+
+
+def search_local_papers(query, k=10, model=None, nprobe=None):
+    """
+    Answer a query from the local index without touching the network.
+
+    Args:
+        query (str): Search query
+        k (int): Number of papers to return
+        model: Model name, path or loaded model
+        nprobe (int): Number of cells to scan
+
+    Returns:
+        list: Paper dictionaries with an added 'ann_score', best first
+    """
+    index = get_paper_index(model)
+    if len(index) == 0:
+        return []
+    return index.search_papers(encode_query(query, model), k, nprobe)
+
+
+def save_paper_index():
+    """Persist the shared index if it changed since it was last saved."""
+    with _paper_index_lock:
+        index = _paper_index
+    if index is not None and index.dirty:
+        try:
+            index.save(_index_directory())
+        except Exception as e:
+            logger.error(f"Failed to save paper index: {e}")
+
+
+atexit.register(save_paper_index)
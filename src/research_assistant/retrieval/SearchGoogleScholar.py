@@ -11,66 +11,162 @@ SERPAPI_KEY = os.environ.get("SERPAPI_KEY").strip('=')[1:-1]
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 # Other imports
-from serpapi import GoogleScholarSearch
-import time
-import random
-from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from research_assistant.retrieval.SearchSemanticScholar import get_semantic_scholar_results
-from research_assistant.utils.utils import is_duplicate, similar
+from research_assistant.retrieval import http_session
+from research_assistant.retrieval.identity import (
+    ARXIV_PATTERN, DOI_PATTERN, YEAR_PATTERN, clean_doi, get_identity_resolver, graph_id_identifier,
+)
+from research_assistant.retrieval.SearchSemanticScholar import get_semantic_scholar_results, get_semantic_scholar_papers
+from research_assistant.utils.utils import TitleIndex, is_duplicate, similar
 
-def enrich_with_semantic_scholar(gs_result):
+# SerpAPI endpoint, called directly so that requests go through the shared HTTP pools
+SERPAPI_URL = "https://serpapi.com/search.json"
+
+# Hosts whose paper URLs Semantic Scholar resolves directly ("URL:<link>" identifiers)
+URL_ID_HOSTS = ("semanticscholar.org", "aclanthology.org", "aclweb.org", "acm.org", "biorxiv.org")
+
+# Minimum title similarity for a Semantic Scholar paper to replace a Google Scholar result
+MATCH_THRESHOLD = 0.9
+
+def extract_paper_id(gs_result):
     '''
-    Enrich Google Scholar results with Semantic Scholar data.
+    Resolve a Semantic Scholar identifier from the links of a Google Scholar result.
     Args:
         gs_result (dict): A single Google Scholar result.
     Returns:
-        dict: Enriched result with Semantic Scholar data.
+        str: "ARXIV:<id>", "DOI:<doi>" or "URL:<link>", or None if no link identifies the paper.
     '''
-    time.sleep(random.uniform(0.8, 1.5)) # Random sleep to avoid hitting the API too fast
-    query_title = gs_result.get("title", "")
-    sem_results = get_semantic_scholar_results(query_title, max_results=1)
-    if sem_results:
-        top_result = sem_results[0]
-        if similar(top_result["title"], query_title) >= 0.9:
-            return top_result
+    links = [gs_result.get("link", "")] + [r.get("link", "") for r in gs_result.get("resources", [])]
+    for link in filter(None, links):
+        match = ARXIV_PATTERN.search(link)
+        if match:
+            return f"ARXIV:{match.group(1)}"
+    for link in filter(None, links):
+        match = DOI_PATTERN.search(link)
+        if match:
+            return f"DOI:{clean_doi(match.group(1))}"
+    link = gs_result.get("link", "")
+    host = (urlsplit(link).hostname or "").lower()
+    if any(host == h or host.endswith("." + h) for h in URL_ID_HOSTS):
+        return f"URL:{link}"
+    return None
+
+def gs_result_to_paper(gs_result):
+    '''
+    Build a paper dictionary from the Google Scholar data alone.
+    Args:
+        gs_result (dict): A single Google Scholar result.
+    Returns:
+        dict: Paper details.
+    '''
+    summary = gs_result.get("publication_info", {}).get("summary", "")
+    # Summaries read "<authors> - <venue>, <year> - <host>"
+    year = YEAR_PATTERN.findall(summary.split(" - ")[1]) if summary.count(" - ") >= 1 else []
     return {
         "title": gs_result.get("title", ""),
         "url": gs_result.get("link", ""),
-        "year": "",
+        "year": int(year[-1]) if year else "",
         "venue": "",
-        "authors": gs_result.get("publication_info", {}).get("summary", ""),
+        "authors": summary,
         "citations": gs_result.get("inline_links", {}).get("cited_by", {}).get("total", ""),
         "abstract": gs_result.get("snippet", "")
     }
 
-def enrich_gs_results_parallel(gs_raw_results, sem_results, max_workers=5):
-    """This function takes a list of Google Scholar results and enriches them with Semantic Scholar data.
+def matches_result(paper, gs_result):
+    '''
+    Check that a Semantic Scholar paper is the one a Google Scholar result refers to.
+    Identifiers come from any link of the result, which may point at a citing or related paper.
+    Args:
+        paper (dict): Semantic Scholar paper, or None.
+        gs_result (dict): A single Google Scholar result.
+    Returns:
+        bool: Whether the titles agree.
+    '''
+    return paper is not None and similar(paper["title"], gs_result.get("title", "")) >= MATCH_THRESHOLD
+
+def enrich_with_semantic_scholar(gs_result):
+    '''
+    Enrich Google Scholar results with Semantic Scholar data.
+    Args:
+        gs_result (dict): A single Google Scholar result.
+    Returns:
+        dict: Enriched result with Semantic Scholar data.
+    '''
+    query_title = gs_result.get("title", "")
+    sem_results = get_semantic_scholar_results(query_title, max_results=1)
+    if sem_results and matches_result(sem_results[0], gs_result):
+        return sem_results[0]
+    return gs_result_to_paper(gs_result)
+
+def iter_enriched_gs_results(gs_raw_results, sem_results, max_workers=5):
+    """Enrich Google Scholar results with Semantic Scholar data, yielding each result as soon as it is ready.
+    Results already known from earlier searches come first, then the results resolved by the
+    batch lookup, then the title-search fallbacks in the order they complete. Batch-lookup
+    hits whose title does not match the result fall back to the title search.
     Args:
         gs_raw_results (list): A list of dictionaries containing Google Scholar results
         sem_results (list): A list of dictionaries containing Semantic Scholar results.
-        max_workers (int): Number of threads to use for parallel processing.
-    Returns:
-        list: List of enriched Google Scholar results.
+        max_workers (int): Number of threads to use for the title-search fallback.
+    Yields:
+        tuple: (position among the non-duplicate results, enriched result)
     """
     # Filter out duplicates first
+    sem_titles = TitleIndex(paper.get("title", "") for paper in sem_results or [])
     unique_gs = [
         res for res in gs_raw_results
-        if not is_duplicate(res.get("title", ""), sem_results)
+        if not is_duplicate(res.get("title", ""), sem_titles)
     ]
-    # Enrich the results with Semantic Scholar data in parallel
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        enriched_results = list(executor.map(enrich_with_semantic_scholar, unique_gs))
-    return enriched_results
+    pending = set(range(len(unique_gs)))
 
-def get_googlescholar_results(query, max_results=3, sem_results=None):
-    """This function takes a dictionary of parameters and returns a list of dictionaries containing the results from Google Scholar.
+    # Papers matched to Semantic Scholar in earlier searches are not looked up again
+    resolver = get_identity_resolver()
+    paper_ids = [extract_paper_id(res) for res in unique_gs]
+    for i, (res, paper_id) in enumerate(zip(unique_gs, paper_ids)):
+        known = resolver.known_record(gs_result_to_paper(res), [graph_id_identifier(paper_id)])
+        if known is not None:
+            pending.discard(i)
+            yield i, known
+
+    # Resolve identifiers and fetch all of them in one round trip
+    identified = [(i, paper_id) for i, paper_id in enumerate(paper_ids) if paper_id and i in pending]
+    if identified:
+        unique_ids = list(dict.fromkeys(paper_id for _, paper_id in identified))
+        papers = dict(zip(unique_ids, get_semantic_scholar_papers(unique_ids)))
+        for i, paper_id in identified:
+            if matches_result(papers[paper_id], unique_gs[i]):
+                pending.discard(i)
+                yield i, papers[paper_id]
+
+    # Search by title for results without an identifier or unknown to Semantic Scholar
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(enrich_with_semantic_scholar, unique_gs[i]): i for i in sorted(pending)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+def enrich_gs_results_parallel(gs_raw_results, sem_results, max_workers=5):
+    """This function takes a list of Google Scholar results and enriches them with Semantic Scholar data.
+    Results whose links carry an arXiv id, a DOI or a supported paper URL are fetched
+    together with one batch lookup; only the rest fall back to a title search each.
+    Args:
+        gs_raw_results (list): A list of dictionaries containing Google Scholar results
+        sem_results (list): A list of dictionaries containing Semantic Scholar results.
+        max_workers (int): Number of threads to use for the title-search fallback.
+    Returns:
+        list: List of enriched Google Scholar results.
+    """
+    enriched = dict(iter_enriched_gs_results(gs_raw_results, sem_results, max_workers))
+    return [enriched[i] for i in sorted(enriched)]
+
+def fetch_googlescholar_raw(query, max_results=3):
+    """Fetch the raw Google Scholar results for a query from SerpAPI, without enrichment.
     Args:
         query (str): The search query.
         max_results (int): The maximum number of results to return.
-        sem_results (list): List of Semantic Scholar results for enrichment.
     Returns:
-        list: A list of dictionaries containing Google Scholar results.
+        list: Raw SerpAPI organic results.
     """
     params = {
        "api_key": SERPAPI_KEY,
@@ -82,11 +178,29 @@ def get_googlescholar_results(query, max_results=3, sem_results=None):
         "sort": "relevance"
     }
     try:
-        search = GoogleScholarSearch(params)
-        results = search.get_dict()
-        gs_raw_results = results.get("organic_results", [])
-        return enrich_gs_results_parallel(gs_raw_results, sem_results)
+        response = http_session.get(SERPAPI_URL, params=params)
+        response.raise_for_status()
+        results = response.json()
+        if "error" in results:
+            raise RuntimeError(results["error"])
+        return results.get("organic_results", [])
     
     except Exception as e:
         print(f"Error fetching Google Scholar results: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def get_googlescholar_results(query, max_results=3, sem_results=None):
+    """This function takes a dictionary of parameters and returns a list of dictionaries containing the results from Google Scholar.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results to return.
+        sem_results (list): List of Semantic Scholar results for enrichment.
+    Returns:
+        list: A list of dictionaries containing Google Scholar results.
+    """
+    gs_raw_results = fetch_googlescholar_raw(query, max_results)
+    try:
+        return enrich_gs_results_parallel(gs_raw_results, sem_results)
+    except Exception as e:
+        print(f"Error enriching Google Scholar results: {e}")
+        return []
@@ -1,6 +1,46 @@
-import requests
-import time
-import random
+import os
+import sys
+
+# Add the project root to the Python path to ensure package imports work correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.retrieval import http_session
+
+# Paper fields requested from the Graph API
+PAPER_FIELDS = "paperId,externalIds,title,year,venue,authors,url,abstract,citationCount"
+
+# Maximum number of identifiers accepted by one batch lookup
+BATCH_SIZE = 500
+
+def semantic_scholar_url(path):
+    '''Build a Graph API URL. The base URL can be moved with RA_SEMANTIC_SCHOLAR_URL
+    (e.g. to a mirror or a local stand-in server).
+    Args:
+        path (str): Endpoint path below the base URL, e.g. "paper/search".
+    Returns:
+        str: The endpoint URL.
+    '''
+    base = os.environ.get("RA_SEMANTIC_SCHOLAR_URL", "https://api.semanticscholar.org/graph/v1")
+    return f"{base.rstrip('/')}/{path}"
+
+def format_paper(paper):
+    '''Convert a Graph API paper record to the paper dictionary used across the package.
+    Args:
+        paper (dict): Paper record returned by the API.
+    Returns:
+        dict: Paper details.
+    '''
+    return {
+        "title": paper.get("title", ""),
+        "url": paper.get("url", ""),
+        "year": paper.get("year", ""),
+        "venue": paper.get("venue", ""),
+        "authors": ", ".join([a.get("name", "") for a in paper.get("authors") or []]),
+        "citations": paper.get("citationCount", ""),
+        "abstract": paper.get("abstract", ""),
+        "paperId": paper.get("paperId", ""),
+        "externalIds": paper.get("externalIds") or {}
+    }
 
 def get_semantic_scholar_results(query, max_results=3):
     '''Search Semantic Scholar for research papers matching the query.
@@ -10,29 +50,40 @@ def get_semantic_scholar_results(query, max_results=3):
     Returns:
         list: A list of dictionaries containing paper details.
     '''
-    # Add a random delay between 1-3 seconds to avoid rate limiting
-    time.sleep(random.uniform(1, 3))
-    url = f"https://api.semanticscholar.org/graph/v1/paper/search" # Semantic Scholar API endpoint
+    url = semantic_scholar_url("paper/search") # Semantic Scholar API endpoint
     params = {
         "query": query,
         "limit": max_results,
-        "fields": "title,year,venue,authors,url,abstract,citationCount"
+        "fields": PAPER_FIELDS
     }
     try:
-        response = requests.get(url, params=params)
+        response = http_session.get(url, params=params)
         response.raise_for_status()
         papers = []
         for paper in response.json().get("data", []):
-            papers.append({
-                "title": paper.get("title", ""),
-                "url": paper.get("url", ""),
-                "year": paper.get("year", ""),
-                "venue": paper.get("venue", ""),
-                "authors": ", ".join([a.get("name", "") for a in paper.get("authors", [])]),
-                "citations": paper.get("citationCount", ""),
-                "abstract": paper.get("abstract", "")
-            })
+            papers.append(format_paper(paper))
         return papers
     except Exception as e:
         print(f"Error searching Semantic Scholar: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def get_semantic_scholar_papers(paper_ids):
+    '''Fetch papers by identifier with the batch endpoint, up to 500 per request.
+    Args:
+        paper_ids (list): Graph API identifiers, e.g. "DOI:10.1145/3292500.3330701",
+            "ARXIV:1706.03762" or "URL:https://aclanthology.org/N19-1423".
+    Returns:
+        list: A paper dictionary per identifier, or None where the paper was not found.
+    '''
+    papers = []
+    for start in range(0, len(paper_ids), BATCH_SIZE):
+        chunk = paper_ids[start:start + BATCH_SIZE]
+        try:
+            response = http_session.post(semantic_scholar_url("paper/batch"),
+                                         json={"ids": chunk}, params={"fields": PAPER_FIELDS})
+            response.raise_for_status()
+            papers.extend(format_paper(paper) if paper else None for paper in response.json())
+        except Exception as e:
+            print(f"Error fetching Semantic Scholar papers: {e}")
+            papers.extend([None] * len(chunk))
+    return papers
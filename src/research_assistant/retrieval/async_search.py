@@ -0,0 +1,315 @@
+'''
+Asynchronous retrieval from Semantic Scholar and SerpAPI (Google Scholar).
+
+The functions mirror the synchronous retrieval modules but send their requests
+with aiohttp on the running event loop, so a single thread can keep many
+upstream calls in flight instead of holding one thread per call. Every call
+goes through an AsyncSearchClient, which bounds the number of concurrent
+requests (overall and per host), waits for the upstream rate limits without
+blocking the loop, and retries transient failures like the synchronous HTTP
+layer does. Cancelling a search (or the task awaiting it) cancels its pending
+upstream requests. Responses of the known upstreams go through the same
+persistent response cache as the synchronous layer; stale entries are
+refreshed by the cache's background threads.
+
+Calls made inside ``client_scope()`` share one client and its connection pool;
+calls made outside open a client for their own duration.
+
+Configuration (environment variables):
+    RA_ASYNC_MAX_CONCURRENCY   requests in flight per client (default 100)
+    RA_ASYNC_HOST_CONCURRENCY  requests in flight per upstream host (default 20)
+The timeouts, retries and backoff are shared with http_session.py.
+'''
+
+import os
+import sys
+import asyncio
+import json as jsonlib
+import contextlib
+import contextvars
+from urllib.parse import urlsplit
+
+import aiohttp
+
+# Add the project root to the Python path to ensure package imports work correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.retrieval.http_session import (
+    RETRY_STATUSES, _env_number, fetch_text, get_retry_policy, get_timeout, retry_after,
+)
+from research_assistant.retrieval.rate_limit import limiter_for_url
+from research_assistant.retrieval.response_cache import get_response_cache
+from research_assistant.retrieval.SearchSemanticScholar import BATCH_SIZE, PAPER_FIELDS, format_paper, semantic_scholar_url
+from research_assistant.retrieval.SearchGoogleScholar import (
+    SERPAPI_KEY, SERPAPI_URL, extract_paper_id, gs_result_to_paper, matches_result,
+)
+from research_assistant.retrieval.identity import get_identity_resolver, graph_id_identifier, resolve_papers
+from research_assistant.utils.utils import TitleIndex, is_duplicate
+
+# Client shared by the calls made inside client_scope()
+_current_client = contextvars.ContextVar("async_search_client", default=None)
+
+
+class AsyncSearchClient:
+    '''
+    aiohttp session with bounded concurrency, rate limiting and retries.
+    Use as an async context manager; the client belongs to the event loop it was opened on.
+    '''
+
+    def __init__(self, max_concurrency=None, host_concurrency=None, retries=None, backoff=None):
+        '''
+        Args:
+            max_concurrency (int): Requests in flight. Defaults to RA_ASYNC_MAX_CONCURRENCY.
+            host_concurrency (int): Requests in flight per host. Defaults to RA_ASYNC_HOST_CONCURRENCY.
+            retries (int): Retries per request. Defaults to RA_HTTP_RETRIES.
+            backoff (float): Backoff factor in seconds. Defaults to RA_HTTP_BACKOFF.
+        '''
+        self.max_concurrency = max_concurrency or _env_number("RA_ASYNC_MAX_CONCURRENCY", 100, int)
+        self.host_concurrency = host_concurrency or _env_number("RA_ASYNC_HOST_CONCURRENCY", 20, int)
+        default_retries, default_backoff = get_retry_policy()
+        self.retries = retries if retries is not None else default_retries
+        self.backoff = backoff if backoff is not None else default_backoff
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._host_semaphores = {}
+        self._session = None
+
+    async def __aenter__(self):
+        connect, read = get_timeout()
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.host_concurrency),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+        self._session = None
+
+    def _host_semaphore(self, host):
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.host_concurrency)
+        return self._host_semaphores[host]
+
+    async def request_json(self, method, url, params=None, json=None):
+        '''Send a request and return its decoded JSON body.
+        Waits for the host's rate limit first and retries connection errors,
+        timeouts and 429/5xx responses with exponential backoff, honouring Retry-After.
+        Args:
+            method (str): HTTP method.
+            url (str): Request URL.
+            params (dict): Query parameters.
+            json: JSON request body.
+        Returns:
+            The decoded response body.
+        '''
+        # The cache is SQLite-backed, so lookups and writes run off the event loop
+        cache = await asyncio.to_thread(get_response_cache)
+        if cache is not None and cache.caches(method, url):
+            cached = await asyncio.to_thread(cache.get, method, url, params, json,
+                                             refresh=lambda: fetch_text(method, url, params=params, json=json))
+            if cached is not None:
+                return jsonlib.loads(cached[0])
+        else:
+            cache = None
+        body = await self._fetch_text(method, url, params, json)
+        if cache is not None:
+            await asyncio.to_thread(cache.put, method, url, params, json, body)
+        return jsonlib.loads(body)
+
+    async def _fetch_text(self, method, url, params, json):
+        limiter = limiter_for_url(url)
+        host = urlsplit(url).hostname or ""
+        for attempt in range(self.retries + 1):
+            if limiter is not None:
+                wait = limiter.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            delay = self.backoff * (2 ** attempt)
+            try:
+                async with self._semaphore, self._host_semaphore(host):
+                    async with self._session.request(method, url, params=params, json=json) as response:
+                        if response.status not in RETRY_STATUSES or attempt == self.retries:
+                            response.raise_for_status()
+                            return await response.text()
+                        delay = retry_after(response.headers.get("Retry-After")) or delay
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(delay)
+
+    async def get_json(self, url, params=None):
+        '''Send a GET request and return its decoded JSON body.'''
+        return await self.request_json("GET", url, params=params)
+
+    async def post_json(self, url, json=None, params=None):
+        '''Send a POST request and return its decoded JSON body.'''
+        return await self.request_json("POST", url, params=params, json=json)
+
+
+@contextlib.asynccontextmanager
+async def client_scope():
+    '''Share one client between every search made inside the scope.
+    Reuses the client of an enclosing scope if there is one.
+    Yields:
+        AsyncSearchClient: The shared client.
+    '''
+    client = _current_client.get()
+    if client is not None:
+        yield client
+        return
+    async with AsyncSearchClient() as client:
+        token = _current_client.set(client)
+        try:
+            yield client
+        finally:
+            _current_client.reset(token)
+
+
+async def get_semantic_scholar_results_async(query, max_results=3):
+    '''Search Semantic Scholar for research papers matching the query.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results to return.
+    Returns:
+        list: A list of dictionaries containing paper details.
+    '''
+    params = {"query": query, "limit": max_results, "fields": PAPER_FIELDS}
+    try:
+        async with client_scope() as client:
+            data = await client.get_json(semantic_scholar_url("paper/search"), params=params)
+        return [format_paper(paper) for paper in data.get("data", [])]
+    except Exception as e:
+        print(f"Error searching Semantic Scholar: {e}")
+        return []
+
+
+async def get_semantic_scholar_papers_async(paper_ids):
+    '''Fetch papers by identifier with the batch endpoint, up to 500 per request.
+    Args:
+        paper_ids (list): Graph API identifiers, e.g. "DOI:10.1145/3292500.3330701".
+    Returns:
+        list: A paper dictionary per identifier, or None where the paper was not found.
+    '''
+    async def fetch_chunk(client, chunk):
+        try:
+            data = await client.post_json(semantic_scholar_url("paper/batch"),
+                                          json={"ids": chunk}, params={"fields": PAPER_FIELDS})
+            return [format_paper(paper) if paper else None for paper in data]
+        except Exception as e:
+            print(f"Error fetching Semantic Scholar papers: {e}")
+            return [None] * len(chunk)
+
+    async with client_scope() as client:
+        chunks = await asyncio.gather(*(fetch_chunk(client, paper_ids[start:start + BATCH_SIZE])
+                                        for start in range(0, len(paper_ids), BATCH_SIZE)))
+    return [paper for chunk in chunks for paper in chunk]
+
+
+async def fetch_googlescholar_raw_async(query, max_results=3):
+    '''Fetch the raw Google Scholar results for a query from SerpAPI, without enrichment.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results to return.
+    Returns:
+        list: Raw SerpAPI organic results.
+    '''
+    params = {
+        "api_key": SERPAPI_KEY,
+        "engine": "google_scholar",
+        "q": query,
+        "hl": "en",
+        "start": "0",
+        "num": max_results,
+        "sort": "relevance"
+    }
+    try:
+        async with client_scope() as client:
+            results = await client.get_json(SERPAPI_URL, params=params)
+        if "error" in results:
+            raise RuntimeError(results["error"])
+        return results.get("organic_results", [])
+    except Exception as e:
+        print(f"Error fetching Google Scholar results: {e}")
+        return []
+
+
+async def enrich_with_semantic_scholar_async(gs_result):
+    '''Enrich a Google Scholar result with the Semantic Scholar paper of the same title.
+    Args:
+        gs_result (dict): A single Google Scholar result.
+    Returns:
+        dict: Enriched result with Semantic Scholar data.
+    '''
+    query_title = gs_result.get("title", "")
+    sem_results = await get_semantic_scholar_results_async(query_title, max_results=1)
+    if sem_results and matches_result(sem_results[0], gs_result):
+        return sem_results[0]
+    return gs_result_to_paper(gs_result)
+
+
+async def enrich_gs_results_async(gs_raw_results, sem_results):
+    '''Drop Google Scholar results already found on Semantic Scholar and enrich the rest,
+    with one batch lookup for identified results and concurrent title searches for the others.
+    Args:
+        gs_raw_results (list): Raw Google Scholar results.
+        sem_results (list): Semantic Scholar results.
+    Returns:
+        list: List of enriched Google Scholar results.
+    '''
+    sem_titles = TitleIndex(paper.get("title", "") for paper in sem_results or [])
+    unique_gs = [res for res in gs_raw_results if not is_duplicate(res.get("title", ""), sem_titles)]
+    paper_ids = [extract_paper_id(res) for res in unique_gs]
+
+    def known_records():
+        resolver = get_identity_resolver()
+        return [resolver.known_record(gs_result_to_paper(res), [graph_id_identifier(paper_id)])
+                for res, paper_id in zip(unique_gs, paper_ids)]
+
+    # The identity map is SQLite-backed, so it is read off the event loop
+    enriched_results = await asyncio.to_thread(known_records)
+
+    identified = [(i, paper_id) for i, paper_id in enumerate(paper_ids) if paper_id and enriched_results[i] is None]
+    if identified:
+        unique_ids = list(dict.fromkeys(paper_id for _, paper_id in identified))
+        papers = dict(zip(unique_ids, await get_semantic_scholar_papers_async(unique_ids)))
+        for i, paper_id in identified:
+            # Ids may come from a link to another paper; mismatches fall back to the title search
+            if matches_result(papers[paper_id], unique_gs[i]):
+                enriched_results[i] = papers[paper_id]
+
+    remaining = [i for i, paper in enumerate(enriched_results) if paper is None]
+    papers = await asyncio.gather(*(enrich_with_semantic_scholar_async(unique_gs[i]) for i in remaining))
+    for i, paper in zip(remaining, papers):
+        enriched_results[i] = paper
+    return enriched_results
+
+
+async def get_googlescholar_results_async(query, max_results=3, sem_results=None):
+    '''Search Google Scholar and enrich the results with Semantic Scholar data.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results to return.
+        sem_results (list): Semantic Scholar results used for deduplication.
+    Returns:
+        list: A list of dictionaries containing Google Scholar results.
+    '''
+    async with client_scope():
+        gs_raw_results = await fetch_googlescholar_raw_async(query, max_results)
+        return await enrich_gs_results_async(gs_raw_results, sem_results)
+
+
+async def search_live_async(query, max_results=3):
+    '''Search Semantic Scholar and Google Scholar concurrently, then merge the results.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results per source.
+    Returns:
+        list: Semantic Scholar results followed by the non-duplicate Google Scholar results.
+    '''
+    async with client_scope():
+        sem_results, gs_raw_results = await asyncio.gather(
+            get_semantic_scholar_results_async(query, max_results),
+            fetch_googlescholar_raw_async(query, max_results),
+        )
+        gs_results = await enrich_gs_results_async(gs_raw_results, sem_results)
+    return await asyncio.to_thread(resolve_papers, sem_results + gs_results)
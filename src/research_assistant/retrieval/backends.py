@@ -0,0 +1,97 @@
+import os
+import sys
+import asyncio
+
+# Add the project root to the Python path to ensure package imports work correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.retrieval.local_corpus import LocalCorpus
+
+class RetrievalBackend:
+    """
+    Interface for sources that search_papers can retrieve papers from.
+    Backends return paper dictionaries with title, url, year, venue, authors,
+    citations and abstract fields.
+    """
+
+    name = "backend"
+
+    def search(self, query, max_results=3):
+        '''
+        Search the backend for papers matching the query.
+        Args:
+            query (str): The search query.
+            max_results (int): The maximum number of results to return.
+        Returns:
+            list: A list of dictionaries containing paper details.
+        '''
+        raise NotImplementedError
+
+    async def search_async(self, query, max_results=3):
+        '''
+        Search the backend without blocking the event loop. Backends without
+        native asynchronous I/O run their synchronous search in a worker thread.
+        Args:
+            query (str): The search query.
+            max_results (int): The maximum number of results to return.
+        Returns:
+            list: A list of dictionaries containing paper details.
+        '''
+        return await asyncio.to_thread(self.search, query, max_results)
+
+class LocalCorpusBackend(RetrievalBackend):
+    """
+    Offline backend answering from a local SQLite/FTS5 corpus.
+    """
+
+    name = "local"
+
+    def __init__(self, corpus=None):
+        '''
+        Args:
+            corpus (LocalCorpus): Corpus to search. Defaults to the corpus at RA_CORPUS_DB.
+        '''
+        self.corpus = corpus or LocalCorpus()
+
+    def search(self, query, max_results=3):
+        return self.corpus.search(query, max_results)
+
+class FallbackBackend(RetrievalBackend):
+    """
+    Chains backends, asking the next one only while fewer than max_results papers were found.
+    """
+
+    name = "fallback"
+
+    def __init__(self, backends):
+        '''
+        Args:
+            backends (list): Backends in order of preference.
+        '''
+        self.backends = list(backends)
+
+    def search(self, query, max_results=3):
+        results = []
+        seen_titles = set()
+        for backend in self.backends:
+            if len(results) >= max_results:
+                break
+            for paper in backend.search(query, max_results):
+                title = " ".join(paper.get("title", "").lower().split())
+                if title not in seen_titles:
+                    seen_titles.add(title)
+                    results.append(paper)
+        return results
+
+    async def search_async(self, query, max_results=3):
+        results = []
+        seen_titles = set()
+        for backend in self.backends:
+            if len(results) >= max_results:
+                break
+            for paper in await backend.search_async(query, max_results):
+                title = " ".join(paper.get("title", "").lower().split())
+                if title not in seen_titles:
+                    seen_titles.add(title)
+                    results.append(paper)
+        return results
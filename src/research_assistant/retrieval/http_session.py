@@ -0,0 +1,207 @@
+'''
+Shared HTTP layer for every outbound call of the retrieval modules.
+
+Each thread gets its own requests.Session, but all sessions mount the same
+HTTPAdapter, whose urllib3 connection pools are thread-safe. Connections to
+Semantic Scholar and SerpAPI are therefore kept alive and reused across
+searches and across the enrichment thread pool instead of paying a new TCP
+and TLS handshake per call. Connection errors are retried by the adapter;
+429 and 5xx responses are retried by _send with exponential backoff,
+honouring Retry-After. Every attempt to a rate-limited host first takes a
+token from the host's limiter (see rate_limit.py), so requests wait only when
+the quota is exhausted and retries count against it like any other request.
+Responses of the known upstreams are served from the persistent response
+cache when possible (see response_cache.py); cached answers carry an
+"X-Cache: fresh" or "X-Cache: stale" header.
+
+Configuration (environment variables):
+    RA_HTTP_POOL_SIZE        connections kept per host (default 20)
+    RA_HTTP_CONNECT_TIMEOUT  seconds to establish a connection (default 5)
+    RA_HTTP_READ_TIMEOUT     seconds to wait for a response (default 30)
+    RA_HTTP_RETRIES          retries per request (default 3)
+    RA_HTTP_BACKOFF          backoff factor in seconds (default 0.5)
+'''
+
+import os
+import sys
+import time
+import threading
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Add the project root to the Python path to ensure package imports work correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.retrieval.rate_limit import limiter_for_url
+from research_assistant.retrieval.response_cache import get_response_cache
+
+# Responses worth retrying: rate limited or a temporary server-side failure
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_adapter = None
+_adapter_lock = threading.Lock()
+_local = threading.local()
+
+
+def _env_number(name, default, cast=float):
+    value = os.environ.get(name)
+    return cast(value) if value not in (None, "") else default
+
+
+def get_timeout():
+    '''Return the (connect, read) timeout applied to every request.
+    Returns:
+        tuple: Connect and read timeouts in seconds.
+    '''
+    return (_env_number("RA_HTTP_CONNECT_TIMEOUT", 5.0), _env_number("RA_HTTP_READ_TIMEOUT", 30.0))
+
+
+def get_retry_policy():
+    '''Return the (retries, backoff factor) applied to every request.'''
+    return _env_number("RA_HTTP_RETRIES", 3, int), _env_number("RA_HTTP_BACKOFF", 0.5)
+
+
+def retry_after(value):
+    '''Parse a Retry-After header (seconds or HTTP date) into seconds, or None.'''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def build_adapter(pool_size=None, retries=None, backoff=None):
+    '''Create an HTTPAdapter with keep-alive pools that retries connection errors with backoff.
+    Responses are not retried here, since a retry inside the adapter would bypass the
+    rate limiter; _send retries them instead.
+    Args:
+        pool_size (int): Connections kept per host. Defaults to RA_HTTP_POOL_SIZE.
+        retries (int): Retries per request. Defaults to RA_HTTP_RETRIES.
+        backoff (float): Backoff factor in seconds. Defaults to RA_HTTP_BACKOFF.
+    Returns:
+        HTTPAdapter: The configured adapter.
+    '''
+    pool_size = pool_size if pool_size is not None else _env_number("RA_HTTP_POOL_SIZE", 20, int)
+    default_retries, default_backoff = get_retry_policy()
+    retries = retries if retries is not None else default_retries
+    backoff = backoff if backoff is not None else default_backoff
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status=0,
+        # Semantic Scholar's batch lookup is a read-only POST
+        allowed_methods=frozenset(["GET", "HEAD", "POST"]),
+        raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry, pool_block=False)
+
+
+def get_adapter():
+    '''Return the process-wide adapter holding the connection pools.'''
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            _adapter = build_adapter()
+        return _adapter
+
+
+def get_session():
+    '''Return the calling thread's session, mounted on the shared adapter.
+    Returns:
+        requests.Session: Session to send requests with.
+    '''
+    session = getattr(_local, "session", None)
+    if session is None or getattr(_local, "adapter", None) is not get_adapter():
+        session = requests.Session()
+        adapter = get_adapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session, _local.adapter = session, adapter
+    return session
+
+
+def reset():
+    '''Drop the shared adapter and its pools, e.g. after changing the configuration.'''
+    global _adapter
+    with _adapter_lock:
+        if _adapter is not None:
+            _adapter.close()
+        _adapter = None
+
+
+def _send(method, url, **kwargs):
+    kwargs.setdefault("timeout", get_timeout())
+    limiter = limiter_for_url(url)
+    retries, backoff = get_retry_policy()
+    for attempt in range(retries + 1):
+        # Every attempt takes a token, so retries stay within the upstream's quota
+        if limiter is not None:
+            limiter.acquire()
+        response = get_session().request(method, url, **kwargs)
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        delay = retry_after(response.headers.get("Retry-After")) or backoff * (2 ** attempt)
+        response.close()
+        time.sleep(delay)
+
+
+def _cached_response(url, body, state):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body.encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = url
+    response.headers["Content-Type"] = "application/json"
+    response.headers["X-Cache"] = state
+    return response
+
+
+def fetch_text(method, url, **kwargs):
+    '''Send a request bypassing the response cache.
+    Returns:
+        str: The body of a successful response, or None.
+    '''
+    response = _send(method, url, **kwargs)
+    return response.text if response.status_code == 200 else None
+
+
+def request(method, url, **kwargs):
+    '''Send a request through the shared pools with the default timeout,
+    waiting for the upstream rate limit first. Cached responses are returned
+    without contacting the upstream.
+    Args:
+        method (str): HTTP method.
+        url (str): Request URL.
+        **kwargs: Passed on to requests.Session.request.
+    Returns:
+        requests.Response: The response (after retries).
+    '''
+    cache = get_response_cache()
+    if cache is None or not cache.caches(method, url):
+        return _send(method, url, **kwargs)
+    params, json_body = kwargs.get("params"), kwargs.get("json")
+    cached = cache.get(method, url, params, json_body, refresh=lambda: fetch_text(method, url, **kwargs))
+    if cached is not None:
+        return _cached_response(url, *cached)
+    response = _send(method, url, **kwargs)
+    if response.status_code == 200:
+        cache.put(method, url, params, json_body, response.text)
+    return response
+
+
+def get(url, params=None, **kwargs):
+    '''Send a GET request through the shared pools.'''
+    return request("GET", url, params=params, **kwargs)
+
+
+def post(url, json=None, **kwargs):
+    '''Send a POST request through the shared pools.'''
+    return request("POST", url, json=json, **kwargs)
@@ -0,0 +1,380 @@
+'''
+Cross-source paper identity resolution.
+
+Semantic Scholar and Google Scholar describe the same paper with different
+fields, and the same paper comes back for many queries. The resolver assigns
+every paper a canonical id and merges the records that describe it, so a
+paper is enriched, embedded and ranked once.
+
+Two records are the same paper when they share a strong identifier (Semantic
+Scholar paperId, DOI or arXiv id), or when their normalized titles match
+(equal, or similar() >= 0.9) and neither their years (at most one apart, for
+preprints), their author surnames nor the numbers in their titles contradict it.
+
+Identifiers and merged records are kept in a SQLite database, so that papers
+are recognized across queries and restarts: a Google Scholar hit whose DOI
+or title is already known reuses the stored Semantic Scholar record instead
+of being looked up again.
+
+Configuration (environment variables):
+    RA_IDENTITY_DB   database file (default <cache dir>/identity/papers.sqlite)
+    RA_IDENTITY      set to 0 to keep the identity map in memory only
+'''
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+# Add the project root to the Python path to ensure package imports work correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.utils.utils import TitleIndex, get_cache_dir
+
+DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s?#&]+)')
+ARXIV_PATTERN = re.compile(r'arxiv\.org/(?:abs|pdf)/([a-z\-]+/\d{7}|\d{4}\.\d{4,5})(?:v\d+)?', re.IGNORECASE)
+YEAR_PATTERN = re.compile(r'\b(19\d{2}|20\d{2})\b')
+
+# Identifier kinds, strongest first; the strongest known identifier becomes the canonical id
+STRONG_KINDS = ("s2", "doi", "arxiv")
+
+# Fields of a paper record (see SearchSemanticScholar.format_paper) that are persisted;
+# per-request fields such as scores and the canonical id are not
+RECORD_FIELDS = ("title", "url", "year", "venue", "authors", "citations", "abstract", "paperId", "externalIds")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS identifiers (
+    identifier TEXT PRIMARY KEY,
+    canonical_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS identifiers_canonical ON identifiers(canonical_id);
+CREATE TABLE IF NOT EXISTS records (
+    canonical_id TEXT PRIMARY KEY,
+    record TEXT NOT NULL
+);
+"""
+
+
+def clean_doi(doi):
+    '''Strip the suffixes publishers append to DOIs in links and lowercase the DOI.'''
+    doi = re.sub(r'(\.pdf|/full|/abstract|/pdf)$', '', doi.rstrip('/.'), flags=re.IGNORECASE)
+    return doi.lower()
+
+
+def normalize_title(title):
+    '''
+    Normalize a title for comparison: accents, case, punctuation and spacing are dropped.
+    Args:
+        title (str): Paper title.
+    Returns:
+        str: Normalized title.
+    '''
+    text = unicodedata.normalize("NFKD", title or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return " ".join(re.sub(r'[^0-9a-z]+', ' ', text).split())
+
+
+def paper_year(paper):
+    '''Return the publication year of a paper as an int, or None.'''
+    match = YEAR_PATTERN.search(str(paper.get("year") or ""))
+    return int(match.group(1)) if match else None
+
+
+def author_surnames(paper):
+    '''
+    Return the lowercased surnames of a paper's authors.
+    Handles "First Last, First Last" lists as well as Google Scholar summaries
+    such as "A Vaswani, N Shazeer… - Advances in neural …, 2017 - neurips.cc".
+    '''
+    authors = paper.get("authors") or ""
+    if isinstance(authors, list):
+        authors = ", ".join(a.get("name", "") if isinstance(a, dict) else str(a) for a in authors)
+    authors = authors.split(" - ")[0]
+    surnames = set()
+    for name in authors.split(","):
+        words = normalize_title(name).split()
+        if words and len(words[-1]) > 1:
+            surnames.add(words[-1])
+    return surnames
+
+
+def paper_identifiers(paper):
+    '''
+    Collect the strong identifiers of a paper record.
+    Args:
+        paper (dict): Paper dictionary, optionally with paperId and externalIds.
+    Returns:
+        list: Identifiers such as "s2:<paperId>", "doi:<doi>" and "arxiv:<id>".
+    '''
+    identifiers = []
+    if paper.get("paperId"):
+        identifiers.append(f"s2:{paper['paperId']}")
+    external = paper.get("externalIds") or {}
+    if external.get("DOI"):
+        identifiers.append(f"doi:{clean_doi(external['DOI'])}")
+    if external.get("ArXiv"):
+        identifiers.append(f"arxiv:{external['ArXiv'].lower()}")
+    for link in filter(None, [paper.get("url"), paper.get("link")]):
+        match = ARXIV_PATTERN.search(link)
+        if match:
+            identifiers.append(f"arxiv:{match.group(1).lower()}")
+        match = DOI_PATTERN.search(link)
+        if match:
+            identifiers.append(f"doi:{clean_doi(match.group(1))}")
+    return list(dict.fromkeys(identifiers))
+
+
+def graph_id_identifier(paper_id):
+    '''Convert a Graph API identifier such as "DOI:<doi>" or "ARXIV:<id>" to an identity map identifier, or None.'''
+    kind, _, value = (paper_id or "").partition(":")
+    if kind == "DOI" and value:
+        return f"doi:{clean_doi(value)}"
+    if kind == "ARXIV" and value:
+        return f"arxiv:{value.lower()}"
+    return None
+
+
+def title_key(paper):
+    '''Return the identifier of a paper's normalized title, or None for an empty title.'''
+    title = normalize_title(paper.get("title", ""))
+    return f"title:{hashlib.sha1(title.encode('utf-8')).hexdigest()}" if title else None
+
+
+def compatible(a, b):
+    '''Check that neither the years, the authors nor the numbers in the titles
+    (e.g. "Part 1" and "Part 2") of two records with matching titles contradict each other.'''
+    if re.findall(r'\d+', normalize_title(a.get("title", ""))) != re.findall(r'\d+', normalize_title(b.get("title", ""))):
+        return False
+    year_a, year_b = paper_year(a), paper_year(b)
+    if year_a is not None and year_b is not None and abs(year_a - year_b) > 1:
+        return False
+    authors_a, authors_b = author_surnames(a), author_surnames(b)
+    return not (authors_a and authors_b and not authors_a & authors_b)
+
+
+def _is_empty(value):
+    return value is None or value == "" or value == [] or value == {}
+
+
+def merge_records(a, b):
+    '''
+    Merge two records of the same paper. The Semantic Scholar record wins
+    where both have a value, except that the higher citation count and the
+    longer abstract are kept.
+    Args:
+        a (dict): First record.
+        b (dict): Second record.
+    Returns:
+        dict: The merged record.
+    '''
+    primary, secondary = (b, a) if b.get("paperId") and not a.get("paperId") else (a, b)
+    merged = dict(secondary)
+    merged.update({key: value for key, value in primary.items() if not _is_empty(value)})
+    citations = [c for c in (a.get("citations"), b.get("citations")) if isinstance(c, int) or str(c).isdigit()]
+    if citations:
+        merged["citations"] = max(int(c) for c in citations)
+    abstracts = [text for text in (a.get("abstract"), b.get("abstract")) if text]
+    if abstracts:
+        merged["abstract"] = max(abstracts, key=len)
+    external = dict(secondary.get("externalIds") or {})
+    external.update(primary.get("externalIds") or {})
+    if external:
+        merged["externalIds"] = external
+    return merged
+
+
+def _strength(canonical_id):
+    kind = canonical_id.split(":", 1)[0]
+    return STRONG_KINDS.index(kind) if kind in STRONG_KINDS else len(STRONG_KINDS)
+
+
+class IdentityResolver:
+    """
+    Persistent map from paper identifiers to canonical ids and merged records.
+    """
+
+    def __init__(self, path=None):
+        '''
+        Open (or create) an identity map.
+        Args:
+            path (str): Database file, or ":memory:". Defaults to RA_IDENTITY_DB or the cache directory.
+        '''
+        self.path = path or os.environ.get("RA_IDENTITY_DB") or os.path.join(
+            get_cache_dir("identity"), "papers.sqlite")
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._memory_conn = None
+        if self.path == ":memory:":
+            # Every connection to ":memory:" is a separate database, so threads share one
+            self._memory_conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connection(self):
+        if self._memory_conn is not None:
+            return self._memory_conn
+        # SQLite connections cannot be shared between threads, so each thread gets its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _canonical(self, identifier):
+        row = self._connection().execute(
+            "SELECT canonical_id FROM identifiers WHERE identifier = ?", (identifier,)).fetchone()
+        return row[0] if row else None
+
+    def get_record(self, canonical_id):
+        '''Return the merged record stored for a canonical id, or None.'''
+        row = self._connection().execute(
+            "SELECT record FROM records WHERE canonical_id = ?", (canonical_id,)).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        return {field: record[field] for field in RECORD_FIELDS if field in record}
+
+    def lookup(self, paper, identifiers=()):
+        '''
+        Find the canonical id of a paper seen before.
+        Args:
+            paper (dict): Paper dictionary.
+            identifiers (iterable): Further identifiers of the paper, e.g. from graph_id_identifier.
+        Returns:
+            str: The canonical id, or None for an unknown paper.
+        '''
+        with self._lock:
+            for identifier in [i for i in identifiers if i] + paper_identifiers(paper):
+                canonical_id = self._canonical(identifier)
+                if canonical_id is not None:
+                    return canonical_id
+            key = title_key(paper)
+            canonical_id = self._canonical(key) if key else None
+            if canonical_id is not None:
+                record = self.get_record(canonical_id)
+                if record is not None and compatible(record, paper):
+                    return canonical_id
+            return None
+
+    def known_record(self, paper, identifiers=()):
+        '''
+        Return the stored Semantic Scholar record of a paper seen before, so that
+        it does not need to be looked up again.
+        Args:
+            paper (dict): Paper dictionary.
+            identifiers (iterable): Further identifiers of the paper.
+        Returns:
+            dict: The merged record, or None if the paper is unknown or was never
+                matched to Semantic Scholar.
+        '''
+        canonical_id = self.lookup(paper, identifiers)
+        record = self.get_record(canonical_id) if canonical_id else None
+        return record if record is not None and record.get("paperId") else None
+
+    def _register(self, record):
+        '''Assign a canonical id to a merged record, joining it with stored records of the same paper.'''
+        identifiers = paper_identifiers(record)
+        key = title_key(record)
+        existing = [self._canonical(identifier) for identifier in identifiers]
+        if key:
+            canonical_id = self._canonical(key)
+            stored = self.get_record(canonical_id) if canonical_id else None
+            if stored is not None and compatible(stored, record):
+                existing.append(canonical_id)
+        existing = list(dict.fromkeys(c for c in existing if c))
+        candidates = existing + identifiers + ([key] if key else [])
+        canonical_id = min(candidates, key=_strength) if candidates else None
+        if canonical_id is None:
+            return record
+
+        conn = self._connection()
+        merged = dict(record)
+        for other in existing:
+            stored = self.get_record(other)
+            if stored is not None:
+                merged = merge_records(merged, stored)
+            if other != canonical_id:
+                # Two canonical ids turned out to be the same paper: fold the weaker one in
+                conn.execute("UPDATE identifiers SET canonical_id = ? WHERE canonical_id = ?", (canonical_id, other))
+                conn.execute("DELETE FROM records WHERE canonical_id = ?", (other,))
+        merged["canonical_id"] = canonical_id
+        names = paper_identifiers(merged) + ([key] if key else []) + [canonical_id]
+        conn.executemany("INSERT OR REPLACE INTO identifiers (identifier, canonical_id) VALUES (?, ?)",
+                         [(name, canonical_id) for name in dict.fromkeys(names)])
+        conn.execute("INSERT OR REPLACE INTO records (canonical_id, record) VALUES (?, ?)",
+                     (canonical_id, json.dumps({field: merged[field] for field in RECORD_FIELDS if field in merged})))
+        return merged
+
+    def resolve(self, papers):
+        '''
+        Merge the records of the same paper and assign canonical ids.
+        Args:
+            papers (list): Paper dictionaries from any source and query.
+        Returns:
+            list: One merged record per paper, in order of first appearance, each
+                with a "canonical_id" field.
+        '''
+        records = []
+        by_identifier = {}
+        titles = TitleIndex()
+        title_owner = []
+        for paper in papers:
+            identifiers = paper_identifiers(paper)
+            position = next((by_identifier[i] for i in identifiers if i in by_identifier), None)
+            if position is None:
+                for title_id in titles.find_similar(normalize_title(paper.get("title", ""))):
+                    if compatible(records[title_owner[title_id]], paper):
+                        position = title_owner[title_id]
+                        break
+            if position is None:
+                position = len(records)
+                records.append(dict(paper))
+            else:
+                records[position] = merge_records(records[position], paper)
+            for identifier in paper_identifiers(records[position]):
+                by_identifier[identifier] = position
+            if normalize_title(paper.get("title", "")):
+                titles.add(normalize_title(paper.get("title", "")))
+                title_owner.append(position)
+
+        with self._lock:
+            resolved = [self._register(record) for record in records]
+            self._connection().commit()
+
+        # Records of different positions may have been folded into the same stored paper
+        unique = {}
+        for record in resolved:
+            canonical_id = record.get("canonical_id")
+            if canonical_id in unique:
+                unique[canonical_id] = merge_records(unique[canonical_id], record)
+            else:
+                unique[canonical_id if canonical_id else id(record)] = record
+        return list(unique.values())
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_identity_resolver():
+    '''
+    Return the process-wide identity resolver.
+    Returns:
+        IdentityResolver: Persistent resolver, or an in-memory one if RA_IDENTITY=0.
+    '''
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = IdentityResolver(":memory:" if os.environ.get("RA_IDENTITY", "1") == "0" else None)
+        return _resolver
+
+
+def resolve_papers(papers):
+    '''Merge the records of the same paper with the process-wide resolver (see IdentityResolver.resolve).'''
+    return get_identity_resolver().resolve(papers)
@@ -1,14 +1,203 @@
 # imports
 import os
 import sys
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the project root to the Python path to ensure package imports work correctly
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 from research_assistant.retrieval.SearchSemanticScholar import get_semantic_scholar_results
-from research_assistant.retrieval.SearchGoogleScholar import get_googlescholar_results
+from research_assistant.retrieval.SearchGoogleScholar import (
+    fetch_googlescholar_raw, enrich_gs_results_parallel, iter_enriched_gs_results,
+)
+from research_assistant.retrieval.identity import resolve_papers
+from research_assistant.retrieval.backends import RetrievalBackend, LocalCorpusBackend, FallbackBackend
 
-def search_papers(query, max_results=3):
-    sem_results = get_semantic_scholar_results(query, max_results)
-    gs_results = get_googlescholar_results(query, max_results, sem_results)
-    return sem_results + gs_results
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+# Threads running the source queries of concurrent searches
+_source_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+# Callbacks notified with every batch of retrieved papers (e.g. the local paper index)
+_paper_observers = []
+
+def register_paper_observer(callback):
+    """Register a callback called as callback(query, papers) after every search.
+    Args:
+        callback (callable): Function receiving the query and the retrieved papers.
+    """
+    if callback not in _paper_observers:
+        _paper_observers.append(callback)
+
+def _notify_observers(query, papers):
+    for callback in _paper_observers:
+        try:
+            callback(query, papers)
+        except Exception as e:
+            logger.error(f"Paper observer {callback} failed: {e}")
+
+def search_live(query, max_results=3):
+    """Search Semantic Scholar and Google Scholar (enriched with Semantic Scholar data).
+    Both sources are queried concurrently; deduplication against the Semantic Scholar
+    results and enrichment of the remaining Google Scholar hits run once both are back,
+    and records of the same paper are merged by the identity resolver.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results per source.
+    Returns:
+        list: Semantic Scholar results followed by the non-duplicate Google Scholar results.
+    """
+    sem_future = _source_executor.submit(get_semantic_scholar_results, query, max_results)
+    gs_future = _source_executor.submit(fetch_googlescholar_raw, query, max_results)
+    sem_results = sem_future.result()
+    gs_raw_results = gs_future.result()
+    try:
+        gs_results = enrich_gs_results_parallel(gs_raw_results, sem_results)
+    except Exception as e:
+        logger.error(f"Failed to merge Google Scholar results: {e}")
+        gs_results = []
+    return resolve_papers(sem_results + gs_results)
+
+def search_live_stream(query, max_results=3):
+    """Search Semantic Scholar and Google Scholar concurrently, yielding results as they arrive.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results per source.
+    Yields:
+        tuple: ("semantic_scholar", papers) once the Semantic Scholar hits are in, then
+            ("google_scholar", [paper]) for each non-duplicate Google Scholar hit as soon
+            as its enrichment completes.
+    """
+    sem_future = _source_executor.submit(get_semantic_scholar_results, query, max_results)
+    gs_future = _source_executor.submit(fetch_googlescholar_raw, query, max_results)
+    sem_results = sem_future.result()
+    yield "semantic_scholar", sem_results
+    # Google Scholar hits are deduplicated against the Semantic Scholar ones before enrichment
+    gs_raw_results = gs_future.result()
+    try:
+        for _, paper in iter_enriched_gs_results(gs_raw_results, sem_results):
+            yield "google_scholar", [paper]
+    except Exception as e:
+        logger.error(f"Failed to merge Google Scholar results: {e}")
+
+class LiveBackend(RetrievalBackend):
+    """
+    Backend querying the live Semantic Scholar and SerpAPI (Google Scholar) APIs.
+    """
+
+    name = "live"
+
+    def search(self, query, max_results=3):
+        return search_live(query, max_results)
+
+    async def search_async(self, query, max_results=3):
+        # Imported here so that the synchronous search works without aiohttp installed
+        from research_assistant.retrieval.async_search import search_live_async
+        return await search_live_async(query, max_results)
+
+_default_backend = None
+
+def create_backend(name):
+    """Create a retrieval backend from its configuration name.
+    Args:
+        name (str): "live", "local", or "local+live" (local corpus with the live APIs as fallback).
+    Returns:
+        RetrievalBackend: The configured backend.
+    """
+    if name == "live":
+        return LiveBackend()
+    if name == "local":
+        return LocalCorpusBackend()
+    if name == "local+live":
+        return FallbackBackend([LocalCorpusBackend(), LiveBackend()])
+    raise ValueError(f"Unknown retrieval backend: {name}")
+
+def get_backend():
+    """Return the default backend, configured with RA_RETRIEVAL_BACKEND (defaults to "live")."""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = create_backend(os.environ.get("RA_RETRIEVAL_BACKEND", "live"))
+    return _default_backend
+
+def set_backend(backend):
+    """Replace the default backend used by search_papers.
+    Args:
+        backend (RetrievalBackend or str): Backend instance or configuration name.
+    """
+    global _default_backend
+    _default_backend = create_backend(backend) if isinstance(backend, str) else backend
+
+def search_papers(query, max_results=3, backend=None):
+    """Search for papers through a retrieval backend.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results per source.
+        backend (RetrievalBackend): Backend to use instead of the default one.
+    Returns:
+        list: A list of dictionaries containing paper details.
+    """
+    results = (backend or get_backend()).search(query, max_results)
+    _notify_observers(query, results)
+    return results
+
+def search_papers_stream(query, max_results=3, backend=None):
+    """Search for papers through a retrieval backend, yielding results as they arrive.
+    The live backend streams every source separately; other backends answer in one batch.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results per source.
+        backend (RetrievalBackend): Backend to use instead of the default one.
+    Yields:
+        tuple: (source, papers) for every batch of new papers, and finally
+            ("done", papers) with every paper, records of the same paper merged.
+    """
+    backend = backend or get_backend()
+    if isinstance(backend, LiveBackend):
+        collected = []
+        for source, papers in search_live_stream(query, max_results):
+            collected.extend(papers)
+            yield source, papers
+        results = resolve_papers(collected)
+    else:
+        results = backend.search(query, max_results)
+        yield backend.name, results
+    _notify_observers(query, results)
+    yield "done", results
+
+async def search_papers_async(query, max_results=3, backend=None, timeout=None):
+    """Search for papers through a retrieval backend without blocking the event loop.
+    Args:
+        query (str): The search query.
+        max_results (int): The maximum number of results per source.
+        backend (RetrievalBackend): Backend to use instead of the default one.
+        timeout (float): Seconds after which the search and its pending upstream
+            requests are cancelled, raising asyncio.TimeoutError.
+    Returns:
+        list: A list of dictionaries containing paper details.
+    """
+    results = await asyncio.wait_for((backend or get_backend()).search_async(query, max_results), timeout)
+    # Observers may index or embed the papers, which is CPU-bound
+    await asyncio.to_thread(_notify_observers, query, results)
+    return results
+
+async def search_papers_many_async(queries, max_results=3, backend=None, timeout=None):
+    """Search for several queries concurrently, sharing one HTTP client between them.
+    Args:
+        queries (list): The search queries.
+        max_results (int): The maximum number of results per source.
+        backend (RetrievalBackend): Backend to use instead of the default one.
+        timeout (float): Seconds allowed per query before it is cancelled.
+    Returns:
+        list: The papers of each query, in query order. A query that failed or
+            timed out gets an empty list.
+    """
+    from research_assistant.retrieval.async_search import client_scope
+    async with client_scope():
+        results = await asyncio.gather(*(search_papers_async(query, max_results, backend, timeout)
+                                         for query in queries), return_exceptions=True)
+    for query, result in zip(queries, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Search for '{query}' failed: {result!r}")
+    return [[] if isinstance(result, BaseException) else result for result in results]
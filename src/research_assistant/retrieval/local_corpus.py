@@ -0,0 +1,251 @@
+import os
+import sys
+import gzip
+import json
+import sqlite3
+import hashlib
+import threading
+
+# Add the project root to the Python path to ensure package imports work correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+# Default location of the local corpus database (project_root/data/corpus)
+DEFAULT_CORPUS_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '../../../data/corpus/papers.sqlite'
+))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    paper_key TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT,
+    year TEXT,
+    venue TEXT,
+    authors TEXT,
+    citations INTEGER,
+    abstract TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, abstract, content='papers', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, abstract) VALUES ('delete', old.id, old.title, old.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, abstract) VALUES ('delete', old.id, old.title, old.abstract);
+    INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+END;
+"""
+
+def _paper_key(record):
+    '''
+    Build a stable key for a paper record so repeated loads do not duplicate it.
+    Args:
+        record (dict): Raw or normalized paper record.
+    Returns:
+        str: Key based on the Semantic Scholar id when present, otherwise on the title.
+    '''
+    for field, prefix in (("corpusid", "corpus"), ("corpusId", "corpus"), ("paperId", "s2")):
+        if record.get(field):
+            return f"{prefix}:{record[field]}"
+    title = " ".join((record.get("title") or "").lower().split())
+    return "title:" + hashlib.sha1(title.encode("utf-8")).hexdigest()
+
+def normalize_record(record):
+    '''
+    Convert a Semantic Scholar record to the paper dictionary used across the app.
+    Accepts both API responses (citationCount) and dataset exports (citationcount, corpusid).
+    Args:
+        record (dict): Raw paper record.
+    Returns:
+        dict: Paper dictionary with title, url, year, venue, authors, citations and abstract.
+    '''
+    authors = record.get("authors", "")
+    if isinstance(authors, list):
+        authors = ", ".join(a.get("name", "") if isinstance(a, dict) else str(a) for a in authors)
+    citations = record.get("citations", record.get("citationCount", record.get("citationcount", "")))
+    url = record.get("url") or ""
+    if not url and record.get("corpusid"):
+        url = f"https://www.semanticscholar.org/p/{record['corpusid']}"
+    return {
+        "title": record.get("title") or "",
+        "url": url,
+        "year": record.get("year") if record.get("year") is not None else "",
+        "venue": record.get("venue") or "",
+        "authors": authors or "",
+        "citations": citations if citations is not None else "",
+        "abstract": record.get("abstract") or "",
+    }
+
+def _fts_query(query):
+    '''
+    Turn free text into an FTS5 query matching any of its terms.
+    Terms are quoted so that characters with a meaning in FTS5 syntax are searched literally.
+    '''
+    terms = ["".join(ch for ch in term if ch.isalnum()) for term in query.split()]
+    return " OR ".join(f'"{term}"' for term in terms if term)
+
+class LocalCorpus:
+    """
+    SQLite/FTS5 store of paper metadata and abstracts for offline search.
+    """
+
+    def __init__(self, path=None):
+        '''
+        Open (or create) a corpus database.
+        Args:
+            path (str): Database file. Defaults to RA_CORPUS_DB or data/corpus/papers.sqlite.
+        '''
+        self.path = path or os.environ.get("RA_CORPUS_DB") or DEFAULT_CORPUS_PATH
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._memory_conn = None
+        if self.path == ":memory:":
+            # Every connection to ":memory:" is a separate database, so threads share one
+            self._memory_conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._memory_conn.row_factory = sqlite3.Row
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connection(self):
+        if self._memory_conn is not None:
+            return self._memory_conn
+        # SQLite connections cannot be shared between threads, so each thread gets its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _fetchall(self, sql, params=()):
+        # The shared in-memory connection is used by one thread at a time
+        if self._memory_conn is not None:
+            with self._write_lock:
+                return self._memory_conn.execute(sql, params).fetchall()
+        return self._connection().execute(sql, params).fetchall()
+
+    def __len__(self):
+        return self._fetchall("SELECT COUNT(*) FROM papers")[0][0]
+
+    def add_papers(self, records):
+        '''
+        Insert or update papers.
+        Args:
+            records (iterable): Raw Semantic Scholar records or paper dictionaries.
+        Returns:
+            int: Number of records written.
+        '''
+        rows = []
+        for record in records:
+            paper = normalize_record(record)
+            if not paper["title"]:
+                continue
+            try:
+                citations = int(paper["citations"])
+            except (TypeError, ValueError):
+                citations = None
+            rows.append((_paper_key(record), paper["title"], paper["url"], str(paper["year"]),
+                         paper["venue"], paper["authors"], citations, paper["abstract"]))
+        if not rows:
+            return 0
+        with self._write_lock:
+            conn = self._connection()
+            conn.executemany(
+                """INSERT INTO papers (paper_key, title, url, year, venue, authors, citations, abstract)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(paper_key) DO UPDATE SET
+                       title=excluded.title, url=excluded.url, year=excluded.year,
+                       venue=excluded.venue, authors=excluded.authors,
+                       citations=excluded.citations,
+                       abstract=CASE WHEN excluded.abstract != '' THEN excluded.abstract ELSE papers.abstract END""",
+                rows,
+            )
+            conn.commit()
+        return len(rows)
+
+    def add_abstracts(self, records):
+        '''
+        Attach abstracts from a Semantic Scholar "abstracts" dataset export.
+        Args:
+            records (iterable): Records with "corpusid" and "abstract" fields.
+        Returns:
+            int: Number of records processed.
+        '''
+        rows = [(r.get("abstract") or "", f"corpus:{r['corpusid']}") for r in records if r.get("corpusid")]
+        with self._write_lock:
+            conn = self._connection()
+            conn.executemany("UPDATE papers SET abstract = ? WHERE paper_key = ?", rows)
+            conn.commit()
+        return len(rows)
+
+    def load_jsonl(self, path, batch_size=10000):
+        '''
+        Bulk-load a JSONL (optionally gzipped) dump such as a Semantic Scholar dataset export.
+        Records carrying only "corpusid" and "abstract" are treated as abstracts for papers
+        loaded earlier.
+        Args:
+            path (str): Path to the .jsonl or .jsonl.gz file.
+            batch_size (int): Number of records written per transaction.
+        Returns:
+            int: Number of records loaded.
+        '''
+        opener = gzip.open if path.endswith(".gz") else open
+        loaded = 0
+        papers, abstracts = [], []
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if "title" in record:
+                    papers.append(record)
+                elif "abstract" in record:
+                    abstracts.append(record)
+                if len(papers) >= batch_size:
+                    loaded += self.add_papers(papers)
+                    papers = []
+                if len(abstracts) >= batch_size:
+                    loaded += self.add_abstracts(abstracts)
+                    abstracts = []
+        loaded += self.add_papers(papers) + self.add_abstracts(abstracts)
+        return loaded
+
+    def search(self, query, max_results=3):
+        '''
+        Search titles and abstracts with FTS5 BM25 ranking.
+        Args:
+            query (str): The search query.
+            max_results (int): The maximum number of results to return.
+        Returns:
+            list: A list of dictionaries containing paper details.
+        '''
+        match = _fts_query(query)
+        if not match:
+            return []
+        rows = self._fetchall(
+            """SELECT p.title, p.url, p.year, p.venue, p.authors, p.citations, p.abstract
+               FROM papers_fts JOIN papers p ON p.id = papers_fts.rowid
+               WHERE papers_fts MATCH ?
+               ORDER BY bm25(papers_fts, 2.0, 1.0)
+               LIMIT ?""",
+            (match, max_results),
+        )
+        return [{
+            "title": row["title"],
+            "url": row["url"] or "",
+            "year": int(row["year"]) if row["year"] and row["year"].isdigit() else "",
+            "venue": row["venue"] or "",
+            "authors": row["authors"] or "",
+            "citations": row["citations"] if row["citations"] is not None else "",
+            "abstract": row["abstract"] or "",
+        } for row in rows]
@@ -0,0 +1,231 @@
+'''
+Token-bucket rate limiting of upstream APIs.
+
+Every upstream host gets one bucket holding up to ``capacity`` tokens that
+refill at ``rate`` tokens per second; a request takes one token. Callers that
+find the bucket empty reserve a token anyway and sleep only until it refills,
+so requests wait exactly as long as the quota requires and are served in the
+order they arrived. A quiet API is called without any delay.
+
+Two backends share the same interface:
+    TokenBucket      in-process, shared by all threads
+    FileTokenBucket  state kept in a file under an exclusive lock, shared by
+                     every process on the machine (e.g. several API workers)
+
+Limits are configured per upstream with RA_RATE_LIMIT_<NAME> set to
+"<requests>/<seconds>" or "<requests>/<seconds>:<burst>", e.g.
+RA_RATE_LIMIT_SEMANTIC_SCHOLAR=100/300:5. RA_RATE_LIMIT_BACKEND selects
+"thread" (default) or "file".
+'''
+
+import os
+import sys
+import json
+import time
+import threading
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Add the project root to the Python path to ensure package imports work correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.utils.utils import get_cache_dir
+
+# Default quotas: (host, configuration name, requests, per seconds, burst)
+# Semantic Scholar allows 1 request per second per API key, and unauthenticated
+# clients share a pool that starts answering 429 well before that rate.
+# SerpAPI limits searches per plan; one per second stays clear of its throughput limit.
+DEFAULT_LIMITS = [
+    ("api.semanticscholar.org", "SEMANTIC_SCHOLAR", 1, 1.0, 1),
+    ("serpapi.com", "SERPAPI", 1, 1.0, 5),
+]
+
+
+class TokenBucket:
+    '''
+    Thread-safe token bucket.
+    '''
+
+    def __init__(self, rate, capacity=1):
+        '''Initialize a full bucket.
+        Args:
+            rate (float): Tokens added per second.
+            capacity (int): Maximum number of tokens, i.e. the allowed burst.
+        '''
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        '''Take tokens, going into debt if the bucket is empty.
+        Args:
+            tokens (int): Number of tokens to take.
+        Returns:
+            float: Seconds the caller must wait before its request may go out.
+        '''
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens=1):
+        '''Block until tokens are available and take them.
+        Args:
+            tokens (int): Number of tokens to take.
+        Returns:
+            float: Seconds spent waiting.
+        '''
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class FileTokenBucket:
+    '''
+    Token bucket whose state lives in a file, shared by every process using the same path.
+    '''
+
+    def __init__(self, path, rate, capacity=1):
+        '''Initialize the bucket, creating its state file if needed.
+        Args:
+            path (str): State file shared by the cooperating processes.
+            rate (float): Tokens added per second.
+            capacity (int): Maximum number of tokens, i.e. the allowed burst.
+        '''
+        if fcntl is None:
+            raise RuntimeError("File-based rate limiting requires fcntl (POSIX)")
+        self.path = path
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        # flock does not exclude threads sharing one open file description
+        self._lock = threading.Lock()
+        open(path, 'a').close()
+
+    def reserve(self, tokens=1):
+        '''Take tokens, going into debt if the bucket is empty.
+        Args:
+            tokens (int): Number of tokens to take.
+        Returns:
+            float: Seconds the caller must wait before its request may go out.
+        '''
+        with self._lock, open(self.path, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                try:
+                    state = json.loads(f.read() or '{}')
+                except ValueError:
+                    state = {}
+                # Wall-clock time, since monotonic clocks are not comparable across processes
+                now = time.time()
+                available = state.get('tokens', self.capacity) + (now - state.get('updated', now)) * self.rate
+                available = min(self.capacity, available) - tokens
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({'tokens': available, 'updated': now}))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return max(0.0, -available / self.rate)
+
+    def acquire(self, tokens=1):
+        '''Block until tokens are available and take them.
+        Args:
+            tokens (int): Number of tokens to take.
+        Returns:
+            float: Seconds spent waiting.
+        '''
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def parse_limit(value):
+    '''Parse a "<requests>/<seconds>[:<burst>]" limit.
+    Args:
+        value (str): Limit specification.
+    Returns:
+        tuple: (tokens per second, capacity). The burst defaults to 1.
+    Raises:
+        ValueError: If the specification is malformed, the rate is not positive or the burst is below 1.
+    '''
+    spec, _, burst = value.partition(':')
+    requests_count, _, seconds = spec.partition('/')
+    try:
+        rate = float(requests_count) / float(seconds or 1)
+        capacity = float(burst) if burst else 1.0
+    except (ValueError, ZeroDivisionError) as e:
+        raise ValueError(f"Invalid rate limit: {value}") from e
+    if rate <= 0:
+        raise ValueError(f"Rate limit must be positive: {value}")
+    if capacity < 1:
+        raise ValueError(f"Rate limit burst must be at least 1: {value}")
+    return rate, capacity
+
+
+def source_name(host):
+    '''Return the configuration name of an upstream host, e.g. "SEMANTIC_SCHOLAR".
+    Args:
+        host (str): Host name.
+    Returns:
+        str: The name, or None for hosts that are not a known upstream.
+    '''
+    for limited_host, name, _, _, _ in DEFAULT_LIMITS:
+        if host == limited_host or host.endswith("." + limited_host):
+            return name
+    return None
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _create_limiter(name, rate, capacity):
+    backend = os.environ.get("RA_RATE_LIMIT_BACKEND", "thread")
+    if backend == "file":
+        return FileTokenBucket(os.path.join(get_cache_dir('rate_limits'), f"{name.lower()}.json"), rate, capacity)
+    if backend != "thread":
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    return TokenBucket(rate, capacity)
+
+
+def get_limiter(host):
+    '''Return the shared limiter of an upstream host.
+    Args:
+        host (str): Host name, e.g. "api.semanticscholar.org".
+    Returns:
+        TokenBucket or FileTokenBucket: The limiter, or None if the host is not rate limited.
+    '''
+    with _limiters_lock:
+        if host in _limiters:
+            return _limiters[host]
+        limiter = None
+        name = source_name(host)
+        for _, limited_name, requests_count, seconds, burst in DEFAULT_LIMITS:
+            if limited_name == name:
+                configured = os.environ.get(f"RA_RATE_LIMIT_{name}")
+                rate, capacity = parse_limit(configured) if configured else (requests_count / seconds, burst)
+                limiter = _create_limiter(name, rate, capacity)
+                break
+        _limiters[host] = limiter
+        return limiter
+
+
+def limiter_for_url(url):
+    '''Return the limiter of the host a URL points to, or None.'''
+    return get_limiter(urlsplit(url).hostname or "")
+
+
+def reset():
+    '''Forget every limiter so that the next call reads the configuration again.'''
+    with _limiters_lock:
+        _limiters.clear()
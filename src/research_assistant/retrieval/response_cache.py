@@ -0,0 +1,349 @@
+'''
+Persistent cache of upstream API responses.
+
+Identical Semantic Scholar and SerpAPI requests repeat across users and
+sessions, and every SerpAPI search is billed. Successful JSON responses are
+kept in a SQLite database under the cache directory, keyed by a hash of the
+method, the endpoint and the normalized parameters (the SerpAPI key is left
+out, so every key shares the cache and none is written to disk).
+
+Every source has a TTL and a stale window. A fresh entry is served as is; an
+entry past its TTL but inside the stale window is still served immediately,
+while a background thread fetches a new copy (stale-while-revalidate). Older
+entries count as misses. Once the database grows beyond its size limit, the
+least recently used entries are evicted.
+
+Configuration (environment variables):
+    RA_RESPONSE_CACHE            set to 0 to disable the cache
+    RA_RESPONSE_CACHE_DB         database file (default <cache dir>/responses/responses.sqlite)
+    RA_RESPONSE_CACHE_MAX_MB     size limit of the cached bodies (default 200)
+    RA_RESPONSE_TTL_<NAME>       seconds an answer of a source stays fresh
+    RA_RESPONSE_STALE_<NAME>     seconds a stale answer may still be served
+with <NAME> the source names of rate_limit.py (SEMANTIC_SCHOLAR, SERPAPI).
+'''
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+# Add the project root to the Python path to ensure package imports work correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from research_assistant.retrieval.rate_limit import source_name
+from research_assistant.utils.utils import get_cache_dir
+
+# Default freshness per source: (TTL, stale window) in seconds.
+# Search results drift slowly; SerpAPI answers are kept longer because they are billed.
+DEFAULT_POLICIES = {
+    "SEMANTIC_SCHOLAR": (24 * 3600, 7 * 24 * 3600),
+    "SERPAPI": (7 * 24 * 3600, 30 * 24 * 3600),
+}
+
+DEFAULT_MAX_MB = 200
+
+# Parameters that identify the caller rather than the request
+IGNORED_PARAMS = ("api_key",)
+
+# Methods that are cached (Semantic Scholar's batch lookup is a read-only POST)
+CACHED_METHODS = ("GET", "POST")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    body TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at);
+"""
+
+
+def _normalize_value(value):
+    return " ".join(str(value).split())
+
+
+def cache_key(method, url, params=None, json_body=None):
+    '''Build the cache key of a request.
+    Query parameters from the URL and from params are merged and sorted, whitespace
+    in their values is collapsed, and the JSON body is serialized canonically.
+    Args:
+        method (str): HTTP method.
+        url (str): Request URL.
+        params (dict): Query parameters.
+        json_body: JSON request body.
+    Returns:
+        str: Hex digest identifying the request.
+    '''
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query) + list((params or {}).items())
+    query = sorted((str(k), _normalize_value(v)) for k, v in query if k not in IGNORED_PARAMS and v is not None)
+    endpoint = urlunsplit((parts.scheme, (parts.hostname or "").lower(), parts.path.rstrip("/"), "", ""))
+    payload = json.dumps([method.upper(), endpoint, query, json_body], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def source_for_url(url):
+    '''Return the cached source a URL belongs to, or None if its responses are not cached.'''
+    name = source_name(urlsplit(url).hostname or "")
+    return name if name in DEFAULT_POLICIES else None
+
+
+def get_policy(source):
+    '''Return the (TTL, stale window) of a source in seconds.'''
+    ttl, stale = DEFAULT_POLICIES[source]
+    ttl = float(os.environ.get(f"RA_RESPONSE_TTL_{source}", ttl))
+    stale = float(os.environ.get(f"RA_RESPONSE_STALE_{source}", stale))
+    return ttl, stale
+
+
+def is_cacheable_body(body):
+    '''Only JSON answers without an "error" field are stored (SerpAPI reports errors with status 200).'''
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return False
+    return not (isinstance(data, dict) and "error" in data)
+
+
+class ResponseCache:
+    """
+    SQLite store of upstream responses with TTLs, stale-while-revalidate and LRU eviction.
+    """
+
+    def __init__(self, path=None, max_bytes=None, refresh_workers=2):
+        '''
+        Open (or create) a response cache.
+        Args:
+            path (str): Database file. Defaults to RA_RESPONSE_CACHE_DB or the cache directory.
+            max_bytes (int): Size limit of the cached bodies. Defaults to RA_RESPONSE_CACHE_MAX_MB.
+            refresh_workers (int): Threads revalidating stale entries.
+        '''
+        self.path = path or os.environ.get("RA_RESPONSE_CACHE_DB") or os.path.join(
+            get_cache_dir("responses"), "responses.sqlite")
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("RA_RESPONSE_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(int))
+        self._refreshing = set()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+        self._memory_conn = None
+        if self.path == ":memory:":
+            # Every connection to ":memory:" is a separate database, so threads share one
+            self._memory_conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._size = self._total_size()
+
+    def _connection(self):
+        if self._memory_conn is not None:
+            return self._memory_conn
+        # SQLite connections cannot be shared between threads, so each thread gets its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _fetchone(self, sql, params=()):
+        # The shared in-memory connection is used by one thread at a time
+        if self._memory_conn is not None:
+            with self._write_lock:
+                return self._memory_conn.execute(sql, params).fetchone()
+        return self._connection().execute(sql, params).fetchone()
+
+    def _total_size(self):
+        return self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _count(self, source, event, n=1):
+        with self._stats_lock:
+            self._counters[source][event] += n
+
+    def caches(self, method, url):
+        '''Return whether responses to a request are cached.'''
+        return method.upper() in CACHED_METHODS and source_for_url(url) is not None
+
+    def get(self, method, url, params=None, json_body=None, refresh=None):
+        '''Look up the cached response of a request.
+        Args:
+            method (str): HTTP method.
+            url (str): Request URL.
+            params (dict): Query parameters.
+            json_body: JSON request body.
+            refresh (callable): Called in the background without arguments when the
+                entry is stale; returns the new body, or None if the fetch failed.
+        Returns:
+            tuple: (body, state) with state "fresh" or "stale", or None on a miss.
+        '''
+        source = source_for_url(url)
+        if source is None:
+            return None
+        key = cache_key(method, url, params, json_body)
+        row = self._fetchone("SELECT body, stored_at FROM responses WHERE key = ?", (key,))
+        now = time.time()
+        ttl, stale = get_policy(source)
+        if row is None or now - row[1] >= ttl + stale:
+            self._count(source, "misses")
+            return None
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+        if now - row[1] < ttl:
+            self._count(source, "hits")
+            return row[0], "fresh"
+        self._count(source, "stale_hits")
+        if refresh is not None:
+            self._revalidate(key, source, refresh)
+        return row[0], "stale"
+
+    def put(self, method, url, params=None, json_body=None, body=""):
+        '''Store the body of a successful response.
+        Args:
+            method (str): HTTP method.
+            url (str): Request URL.
+            params (dict): Query parameters.
+            json_body: JSON request body.
+            body (str): Response body.
+        Returns:
+            bool: Whether the body was stored.
+        '''
+        source = source_for_url(url)
+        if source is None or not is_cacheable_body(body):
+            return False
+        self._store(cache_key(method, url, params, json_body), source, body)
+        return True
+
+    def _store(self, key, source, body):
+        now = time.time()
+        size = len(body.encode("utf-8"))
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute(
+                """INSERT INTO responses (key, source, body, size, stored_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET body=excluded.body, size=excluded.size,
+                       stored_at=excluded.stored_at, accessed_at=excluded.accessed_at""",
+                (key, source, body, size, now, now),
+            )
+            conn.commit()
+            # Replaced entries make this an overestimate; evict() recounts before deleting
+            self._size += size
+        self._count(source, "stores")
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _revalidate(self, key, source, refresh):
+        with self._stats_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                body = refresh()
+                if body is not None and is_cacheable_body(body):
+                    self._store(key, source, body)
+                    self._count(source, "refreshes")
+                else:
+                    self._count(source, "refresh_failures")
+            except Exception as e:
+                print(f"Error refreshing cached response: {e}")
+                self._count(source, "refresh_failures")
+            finally:
+                with self._stats_lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(run)
+
+    def evict(self, target_ratio=0.9):
+        '''Delete the least recently used entries until the cache is below
+        target_ratio of its size limit.
+        Returns:
+            int: Number of evicted entries.
+        '''
+        evicted = 0
+        with self._write_lock:
+            conn = self._connection()
+            self._size = self._total_size()
+            target = self.max_bytes * target_ratio
+            while self._size > target:
+                rows = conn.execute(
+                    "SELECT key, source, size FROM responses ORDER BY accessed_at LIMIT 256").fetchall()
+                if not rows:
+                    break
+                excess = self._size - target
+                batch = []
+                for key, source, size in rows:
+                    batch.append((key, source))
+                    excess -= size
+                    self._size -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in batch])
+                conn.commit()
+                evicted += len(batch)
+                for _, source in batch:
+                    self._count(source, "evictions")
+        return evicted
+
+    def clear(self):
+        '''Delete every cached response.'''
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self._size = 0
+
+    def stats(self):
+        '''Report hit rates per source together with the size of the cache.
+        Returns:
+            dict: Counters and hit rate per source, plus entries and bytes.
+        '''
+        with self._stats_lock:
+            sources = {source: dict(counters) for source, counters in self._counters.items()}
+        for counters in sources.values():
+            hits = counters.get("hits", 0) + counters.get("stale_hits", 0)
+            lookups = hits + counters.get("misses", 0)
+            counters["hit_rate"] = hits / lookups if lookups else 0.0
+        entries, size = self._fetchone("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses")
+        return {"sources": sources, "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    '''
+    Return the process-wide response cache.
+    Returns:
+        ResponseCache: The cache, or None if it is disabled with RA_RESPONSE_CACHE=0.
+    '''
+    global _cache
+    if os.environ.get("RA_RESPONSE_CACHE", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def reset():
+    '''Forget the process-wide cache so that the next call reads the configuration again.'''
+    global _cache
+    with _cache_lock:
+        _cache = None
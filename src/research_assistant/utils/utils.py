@@ -1,3 +1,5 @@
+import os
+from collections import Counter, defaultdict
 from difflib import SequenceMatcher
 
 def similar(a, b):
@@ -22,4 +24,155 @@ def is_duplicate(gs_title, sem_results, threshold=0.9):
     Returns:
         bool: True if duplicate, False otherwise.
     '''
-    return any(similar(gs_title, sem_paper['title']) >= threshold for sem_paper in sem_results)
\ No newline at end of file
+    if isinstance(sem_results, TitleIndex):
+        return sem_results.contains_similar(gs_title)
+    return any(similar(gs_title, sem_paper['title']) >= threshold for sem_paper in sem_results)
+
+def _min_matches(total_length, threshold):
+    '''
+    Smallest number of matched characters M for which SequenceMatcher's ratio
+    2*M/total_length reaches the threshold (computed the same way as ratio()).
+    '''
+    if total_length == 0:
+        return 0
+    matches = max(0, int(threshold * total_length / 2) - 1)
+    while 2.0 * matches / total_length < threshold:
+        matches += 1
+    return matches
+
+def _trigrams(text):
+    return Counter(text[i:i + 3] for i in range(len(text) - 2))
+
+class TitleIndex:
+    '''
+    Index of titles answering "is any indexed title similar to this one" with the
+    same result as comparing against every title with similar(), without doing so.
+
+    Titles are compared lowercased, exactly as similar() does. Candidates are
+    found through an inverted index of character trigrams and pruned with bounds
+    that no pair reaching the threshold can violate; only the survivors are
+    verified with SequenceMatcher:
+      - length: the ratio is at most 2*min(la, lb)/(la + lb);
+      - trigrams: a pair with M matched characters in k matching blocks shares at
+        least M - 2k trigrams, and k is at most one more than the number of
+        unmatched characters, so it shares at least 5*M - 2*(la + lb) - 2;
+      - characters: M is at most the size of the common character multiset.
+    '''
+
+    def __init__(self, titles=(), threshold=0.9):
+        '''
+        Args:
+            titles (iterable): Titles to index.
+            threshold (float): Similarity threshold to consider as duplicate.
+        '''
+        self.threshold = threshold
+        self.titles = []
+        self._lowered = []
+        self._chars = []
+        self._postings = defaultdict(list)
+        self._by_length = defaultdict(list)
+        for title in titles:
+            self.add(title)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def add(self, title):
+        '''
+        Add a title to the index.
+        Args:
+            title (str): Title to index.
+        Returns:
+            int: Position of the title in the index.
+        '''
+        title_id = len(self.titles)
+        lowered = title.lower()
+        self.titles.append(title)
+        self._lowered.append(lowered)
+        self._chars.append(Counter(lowered))
+        for gram, count in _trigrams(lowered).items():
+            self._postings[gram].append((title_id, count))
+        self._by_length[len(lowered)].append(title_id)
+        return title_id
+
+    def _min_shared_trigrams(self, length_a, length_b):
+        return 5 * _min_matches(length_a + length_b, self.threshold) - 2 * (length_a + length_b) - 2
+
+    def _length_range(self, length):
+        # Lengths lb with 2*min(la, lb)/(la + lb) >= threshold; the float bounds are widened and checked exactly
+        low = int(length * self.threshold / (2 - self.threshold)) - 1
+        high = int(length * (2 - self.threshold) / self.threshold) + 2
+        return [lb for lb in range(max(0, low), high + 1)
+                if _min_matches(length + lb, self.threshold) <= min(length, lb)]
+
+    def find_similar(self, title, first_only=False):
+        '''
+        Find the indexed titles whose similarity to a title reaches the threshold.
+        Args:
+            title (str): Title to look up.
+            first_only (bool): Stop at the first match.
+        Returns:
+            list: Positions of the matching titles, in index order.
+        '''
+        lowered = title.lower()
+        length = len(lowered)
+        lengths = [lb for lb in self._length_range(length) if lb in self._by_length]
+        if not lengths:
+            return []
+
+        candidates = set()
+        required = {lb: self._min_shared_trigrams(length, lb) for lb in lengths}
+        # Pairs short enough that the trigram bound is vacuous are all candidates
+        for lb, min_shared in required.items():
+            if min_shared <= 0:
+                candidates.update(self._by_length[lb])
+        if any(min_shared > 0 for min_shared in required.values()):
+            shared = defaultdict(int)
+            for gram, count in _trigrams(lowered).items():
+                for title_id, indexed_count in self._postings.get(gram, ()):
+                    shared[title_id] += indexed_count if indexed_count < count else count
+            for title_id, count in shared.items():
+                min_shared = required.get(len(self._lowered[title_id]), 0)
+                if min_shared > 0 and count >= min_shared:
+                    candidates.add(title_id)
+
+        chars = Counter(lowered)
+        matches = []
+        for title_id in sorted(candidates):
+            other = self._lowered[title_id]
+            total = length + len(other)
+            common = sum((chars & self._chars[title_id]).values())
+            if common < _min_matches(total, self.threshold):
+                continue
+            if SequenceMatcher(None, lowered, other).ratio() >= self.threshold:
+                matches.append(title_id)
+                if first_only:
+                    break
+        return matches
+
+    def contains_similar(self, title):
+        '''
+        Check whether any indexed title is similar to a title.
+        Args:
+            title (str): Title to look up.
+        Returns:
+            bool: Same result as is_duplicate against the indexed titles.
+        '''
+        return bool(self.find_similar(title, first_only=True))
+
+def get_cache_dir(*parts):
+    '''
+    Return a directory for persistent caches, creating it if needed.
+    The cache root defaults to data/cache under the project root and can be
+    moved with the RA_CACHE_DIR environment variable.
+    Args:
+        *parts (str): Subdirectories below the cache root.
+    Returns:
+        str: Absolute path of the cache directory.
+    '''
+    root = os.environ.get("RA_CACHE_DIR") or os.path.join(
+        os.path.dirname(__file__), '../../../data/cache'
+    )
+    path = os.path.abspath(os.path.join(root, *parts))
+    os.makedirs(path, exist_ok=True)
+    return path
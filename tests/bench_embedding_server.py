@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of encode throughput of the multi-process embedding server
+against encoding in the calling process. Uses the bundled model when
+sentence-transformers is installed and a synthetic encoder that holds the GIL
+otherwise:
+
+    python tests/bench_embedding_server.py
+"""
+
+import os
+import sys
+import time
+import hashlib
+
+import numpy as np
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking.embedding_server import EmbeddingClient
+
+
+class SyntheticEncoder:
+    """Pure-Python encoder whose cost grows with the text length, like tokenization under the GIL."""
+
+    dim = 384
+
+    def encode(self, texts, **kwargs):
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            digest = b"".join(hashlib.sha256(f"{text}{j}".encode("utf-8")).digest() for j in range(300))
+            vectors[i] = np.frombuffer(digest[:self.dim * 4], dtype=np.uint8)[:self.dim]
+        return vectors
+
+
+def load_synthetic_encoder(path):
+    return SyntheticEncoder()
+
+
+def load_encoder():
+    try:
+        import sentence_transformers  # noqa: F401
+        from research_assistant.ranking.model_registry import registry
+        return registry.get(), None, "all-MiniLM-L6-v2"
+    except ImportError:
+        return SyntheticEncoder(), load_synthetic_encoder, "synthetic encoder"
+
+
+def run_benchmark(count=2048):
+    model, loader, name = load_encoder()
+    texts = [f"paper {i} on graph neural networks for retrieval" for i in range(count)]
+    print(f"Encoder: {name}, {count} texts")
+
+    start = time.perf_counter()
+    reference = np.asarray(model.encode(texts), dtype=np.float32)
+    print(f"  in process      {count / (time.perf_counter() - start):8.1f} texts/s")
+
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        client = EmbeddingClient(num_workers=workers, loader=loader)
+        start = time.perf_counter()
+        embeddings = client.encode(texts)
+        elapsed = time.perf_counter() - start
+        client.shutdown()
+        assert np.allclose(embeddings, reference, atol=1e-5)
+        print(f"  {workers:>2} processes    {count / elapsed:8.1f} texts/s")
+
+
+if __name__ == "__main__":
+    run_benchmark()
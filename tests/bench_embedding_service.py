@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of encode throughput under concurrent load, calling the model
+directly from every thread versus going through the micro-batching
+EmbeddingService. Uses the bundled model when sentence-transformers is
+installed and a synthetic encoder with a fixed per-call cost otherwise:
+
+    python tests/bench_embedding_service.py
+"""
+
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking.embedding_service import EmbeddingService
+
+
+class SyntheticEncoder:
+    """Encoder whose cost is a fixed per-call overhead plus a small per-text cost, serialized like the GIL."""
+
+    def __init__(self, call_ms=4.0, text_ms=0.2, dim=384):
+        self.call_ms = call_ms
+        self.text_ms = text_ms
+        self.dim = dim
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        with self._lock:
+            time.sleep((self.call_ms + self.text_ms * len(texts)) / 1000)
+        return np.random.default_rng(len(texts)).normal(size=(len(texts), self.dim)).astype(np.float32)
+
+
+def load_encoder():
+    try:
+        from research_assistant.ranking.model_registry import registry
+        return registry.get(), "all-MiniLM-L6-v2"
+    except Exception:
+        return SyntheticEncoder(), "synthetic encoder"
+
+
+def measure(encoder, threads, requests_per_thread=20, texts_per_request=2):
+    texts = [f"query {i} about graph neural networks and retrieval" for i in range(texts_per_request)]
+
+    def client(_):
+        for _ in range(requests_per_thread):
+            encoder.encode(texts)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(client, range(threads)))
+    elapsed = time.perf_counter() - start
+    return threads * requests_per_thread * texts_per_request / elapsed
+
+
+def run_benchmark():
+    model, name = load_encoder()
+    print(f"Encoder: {name}")
+    for threads in (1, 8, 32):
+        direct = measure(model, threads)
+        service = EmbeddingService(model, max_batch_size=64, max_latency_ms=5)
+        batched = measure(service, threads)
+        stats = service.stats()
+        service.shutdown()
+        print(f"  {threads:>2} threads: direct {direct:8.1f} texts/s   service {batched:8.1f} texts/s"
+              f"   (mean batch {stats['mean_batch_size']})")
+
+
+if __name__ == "__main__":
+    run_benchmark()
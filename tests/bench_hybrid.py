@@ -0,0 +1,87 @@
+"""
+Micro-benchmark of two-stage (hybrid) ranking: a BM25 pass prunes the
+candidates to ``prune_depth`` papers and only those are encoded and re-scored.
+Reports latency per query against the quality of the pruned ranking, measured
+as overlap of its top 10 with the unpruned ranking and as precision@10 on
+synthetic topic labels.
+
+The bundled MiniLM model is used when sentence-transformers is installed;
+otherwise a bag-of-words encoder with a fixed per-text cost stands in for it:
+
+    python tests/bench_hybrid.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+os.environ.setdefault('RA_EMBEDDING_STORE', '0')  # measure encoding, not store hits
+
+from bench_lexical import synthetic_papers
+from research_assistant.ranking.lexical_model import CorpusLexicalModel
+from research_assistant.ranking import paper_ranker
+from research_assistant.ranking.paper_ranker import RankingConfig, paper_text, rank_papers_by_relevance
+
+
+class BagOfWordsEncoder:
+    """Sum of fixed random word vectors, costing ``ms_per_text`` like a CPU transformer forward pass."""
+
+    def __init__(self, dim=384, ms_per_text=1.0):
+        self.dim = dim
+        self.ms_per_text = ms_per_text
+        self._words = {}
+
+    def _word(self, word):
+        if word not in self._words:
+            self._words[word] = np.random.default_rng(abs(hash(word)) % 2**32).normal(size=self.dim)
+        return self._words[word]
+
+    def encode(self, texts):
+        time.sleep(self.ms_per_text * len(texts) / 1000)
+        return np.stack([sum(self._word(w) for w in text.split()) for text in texts]).astype(np.float32)
+
+
+def load_encoder():
+    try:
+        import sentence_transformers  # noqa: F401
+        from research_assistant.ranking.model_registry import registry
+        return registry.get(), "all-MiniLM-L6-v2"
+    except ImportError:
+        return BagOfWordsEncoder(), "bag-of-words encoder (1 ms/text)"
+
+
+def run_benchmark(count=2000, depths=(None, 1000, 500, 200, 100, 50), k=10):
+    model, name = load_encoder()
+    papers, labels, queries = synthetic_papers(count)
+    for i, paper in enumerate(papers):
+        paper['topic'] = int(labels[i])
+    queries = queries[:10]
+
+    lexical_model = CorpusLexicalModel()
+    lexical_model.add_documents([paper_text(p) for p in papers])
+    paper_ranker.get_lexical_model = lambda: lexical_model
+
+    print(f"Encoder: {name}, {count} candidate papers, {len(queries)} queries")
+    reference = {}
+    for depth in depths:
+        config = RankingConfig(lexical_scorer='bm25', prune_depth=depth, reference_year=2024)
+        overlaps, precisions = [], []
+        start = time.perf_counter()
+        for query, topic in queries:
+            top = rank_papers_by_relevance(papers, query, model=model, config=config, top_k=k)
+            titles = [p['title'] for p in top]
+            if depth is None:
+                reference[query] = set(titles)
+            overlaps.append(len(reference[query] & set(titles)) / k)
+            precisions.append(np.mean([p['topic'] == topic for p in top]))
+        elapsed = 1000 * (time.perf_counter() - start) / len(queries)
+        label = "full" if depth is None else f"prune {depth}"
+        print(f"  {label:<11} {elapsed:9.1f} ms/query   overlap@{k}={np.mean(overlaps):.2f}   P@{k}={np.mean(precisions):.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark comparing the lexical scorers of paper_ranker:
+
+- the previous path, fitting a TfidfVectorizer on the candidates on every call
+- TF-IDF with corpus-level statistics (transform only)
+- BM25 with precomputed postings and term weights
+
+Candidates are synthetic topic-clustered abstracts of varying length, and a
+paper counts as relevant when it shares the query's topic:
+
+    python tests/bench_lexical.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking.lexical_model import CorpusLexicalModel
+from research_assistant.ranking.paper_ranker import BM25Scorer, RankingConfig, get_lexical_similarities, paper_text
+
+
+def synthetic_papers(count, topics=20, seed=0):
+    """Generate papers whose abstracts mix topic words with shared filler words."""
+    rng = np.random.default_rng(seed)
+    # Topics draw their vocabulary from a shared pool, so topic words overlap
+    pool = [f"domain{w}" for w in range(150)]
+    topic_words = [list(rng.choice(pool, 25, replace=False)) for _ in range(topics)]
+    filler = [f"common{w}" for w in range(300)]
+    papers, labels = [], []
+    for _ in range(count):
+        topic = int(rng.integers(topics))
+        length = int(rng.integers(20, 250))
+        n_topic = max(3, int(length * rng.uniform(0.05, 0.3)))
+        words = list(rng.choice(topic_words[topic], n_topic)) + list(rng.choice(filler, length - n_topic))
+        rng.shuffle(words)
+        papers.append({"title": " ".join(words[:8]), "abstract": " ".join(words[8:])})
+        labels.append(topic)
+    queries = []
+    for _ in range(30):
+        topic = int(rng.integers(topics))
+        queries.append((" ".join(rng.choice(topic_words[topic], 3)), topic))
+    return papers, np.array(labels), queries
+
+
+def per_call_tfidf(papers, query):
+    """The previous implementation: fit on the candidates for every query."""
+    vectorizer = TfidfVectorizer(max_features=5000, stop_words='english', ngram_range=(1, 2))
+    texts = [paper_text(p) for p in papers]
+    vectorizer.fit(texts)
+    return (vectorizer.transform(texts) @ vectorizer.transform([query]).T).toarray().flatten()
+
+
+def evaluate(name, score_fn, papers, labels, queries, k=10):
+    precisions, reciprocal_ranks = [], []
+    start = time.perf_counter()
+    for query, topic in queries:
+        scores = score_fn(query)
+        order = np.argsort(-scores, kind='stable')
+        relevant = labels[order] == topic
+        precisions.append(relevant[:k].mean())
+        first = np.flatnonzero(relevant)
+        reciprocal_ranks.append(1 / (first[0] + 1) if len(first) else 0)
+    elapsed = 1000 * (time.perf_counter() - start) / len(queries)
+    print(f"  {name:<22} {elapsed:8.2f} ms/query   P@{k}={np.mean(precisions):.3f}   MRR={np.mean(reciprocal_ranks):.3f}")
+
+
+def run_benchmark():
+    for count in (100, 500, 1000):
+        papers, labels, queries = synthetic_papers(count)
+        lexical_model = CorpusLexicalModel()
+        lexical_model.add_documents([paper_text(p) for p in papers])
+        print(f"{count} candidate papers:")
+        evaluate("tfidf (fit per call)", lambda q: per_call_tfidf(papers, q), papers, labels, queries)
+        evaluate("tfidf (corpus idf)", lambda q: get_lexical_similarities(
+            papers, q, RankingConfig(lexical_scorer='tfidf'), lexical_model), papers, labels, queries)
+        evaluate("bm25", lambda q: get_lexical_similarities(
+            papers, q, RankingConfig(lexical_scorer='bm25'), lexical_model), papers, labels, queries)
+        # Postings built once and reused across queries, as in batched or two-stage ranking
+        scorer = BM25Scorer([paper_text(p) for p in papers], lexical_model=lexical_model)
+        evaluate("bm25 (prebuilt)", scorer.score, papers, labels, queries)
+
+
+if __name__ == "__main__":
+    run_benchmark()
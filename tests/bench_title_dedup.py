@@ -0,0 +1,87 @@
+"""
+Benchmark of Google Scholar / Semantic Scholar title deduplication:
+
+- the pairwise scan of is_duplicate (SequenceMatcher against every title)
+- TitleIndex (trigram blocking with bounds, then SequenceMatcher on candidates)
+
+Semantic Scholar titles are synthetic paper titles over a vocabulary with
+Zipf-distributed word frequencies; half of the Google Scholar titles are
+perturbed copies of them (typos, case, punctuation), the rest are new:
+
+    python tests/bench_title_dedup.py
+"""
+
+import os
+import sys
+import time
+import random
+import itertools
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.utils.utils import TitleIndex, is_duplicate
+
+STOP = "a of for the on with via and in towards using".split()
+SYLLABLES = ("ar be co de el fi ga hu in jo ka lo mi ne op pa qu ri sa te ul vi wo xe yo ze "
+             "tra ble ion ent ing ver pro net rec com lin ous ati ter").split()
+
+
+VOCABULARY_SIZE = 5000
+ZIPF_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, VOCABULARY_SIZE + 1)))
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def synthetic_title(rng, words):
+    # Zipf word frequencies (the rank-r word has weight 1/r), as in real titles
+    picked = [rng.choice(STOP) if rng.random() < 0.25 else rng.choices(words, cum_weights=ZIPF_WEIGHTS)[0]
+              for _ in range(rng.randint(4, 14))]
+    return " ".join(picked).capitalize()
+
+
+def perturb(title, rng):
+    chars = list(title)
+    for _ in range(rng.randint(0, 3)):
+        position = rng.randrange(len(chars))
+        chars[position] = rng.choice("abcdefghij .:-")
+    text = "".join(chars)
+    return text.upper() if rng.random() < 0.1 else text + rng.choice(["", ".", " (preprint)"])
+
+
+def titles(count, seed=0):
+    rng = random.Random(seed)
+    words = vocabulary(VOCABULARY_SIZE, rng)
+    rng.shuffle(words)
+    sem_titles = [synthetic_title(rng, words) for _ in range(count)]
+    gs_titles = [perturb(rng.choice(sem_titles), rng) if rng.random() < 0.5 else synthetic_title(rng, words)
+                 for _ in range(count)]
+    return sem_titles, gs_titles
+
+
+def run_benchmark():
+    for count in (20, 100, 300, 500):
+        sem_titles, gs_titles = titles(count)
+        sem_results = [{"title": title} for title in sem_titles]
+
+        start = time.perf_counter()
+        scan = [is_duplicate(title, sem_results) for title in gs_titles]
+        scan_ms = 1000 * (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        index = TitleIndex(sem_titles)
+        indexed = [index.contains_similar(title) for title in gs_titles]
+        index_ms = 1000 * (time.perf_counter() - start)
+
+        assert scan == indexed
+        print(f"{count:>5} x {count:<5} pairwise scan {scan_ms:9.1f} ms   title index {index_ms:8.1f} ms   "
+              f"speedup {scan_ms / index_ms:6.1f}x   duplicates {sum(scan)}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
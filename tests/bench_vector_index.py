@@ -0,0 +1,73 @@
+"""
+Benchmark for the local paper index: build time, incremental inserts,
+save/load and recall@k against an exact scan.
+
+Uses synthetic clustered 384-dimensional vectors (the MiniLM embedding size)
+so it runs without the model or network access:
+
+    python tests/bench_vector_index.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking.vector_index import PaperIndex, recall_at_k
+
+DIM = 384
+
+
+def synthetic_embeddings(count, clusters=100, noise=0.6, seed=0):
+    """Generate clustered vectors resembling topic-grouped paper embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIM))
+    return (centers[rng.integers(0, clusters, count)] + noise * rng.normal(size=(count, DIM))).astype(np.float32)
+
+
+def run_benchmark(count=50000, batch=500, queries=200, k=10):
+    vectors = synthetic_embeddings(count)
+    index = PaperIndex()
+
+    print(f"Inserting {count} papers in batches of {batch}...")
+    start = time.perf_counter()
+    for offset in range(0, count, batch):
+        ids = range(offset, min(offset + batch, count))
+        index.add([f"paper-{i}" for i in ids], vectors[offset:offset + batch],
+                  [{"title": f"Paper {i}"} for i in ids])
+    index.wait_for_training()
+    print(f"  build + incremental insert: {time.perf_counter() - start:.2f}s "
+          f"({len(index._lists)} cells)")
+
+    rng = np.random.default_rng(1)
+    query_vectors = vectors[rng.choice(count, queries, replace=False)] + 0.3 * rng.normal(size=(queries, DIM))
+
+    exact_start = time.perf_counter()
+    for query in query_vectors:
+        np.argpartition(-(index.vectors @ query.astype(np.float32)), k)
+    exact_ms = 1000 * (time.perf_counter() - exact_start) / queries
+    print(f"  exact scan: {exact_ms:.2f} ms/query")
+
+    for nprobe in (1, 4, 8, 16, 32):
+        result = recall_at_k(index, query_vectors, k=k, nprobe=nprobe)
+        print(f"  nprobe={nprobe:>2}: recall@{k}={result['recall_at_k']:.3f} "
+              f"latency={result['mean_latency_ms']:.2f} ms/query")
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        index.save(directory)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = PaperIndex.load(directory)
+        print(f"  save: {saved:.2f}s, load: {time.perf_counter() - start:.2f}s")
+        result = recall_at_k(loaded, query_vectors, k=k)
+        print(f"  reloaded index recall@{k}={result['recall_at_k']:.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,67 @@
+"""
+Shared fixtures for the API tests.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+# SearchGoogleScholar reads the key at import time
+os.environ.setdefault("SERPAPI_KEY", '="test"')
+
+
+class StubEncoder:
+    """Deterministic encoder: a fixed random vector per text, with varying norms."""
+
+    def __init__(self, dim=16, seed=0):
+        self.dim = dim
+        self.rng = np.random.default_rng(seed)
+        self.vectors = {}
+
+    def encode(self, texts, **kwargs):
+        for text in texts:
+            if text not in self.vectors:
+                self.vectors[text] = (self.rng.normal(size=self.dim) * self.rng.uniform(0.5, 3)).astype(np.float32)
+        return np.stack([self.vectors[text] for text in texts])
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    """
+    The search API with a stub encoder and fresh caches, without network access.
+    Tests stub the retrieval functions of the returned app module.
+
+    Returns:
+        tuple: (Flask test client, research_assistant.api.app module)
+    """
+    pytest.importorskip("google.generativeai")
+    monkeypatch.setenv("RA_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("RA_EMBEDDING_STORE", "0")
+
+    from research_assistant.api import app as app_module
+    from research_assistant.ranking import paper_ranker
+    from research_assistant.ranking.lexical_model import CorpusLexicalModel
+    from research_assistant.ranking.sessions import RankingSessionStore
+
+    encoder = StubEncoder()
+    lexical_model = CorpusLexicalModel()
+    monkeypatch.setattr(paper_ranker, "get_model", lambda model=None: encoder)
+    monkeypatch.setattr(paper_ranker, "get_lexical_model", lambda: lexical_model)
+    monkeypatch.setattr(app_module, "session_store", RankingSessionStore())
+    monkeypatch.setattr(app_module, "_observe_retrieved_papers", lambda query, papers: None)
+
+    app = app_module.create_app(warm_models=False)
+    app.config["TESTING"] = True
+    return app.test_client(), app_module
+
+
+def make_papers(count, prefix="Paper"):
+    """Synthetic candidate papers with distinct citation counts and years."""
+    return [{"title": f"{prefix} {i} on graph networks", "abstract": f"Graph neural network study number {i}.",
+             "url": f"https://example.org/{prefix.lower()}/{i}", "year": 2000 + i % 25, "venue": "",
+             "authors": "A Author", "citations": 10 * i} for i in range(count)]
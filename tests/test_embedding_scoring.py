@@ -0,0 +1,122 @@
+"""
+Accuracy regression test for dot-product scoring over the float16 embedding store.
+
+Semantic similarities used to be computed with sklearn's cosine_similarity on
+raw float32 model outputs. They are now dot products of unit vectors kept in
+float16; this checks both paths produce the same scores and rankings:
+
+    python -m pytest tests/test_embedding_scoring.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking.embedding_store import STORE_DTYPE, EmbeddingStore, content_hash
+from research_assistant.ranking.paper_ranker import encode_with_store, semantic_similarity, normalize_rows
+
+DIM = 384
+
+
+class FakeEncoder:
+    """Deterministic encoder with MiniLM-like dimension and varying vector norms."""
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.vectors = {}
+
+    def encode(self, texts):
+        for text in texts:
+            if text not in self.vectors:
+                self.vectors[text] = (self.rng.normal(size=DIM) * self.rng.uniform(0.5, 5)).astype(np.float32)
+        return np.stack([self.vectors[text] for text in texts])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EmbeddingStore(str(tmp_path / "store"), "fake@test", max_rows=4096)
+
+
+def test_store_keeps_normalized_half_precision_vectors(store):
+    encoder = FakeEncoder()
+    texts = [f"paper {i}" for i in range(100)]
+    raw = encoder.encode(texts)
+    store.put_many([content_hash(t) for t in texts], raw)
+
+    assert store._vectors.dtype == STORE_DTYPE
+    assert os.path.getsize(store._vectors_path) == store._capacity * DIM * np.dtype(STORE_DTYPE).itemsize
+
+    stored = store.get_many([content_hash(t) for t in texts])
+    vectors = np.stack([stored[content_hash(t)] for t in texts])
+    assert vectors.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-6)
+    np.testing.assert_allclose(vectors, normalize_rows(raw), atol=1e-3)
+
+
+def test_dot_product_scoring_matches_cosine_similarity(store):
+    encoder = FakeEncoder(seed=1)
+    query = "graph neural networks"
+    texts = [f"paper {i}" for i in range(2000)]
+    expected = cosine_similarity(encoder.encode([query]), encoder.encode(texts))[0]
+
+    # First pass encodes and stores; second pass is served from the float16 store
+    encode_with_store(encoder, store, texts)
+    paper_embeddings = encode_with_store(encoder, store, texts)
+    query_embedding = normalize_rows(encoder.encode([query])[0])
+    scores = semantic_similarity(query_embedding, paper_embeddings)
+
+    assert np.max(np.abs(scores - expected)) < 1e-3
+
+    # Rankings agree wherever neighbouring scores are further apart than the rounding error
+    k = 50
+    expected_order = np.argsort(-expected, kind='stable')[:k + 1]
+    order = np.argsort(-scores, kind='stable')[:k + 1]
+    close = -np.diff(expected[expected_order]) <= 2e-3
+    isolated = np.ones(k + 1, dtype=bool)
+    isolated[:-1] &= ~close
+    isolated[1:] &= ~close
+    assert np.array_equal(order[:k][isolated[:k]], expected_order[:k][isolated[:k]])
+
+
+def test_reopening_with_fewer_rows_shrinks_the_store(tmp_path):
+    encoder = FakeEncoder(seed=2)
+    texts = [f"paper {i}" for i in range(1500)]
+    keys = [content_hash(t) for t in texts]
+    store = EmbeddingStore(str(tmp_path / "store"), "fake@test", max_rows=4096)
+    store.put_many(keys, encoder.encode(texts))
+
+    store = EmbeddingStore(str(tmp_path / "store"), "fake@test", max_rows=400)
+    assert len(store) == 400
+    assert os.path.getsize(store._vectors_path) == 400 * DIM * np.dtype(STORE_DTYPE).itemsize
+    kept = store.get_many(keys)
+    # The least recently stored papers are evicted
+    assert set(kept) == set(keys[1100:])
+    np.testing.assert_allclose(np.stack([kept[k] for k in keys[1100:]]),
+                               normalize_rows(encoder.encode(texts[1100:])), atol=1e-3)
+
+    # The shrunk store survives another reopen and keeps accepting papers
+    store = EmbeddingStore(str(tmp_path / "store"), "fake@test", max_rows=400)
+    assert len(store) == 400
+    store.put_many([content_hash("new paper")], encoder.encode(["new paper"]))
+    assert content_hash("new paper") in store and len(store) == 400
+
+
+def test_recency_of_reads_survives_reopening(tmp_path):
+    encoder = FakeEncoder(seed=3)
+    texts = [f"paper {i}" for i in range(500)]
+    keys = [content_hash(t) for t in texts]
+    store = EmbeddingStore(str(tmp_path / "store"), "fake@test", max_rows=4096)
+    store.put_many(keys, encoder.encode(texts))
+    # Reads are recorded with the next put
+    store.get_many(keys[:100])
+    store.put_many([content_hash("new paper")], encoder.encode(["new paper"]))
+
+    store = EmbeddingStore(str(tmp_path / "store"), "fake@test", max_rows=200)
+    assert set(store.get_many(keys + [content_hash("new paper")])) == \
+        set(keys[401:] + keys[:100] + [content_hash("new paper")])
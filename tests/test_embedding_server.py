@@ -0,0 +1,60 @@
+"""
+Encoding on the multi-process embedding server, using the synthetic encoder
+of the benchmark so that the workers do not load a real model:
+
+    python -m pytest tests/test_embedding_server.py
+"""
+
+import os
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking import embedding_server
+from research_assistant.ranking.embedding_server import EmbeddingClient
+from bench_embedding_server import SyntheticEncoder, load_synthetic_encoder
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = EmbeddingClient(num_workers=2, chunk_size=8, loader=load_synthetic_encoder)
+    yield client
+    client.shutdown()
+
+
+@pytest.fixture
+def created_blocks(monkeypatch):
+    names = []
+    SharedMemory = shared_memory.SharedMemory
+
+    class RecordingSharedMemory(SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                names.append(self.name)
+
+    monkeypatch.setattr(embedding_server.shared_memory, "SharedMemory", RecordingSharedMemory)
+    return names
+
+
+@pytest.mark.parametrize("count", [1, 5, 50])
+def test_encoding_matches_the_calling_process(client, created_blocks, count):
+    texts = [f"paper {i} on graph neural networks" for i in range(count)]
+    embeddings = client.encode(texts)
+
+    assert embeddings.dtype == np.float32
+    # Chunks from different workers land in their own rows
+    np.testing.assert_array_equal(embeddings, SyntheticEncoder().encode(texts))
+    assert len(created_blocks) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=created_blocks[0])
+
+
+def test_empty_input_needs_no_shared_memory(client, created_blocks):
+    assert client.encode([]).shape == (0, client.dimension)
+    assert created_blocks == []
@@ -0,0 +1,109 @@
+"""
+Micro-batching of concurrent encode calls by the in-process embedding service:
+
+    python -m pytest tests/test_embedding_service.py
+"""
+
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking.embedding_service import EmbeddingService
+
+DIM = 8
+
+
+class RecordingEncoder:
+    """Deterministic encoder recording the size of every call; the first call waits for a signal."""
+
+    def __init__(self):
+        self.calls = []
+        self.started, self.release = threading.Event(), threading.Event()
+
+    def encode(self, texts):
+        self.calls.append(len(texts))
+        self.started.set()
+        self.release.wait(5)
+        if any(text == "fail" for text in texts):
+            raise RuntimeError("cannot encode")
+        return np.stack([vector(text) for text in texts])
+
+
+def vector(text):
+    return np.random.default_rng(sum(text.encode("utf-8"))).normal(size=DIM).astype(np.float32)
+
+
+@pytest.fixture
+def encoder():
+    return RecordingEncoder()
+
+
+@pytest.fixture
+def service(encoder):
+    service = EmbeddingService(encoder, max_batch_size=16, max_latency_ms=50, fingerprint="recording@test")
+    yield service
+    encoder.release.set()
+    service.shutdown()
+
+
+def test_concurrent_calls_are_coalesced_in_order(service, encoder):
+    # The first call occupies the worker while the others queue up behind it
+    first = service.submit(["warm up"])
+    assert encoder.started.wait(5)
+    requests = [[f"request {i} text {j}" for j in range(1 + i % 3)] for i in range(8)]
+    with ThreadPoolExecutor(len(requests)) as pool:
+        futures = [pool.submit(service.encode, texts) for texts in requests]
+        while service.stats()["queued"] < len(requests):
+            time.sleep(0.01)
+        encoder.release.set()
+        results = [future.result(5) for future in futures]
+
+    assert first.result(5).shape == (1, DIM)
+    for texts, embeddings in zip(requests, results):
+        np.testing.assert_array_equal(embeddings, np.stack([vector(text) for text in texts]))
+    # The 8 queued requests (15 texts) went through at most two model calls
+    assert len(encoder.calls) <= 3
+    assert sum(encoder.calls) == 1 + sum(len(texts) for texts in requests)
+    stats = service.stats()
+    assert stats["requests"] == 9 and stats["texts"] == sum(encoder.calls)
+    assert stats["batches"] == len(encoder.calls)
+
+
+def test_oversized_request_is_encoded_on_its_own(service, encoder):
+    encoder.release.set()
+    texts = [f"text {i}" for i in range(40)]
+    np.testing.assert_array_equal(service.encode(texts), np.stack([vector(text) for text in texts]))
+    assert encoder.calls == [40]
+    assert service.encode([]).shape[0] == 0
+
+
+def test_failures_reach_every_caller_of_the_batch(service, encoder):
+    first = service.submit(["warm up"])
+    assert encoder.started.wait(5)
+    failing, healthy = service.submit(["fail"]), service.submit(["fine"])
+    encoder.release.set()
+
+    first.result(5)
+    with pytest.raises(RuntimeError):
+        failing.result(5)
+    # The request shared the failed batch
+    with pytest.raises(RuntimeError):
+        healthy.result(5)
+    # Later requests are not affected
+    np.testing.assert_array_equal(service.encode(["fine"]), vector("fine")[np.newaxis])
+
+
+def test_shutdown_rejects_new_requests(encoder):
+    encoder.release.set()
+    service = EmbeddingService(encoder, fingerprint="recording@test")
+    service.shutdown()
+    with pytest.raises(RuntimeError):
+        service.encode(["too late"])
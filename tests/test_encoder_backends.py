@@ -0,0 +1,73 @@
+"""
+Agreement of the quantized and ONNX encoder backends with the float PyTorch model.
+
+Each backend must produce embeddings that point the same way as the reference
+model, so that rankings and cached vectors stay interchangeable:
+
+    python -m pytest tests/test_encoder_backends.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+from research_assistant.ranking.model_registry import DEFAULT_MODEL_NAME, _load_sentence_transformer, resolve_model_path
+
+MODEL_PATH = resolve_model_path(DEFAULT_MODEL_NAME)
+
+SENTENCES = [
+    "Attention is all you need. We propose a new network architecture based solely on attention mechanisms.",
+    "Deep residual learning for image recognition",
+    "A survey of graph neural networks for molecular property prediction",
+    "Effects of intermittent fasting on insulin sensitivity in adults: a randomized controlled trial",
+    "BERT: pre-training of deep bidirectional transformers for language understanding",
+    "Climate change impacts on coastal wetlands",
+    "transformer",
+    "Dense passage retrieval for open-domain question answering. Open-domain question answering relies on "
+    "efficient passage retrieval to select candidate contexts, where traditional sparse vector space models "
+    "such as TF-IDF or BM25 are the de facto method.",
+]
+
+# (backend, extra modules it needs, minimum per-sentence cosine agreement)
+BACKENDS = [
+    ("int8", [], 0.97),
+    ("onnx", ["onnxruntime", "optimum"], 0.999),
+    ("onnx-int8", ["onnxruntime", "optimum"], 0.97),
+]
+
+
+def _cosines(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+@pytest.fixture(scope="module")
+def reference_embeddings():
+    if not os.path.isdir(MODEL_PATH):
+        pytest.skip(f"Model not available at {MODEL_PATH}")
+    return _load_sentence_transformer(MODEL_PATH, "torch").encode(SENTENCES)
+
+
+@pytest.mark.parametrize("backend,modules,min_cosine", BACKENDS)
+def test_backend_agrees_with_float_model(reference_embeddings, backend, modules, min_cosine):
+    for module in modules:
+        pytest.importorskip(module)
+    embeddings = _load_sentence_transformer(MODEL_PATH, backend).encode(SENTENCES)
+
+    assert embeddings.shape == reference_embeddings.shape
+    cosines = _cosines(np.asarray(embeddings, dtype=np.float32), reference_embeddings)
+    assert cosines.min() >= min_cosine, f"{backend}: cosines {np.round(cosines, 4)}"
+
+    # Nearest neighbours must be unchanged for the ranking to be unchanged
+    reference_order = np.argsort(-(reference_embeddings @ reference_embeddings.T), axis=1)[:, :3]
+    order = np.argsort(-(embeddings @ embeddings.T), axis=1)[:, :3]
+    assert (order == reference_order).mean() >= 0.9
@@ -0,0 +1,74 @@
+"""
+Cross-source identity resolution of paper records:
+
+    python -m pytest tests/test_identity.py
+"""
+
+import os
+import sys
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.retrieval.identity import IdentityResolver, normalize_title
+
+S2_ATTENTION = {"title": "Attention is All you Need", "url": "https://www.semanticscholar.org/paper/204e",
+                "year": 2017, "venue": "NeurIPS", "authors": "Ashish Vaswani, Noam Shazeer",
+                "citations": 100000, "abstract": "The dominant sequence transduction models are based on...",
+                "paperId": "204e", "externalIds": {"ArXiv": "1706.03762", "DOI": "10.48550/arXiv.1706.03762"}}
+GS_ATTENTION = {"title": "Attention is all you need", "url": "https://arxiv.org/abs/1706.03762", "year": 2017,
+                "venue": "", "authors": "A Vaswani, N Shazeer, N Parmar… - Advances in neural …, 2017 - neurips.cc",
+                "citations": 120000, "abstract": "The dominant sequence..."}
+
+
+def test_normalize_title():
+    assert normalize_title("  Attention Is All You Need!  ") == "attention is all you need"
+    assert normalize_title("Égalité: a Café-based study") == "egalite a cafe based study"
+
+
+def test_merges_records_across_sources():
+    resolver = IdentityResolver(":memory:")
+    # Same paper by arXiv id, and by title for a copy without identifiers
+    copy = {"title": "Attention Is All You Need.", "url": "", "year": 2018, "authors": "A Vaswani"}
+    other = {"title": "Attention is all you need", "year": 2009, "authors": "J Smith"}
+    papers = resolver.resolve([S2_ATTENTION, GS_ATTENTION, copy, other])
+
+    assert len(papers) == 2
+    merged = papers[0]
+    assert merged["canonical_id"] == "s2:204e"
+    assert merged["title"] == "Attention is All you Need"
+    assert merged["citations"] == 120000
+    assert merged["abstract"] == S2_ATTENTION["abstract"]
+    # Same title, but the year and authors show a different paper
+    assert papers[1]["title"] == other["title"] and papers[1]["canonical_id"] != "s2:204e"
+
+
+def test_identity_map_persists_across_queries(tmp_path):
+    path = str(tmp_path / "papers.sqlite")
+    IdentityResolver(path).resolve([GS_ATTENTION])
+    resolver = IdentityResolver(path)
+    # The Google Scholar copy came first; the Semantic Scholar record later takes over its canonical id
+    assert resolver.lookup(GS_ATTENTION) == "arxiv:1706.03762"
+    assert resolver.known_record(GS_ATTENTION) is None
+    resolver.resolve([S2_ATTENTION])
+
+    reopened = IdentityResolver(path)
+    assert reopened.lookup(GS_ATTENTION) == "s2:204e"
+    assert reopened.lookup({"title": "Attention is all you need!", "authors": "N Shazeer"}) == "s2:204e"
+    assert reopened.lookup({"title": "Attention is all you need", "authors": "J Smith"}) is None
+    assert reopened.known_record({"title": "x"}, ["doi:10.48550/arxiv.1706.03762"])["paperId"] == "204e"
+
+
+def test_per_request_fields_are_not_persisted(tmp_path):
+    path = str(tmp_path / "papers.sqlite")
+    scored = dict(S2_ATTENTION, ann_score=0.93, relevance_score=71.5)
+    resolved = IdentityResolver(path).resolve([scored])
+    # The caller still gets them back with this request's results
+    assert resolved[0]["ann_score"] == 0.93
+    assert resolved[0]["canonical_id"] == "s2:204e"
+
+    reopened = IdentityResolver(path)
+    assert reopened.get_record("s2:204e") == S2_ATTENTION
+    assert reopened.known_record(GS_ATTENTION) == S2_ATTENTION
+    # A later request does not inherit the earlier scores
+    assert "ann_score" not in reopened.resolve([GS_ATTENTION])[0]
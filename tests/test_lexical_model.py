@@ -0,0 +1,90 @@
+"""
+Persistence of the corpus lexical model:
+
+    python -m pytest tests/test_lexical_model.py
+"""
+
+import os
+import sys
+import threading
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking import lexical_model
+from research_assistant.ranking.lexical_model import CorpusLexicalModel
+
+
+def documents(count, offset=0):
+    return [f"Graph neural network study {i} on message passing" for i in range(offset, offset + count)]
+
+
+def test_concurrent_saves(tmp_path):
+    path = str(tmp_path / "model.sqlite")
+    model = CorpusLexicalModel(path)
+    model.add_documents(documents(50))
+    errors = []
+
+    def save_repeatedly():
+        try:
+            for _ in range(30):
+                model.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_repeatedly) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    reloaded = CorpusLexicalModel(path)
+    assert reloaded.n_docs == 50
+    assert reloaded.doc_freq == model.doc_freq
+
+
+def test_autosave_runs_off_the_calling_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(lexical_model, "AUTOSAVE_EVERY", 10)
+    model = CorpusLexicalModel(str(tmp_path / "model.sqlite"))
+    started, release = threading.Event(), threading.Event()
+    save = model.save
+    saved_on = []
+
+    def slow_save():
+        saved_on.append(threading.current_thread())
+        started.set()
+        release.wait(5)
+        save()
+
+    monkeypatch.setattr(model, "save", slow_save)
+    # Returns while the save is still blocked
+    assert model.add_documents(documents(10)) == 10
+    assert started.wait(5)
+    assert model.add_documents(documents(10, offset=10)) == 10
+    release.set()
+    model.wait_for_save(5)
+
+    assert len(saved_on) == 1 and saved_on[0] is not threading.current_thread()
+    assert CorpusLexicalModel(str(tmp_path / "model.sqlite")).n_docs >= 10
+
+
+def test_saves_write_only_the_changes(tmp_path):
+    path = str(tmp_path / "model.sqlite")
+    model = CorpusLexicalModel(path)
+    model.add_documents(documents(100))
+    model.save()
+    assert not model.dirty
+
+    model.add_documents(["Transformers for protein folding"] + documents(100))
+    # Only the new document and its terms are pending
+    assert len(model._new_seen) == 1
+    assert model._dirty_terms == set(model.analyze("Transformers for protein folding"))
+    model.save()
+
+    reloaded = CorpusLexicalModel(path)
+    assert (reloaded.n_docs, reloaded.total_terms) == (model.n_docs, model.total_terms)
+    assert reloaded.doc_freq == model.doc_freq
+    # Documents counted before a restart are not counted again
+    assert reloaded.add_documents(documents(101)) == 1
+    assert reloaded.doc_freq["graph"] == 101
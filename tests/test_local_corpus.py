@@ -0,0 +1,87 @@
+"""
+Full-text search over the SQLite/FTS5 local corpus:
+
+    python -m pytest tests/test_local_corpus.py
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.retrieval.local_corpus import LocalCorpus
+
+RECORDS = [
+    {"corpusid": 1, "title": "Attention is All you Need", "year": 2017, "venue": "NeurIPS",
+     "authors": [{"name": "Ashish Vaswani"}], "citationcount": 100000,
+     "abstract": "The dominant sequence transduction models are based on recurrent networks."},
+    {"corpusid": 2, "title": "Deep Residual Learning for Image Recognition", "year": 2016, "venue": "CVPR",
+     "authors": [{"name": "Kaiming He"}], "citationcount": 150000,
+     "abstract": "Deeper neural networks are more difficult to train."},
+]
+
+
+@pytest.fixture(params=[":memory:", "file"])
+def corpus(request, tmp_path):
+    path = ":memory:" if request.param == ":memory:" else str(tmp_path / "papers.sqlite")
+    corpus = LocalCorpus(path)
+    corpus.add_papers(RECORDS)
+    return corpus
+
+
+def test_search_ranks_title_matches(corpus):
+    assert len(corpus) == 2
+    results = corpus.search("residual networks", max_results=2)
+    assert [paper["title"] for paper in results] == [
+        "Deep Residual Learning for Image Recognition", "Attention is All you Need"]
+    assert results[0]["authors"] == "Kaiming He" and results[0]["year"] == 2016
+    assert corpus.search("?!") == []
+
+
+def test_corpus_is_shared_across_threads(corpus):
+    results, errors = {}, []
+
+    def worker():
+        try:
+            corpus.add_papers([{"corpusid": 3, "title": "Graph Attention Networks", "year": 2018}])
+            results["search"] = corpus.search("attention", max_results=5)
+            results["len"] = len(corpus)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert not errors
+    assert results["len"] == 3
+    assert {paper["title"] for paper in results["search"]} == {"Attention is All you Need", "Graph Attention Networks"}
+    # Papers written by the other thread are visible here
+    assert len(corpus) == 3
+
+
+def test_cli_passes_the_corpus_to_the_api_server(tmp_path, monkeypatch):
+    from research_assistant import cli
+
+    path = str(tmp_path / "custom.sqlite")
+    seen = []
+
+    class Process:
+        def wait(self):
+            pass
+
+    def start_api_server(port=5000):
+        seen.append(os.environ.get("RA_CORPUS_DB"))
+        return Process()
+
+    monkeypatch.delenv("RA_CORPUS_DB", raising=False)
+    monkeypatch.setattr(cli, "start_api_server", start_api_server)
+    monkeypatch.setattr(sys, "argv", ["research-assistant", "--api-only", "--corpus-db", path])
+    assert cli.main() == 0
+    # The server process inherits the environment and searches the same corpus
+    assert seen == [path]
+    assert LocalCorpus().path == path
@@ -0,0 +1,201 @@
+"""
+Equivalence of the vectorized ranking with a row-by-row reference implementation:
+full rankings, top_k/offset pages selected with argpartition, the batch path
+and the BM25 scorer.
+
+    python -m pytest tests/test_paper_ranker.py
+"""
+
+import os
+import sys
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking import paper_ranker
+from research_assistant.ranking.lexical_model import CorpusLexicalModel, build_analyzer
+from research_assistant.ranking.paper_ranker import (
+    BM25Scorer, RankingConfig, paper_text, rank_papers_by_relevance, rank_papers_by_relevance_batch,
+)
+
+from conftest import StubEncoder
+
+DIM = 32
+REFERENCE_YEAR = 2025
+
+PAPERS = [
+    {"title": "Graph Attention Networks", "abstract": "Attention over graph neighbourhoods for node classification.",
+     "citations": 12000, "year": 2018},
+    {"title": "Semi-Supervised Classification with Graph Convolutional Networks",
+     "abstract": "A scalable approach to semi-supervised learning on graph-structured data.",
+     "citations": 25000, "year": 2017},
+    {"title": "Attention is All you Need", "abstract": "The Transformer relies entirely on attention.",
+     "citations": 100000, "year": 2017},
+    {"title": "Deep Residual Learning for Image Recognition", "abstract": "Residual networks ease training.",
+     "citations": 150000, "year": 2016},
+    {"title": "Inductive Representation Learning on Large Graphs", "abstract": "GraphSAGE samples neighbours.",
+     "citations": 9000, "year": 2017},
+    {"title": "How Powerful are Graph Neural Networks?", "abstract": "Graph neural networks and the WL test.",
+     "citations": 5000, "year": 2019},
+    {"title": "A Survey on Graph Neural Networks", "abstract": "We review graph neural networks in depth.",
+     "citations": "", "year": 2020},
+    {"title": "Neural Message Passing for Quantum Chemistry", "abstract": "Message passing neural networks.",
+     "citations": 4000, "year": ""},
+    {"title": "BERT: Pre-training of Deep Bidirectional Transformers",
+     "abstract": "Language representation with bidirectional transformers.", "citations": 80000, "year": 2019},
+    {"title": "Relational Inductive Biases and Graph Networks", "abstract": "Graph networks generalize.",
+     "citations": 2500, "year": 2018},
+    {"title": "Heterogeneous Graph Attention Network", "abstract": "Attention on heterogeneous graph neural networks.",
+     "citations": 1500, "year": 2019},
+    {"title": "Simplifying Graph Convolutional Networks", "abstract": "Removing nonlinearities from graph convolutions.",
+     "citations": 3000, "year": 2019},
+]
+QUERY = "graph neural networks attention"
+
+
+@pytest.fixture
+def lexical_model(monkeypatch):
+    # A fresh in-memory model that has seen exactly the test papers
+    model = CorpusLexicalModel()
+    model.add_documents([paper_text(paper) for paper in PAPERS])
+    monkeypatch.setattr(paper_ranker, "get_lexical_model", lambda: model)
+    return model
+
+
+def reference_tfidf(papers, query):
+    # Fitted on the papers being ranked, which are exactly the documents the lexical model has seen
+    texts = [paper_text(paper) for paper in papers]
+    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).fit(texts)
+    return [float(cosine_similarity(vectorizer.transform([query]), vectorizer.transform([text]))[0, 0])
+            for text in texts]
+
+
+def reference_bm25(papers, query, lexical_model, k1=1.5, b=0.75):
+    analyze = build_analyzer()
+    docs = [Counter(analyze(paper_text(paper))) for paper in papers]
+    n_docs, avg_doc_length = lexical_model.n_docs, lexical_model.avg_doc_length
+    scores = []
+    for doc in docs:
+        length = sum(doc.values())
+        score = 0.0
+        for term in analyze(query):
+            if term not in doc:
+                continue
+            df = max(lexical_model.doc_freq[term], sum(term in d for d in docs))
+            idf = math.log1p((n_docs - df + 0.5) / (df + 0.5))
+            tf = doc[term]
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_doc_length))
+        scores.append(score)
+    return scores
+
+
+def reference_ranking(papers, query, encoder, lexical, semantic_weight=0.75):
+    """Score every paper one at a time, as the ranker did before it was vectorized."""
+    query_embedding = encoder.encode([query])[0]
+    ranked = []
+    for i, paper in enumerate(papers):
+        semantic = cosine_similarity([query_embedding], [encoder.encode([paper_text(paper)])[0]])[0, 0]
+        similarity = semantic_weight * semantic + (1 - semantic_weight) * lexical[i]
+        citations = paper['citations'] if paper['citations'] != '' else 0
+        citation = math.log1p(citations / 10)
+        recency = 0.0 if paper['year'] == '' else 1 / (1 + 0.1 * (REFERENCE_YEAR - paper['year']))
+        relevance = (0.6 * similarity + 0.25 * citation + 0.15 * recency) * 100
+        ranked.append((paper['title'], relevance))
+    ranked.sort(key=lambda item: item[1], reverse=True)
+    return ranked
+
+
+def assert_same_ranking(ranked_papers, expected):
+    assert [paper['title'] for paper in ranked_papers] == [title for title, _ in expected]
+    np.testing.assert_allclose([paper['relevance_score'] for paper in ranked_papers],
+                               [score for _, score in expected], rtol=1e-5)
+
+
+@pytest.mark.parametrize("scorer", ["tfidf", "bm25"])
+def test_ranking_matches_row_wise_scoring(lexical_model, scorer):
+    encoder = StubEncoder(DIM)
+    config = RankingConfig(lexical_scorer=scorer, reference_year=REFERENCE_YEAR)
+    if scorer == "tfidf":
+        lexical = reference_tfidf(PAPERS, QUERY)
+    else:
+        bm25 = reference_bm25(PAPERS, QUERY, lexical_model)
+        lexical = [score / max(bm25) for score in bm25]
+    expected = reference_ranking(PAPERS, QUERY, encoder, lexical)
+
+    assert_same_ranking(rank_papers_by_relevance(PAPERS, QUERY, model=encoder, config=config), expected)
+    # Pages selected with argpartition are slices of the full ranking
+    for top_k, offset in ((1, 0), (4, 0), (4, 3), (5, 10), (3, 12)):
+        page = rank_papers_by_relevance(PAPERS, QUERY, model=encoder, config=config, top_k=top_k, offset=offset)
+        assert_same_ranking(page, expected[offset:offset + top_k])
+
+
+@pytest.mark.parametrize("scorer", ["tfidf", "bm25"])
+def test_batch_ranking_matches_single_queries(lexical_model, scorer):
+    encoder = StubEncoder(DIM, seed=1)
+    config = RankingConfig(lexical_scorer=scorer, reference_year=REFERENCE_YEAR)
+    queries = [QUERY, "transformers attention", "residual image recognition"]
+    # Overlapping candidate sets, so papers are shared between the queries
+    papers_per_query = [PAPERS[:8], PAPERS[2:], PAPERS[::2]]
+
+    batch = rank_papers_by_relevance_batch(queries, papers_per_query, model=encoder, config=config)
+    for query, papers, ranked_papers in zip(queries, papers_per_query, batch):
+        single = rank_papers_by_relevance(papers, query, model=encoder, config=config)
+        assert [paper['title'] for paper in ranked_papers] == [paper['title'] for paper in single]
+        np.testing.assert_allclose([paper['relevance_score'] for paper in ranked_papers],
+                                   [paper['relevance_score'] for paper in single], rtol=1e-5)
+
+    top = rank_papers_by_relevance_batch(queries, papers_per_query, model=encoder, config=config, top_k=2)
+    assert [[paper['title'] for paper in ranked] for ranked in top] == \
+        [[paper['title'] for paper in ranked[:2]] for ranked in batch]
+
+
+def test_bm25_scorer_matches_textbook_formula(lexical_model):
+    papers = PAPERS[:6]
+    scorer = BM25Scorer([paper_text(paper) for paper in papers], lexical_model=lexical_model)
+    for query in (QUERY, "graph graph networks", "quantum chemistry"):
+        np.testing.assert_allclose(scorer.score(query), reference_bm25(papers, query, lexical_model), rtol=1e-9)
+    np.testing.assert_allclose(scorer.score_batch([QUERY, "residual"])[1],
+                               reference_bm25(papers, "residual", lexical_model), rtol=1e-9)
+
+
+@pytest.mark.parametrize("scorer", ["tfidf", "bm25"])
+def test_pruned_batch_scores_lexical_similarities_once(lexical_model, monkeypatch, scorer):
+    encoder = StubEncoder(DIM, seed=2)
+    config = RankingConfig(lexical_scorer=scorer, reference_year=REFERENCE_YEAR, prune_depth=4)
+    queries = [QUERY, "transformers attention"]
+    papers_per_query = [PAPERS, PAPERS[2:]]
+    calls = []
+    for name in ("get_lexical_similarities", "get_lexical_similarity_matrix"):
+        def counting(*args, _function=getattr(paper_ranker, name), _name=name, **kwargs):
+            calls.append(_name)
+            return _function(*args, **kwargs)
+        monkeypatch.setattr(paper_ranker, name, counting)
+
+    batch = rank_papers_by_relevance_batch(queries, papers_per_query, model=encoder, config=config)
+    # Pruning scored each query once, and ranking reused those scores
+    assert calls == ["get_lexical_similarities"] * 2
+    for query, papers, ranked_papers in zip(queries, papers_per_query, batch):
+        single = rank_papers_by_relevance(papers, query, model=encoder, config=config)
+        assert [paper['title'] for paper in ranked_papers] == [paper['title'] for paper in single]
+        np.testing.assert_allclose([paper['relevance_score'] for paper in ranked_papers],
+                                   [paper['relevance_score'] for paper in single], rtol=1e-5)
+
+    # Without pruning the queries share one similarity matrix
+    calls.clear()
+    rank_papers_by_relevance_batch(queries, papers_per_query, model=encoder,
+                                   config=RankingConfig(lexical_scorer=scorer))
+    assert calls == ["get_lexical_similarity_matrix"]
+
+
+def test_reweighting_with_defaults_reproduces_the_ranking(lexical_model):
+    scores = paper_ranker.compute_ranking_scores(PAPERS, QUERY, model=StubEncoder(DIM),
+                                                 config=RankingConfig(reference_year=REFERENCE_YEAR))
+    # /rerank falls back to DEFAULT_WEIGHTS, which must stay the search defaults
+    np.testing.assert_array_equal(scores.reweight().relevance, scores.relevance)
@@ -0,0 +1,180 @@
+"""
+Token-bucket rate limiting of upstream APIs, and retries going through it:
+
+    python -m pytest tests/test_rate_limit.py
+"""
+
+import os
+import sys
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.retrieval import http_session, rate_limit
+from research_assistant.retrieval.rate_limit import FileTokenBucket, TokenBucket, parse_limit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    monkeypatch.setattr(rate_limit.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["thread", "file"])
+def make_bucket(request, tmp_path):
+    if request.param == "thread":
+        return lambda rate, capacity: TokenBucket(rate, capacity)
+    if rate_limit.fcntl is None:
+        pytest.skip("File-based rate limiting requires fcntl")
+    return lambda rate, capacity: FileTokenBucket(str(tmp_path / "bucket.json"), rate, capacity)
+
+
+def test_burst_then_steady_rate(clock, make_bucket):
+    bucket = make_bucket(2.0, 3)
+    # A full bucket serves the burst without waiting
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Further requests queue up behind each other at the refill rate
+    assert [bucket.reserve() for _ in range(3)] == [0.5, 1.0, 1.5]
+
+    clock.now += 1.5
+    assert bucket.reserve() == 0.5
+
+
+def test_refill_is_capped_at_capacity(clock, make_bucket):
+    bucket = make_bucket(1.0, 2)
+    bucket.reserve()
+    bucket.reserve()
+    clock.now += 60
+    # A long pause still allows only the burst
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 1.0]
+
+
+def test_acquire_sleeps_for_the_reserved_wait(clock, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limit.time, "sleep", sleeps.append)
+    bucket = TokenBucket(4.0, 1)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.25
+    assert sleeps == [0.25]
+
+
+def test_parse_limit():
+    assert parse_limit("100/300") == (100 / 300, 1.0)
+    assert parse_limit("100/300:5") == (100 / 300, 5.0)
+    assert parse_limit("2") == (2.0, 1.0)
+
+
+@pytest.mark.parametrize("value", ["", "fast", "1/0", "1/x", "0/1", "-1/1", "1/-1", "1/1:0", "1/1:many"])
+def test_parse_limit_rejects_invalid_limits(value):
+    with pytest.raises(ValueError):
+        parse_limit(value)
+
+
+def _reserve_from_file(path, count, results):
+    bucket = FileTokenBucket(path, 1.0, 5)
+    results.put([bucket.reserve() for _ in range(count)])
+
+
+def test_file_bucket_is_shared_between_processes(tmp_path):
+    if rate_limit.fcntl is None:
+        pytest.skip("File-based rate limiting requires fcntl")
+    path = str(tmp_path / "shared.json")
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_reserve_from_file, args=(path, 5, results)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    waits = sorted(results.get(timeout=30) + results.get(timeout=30))
+    for process in processes:
+        process.join(30)
+
+    # Both processes drew from one bucket: a single burst of 5, then one token per second
+    assert waits[:5] == [0.0] * 5
+    assert waits[5:] == pytest.approx([1, 2, 3, 4, 5], abs=0.5)
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self, tokens=1):
+        self.acquired += tokens
+        return 0.0
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    # Statuses answered before the request finally succeeds
+    failures = []
+    requests_seen = 0
+
+    def do_GET(self):
+        type(self).requests_seen += 1
+        status = self.failures.pop(0) if self.failures else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_server(monkeypatch):
+    monkeypatch.setenv("RA_HTTP_RETRIES", "3")
+    monkeypatch.setenv("RA_HTTP_BACKOFF", "0.01")
+    http_session.reset()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FlakyHandler.requests_seen = 0
+    limiter = CountingLimiter()
+    monkeypatch.setattr(http_session, "limiter_for_url", lambda url: limiter)
+    yield f"http://127.0.0.1:{server.server_address[1]}/search", limiter
+    server.shutdown()
+    http_session.reset()
+
+
+def test_every_retry_takes_a_token(flaky_server):
+    url, limiter = flaky_server
+    FlakyHandler.failures = [429, 503, 429]
+    response = http_session.get(url)
+
+    assert response.status_code == 200
+    assert FlakyHandler.requests_seen == 4
+    assert limiter.acquired == 4
+
+
+def test_retries_give_up_with_the_last_response(flaky_server):
+    url, limiter = flaky_server
+    FlakyHandler.failures = [429] * 10
+    response = http_session.get(url)
+
+    assert response.status_code == 429
+    assert FlakyHandler.requests_seen == limiter.acquired == 4
+
+
+def test_retry_after_header():
+    assert http_session.retry_after("2.5") == 2.5
+    assert http_session.retry_after("-1") == 0.0
+    assert http_session.retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert http_session.retry_after("soon") is None
+    assert http_session.retry_after(None) is None
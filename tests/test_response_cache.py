@@ -0,0 +1,185 @@
+"""
+Persistent cache of upstream API responses: cache keys, TTLs,
+stale-while-revalidate and LRU eviction:
+
+    python -m pytest tests/test_response_cache.py
+"""
+
+import os
+import sys
+import json
+import threading
+
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.retrieval import response_cache
+from research_assistant.retrieval.response_cache import ResponseCache, cache_key
+
+SEARCH_URL = "https://api.semanticscholar.org/graph/v1/paper/search"
+SERPAPI_URL = "https://serpapi.com/search"
+TTL, STALE = 100, 1000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def make_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("RA_RESPONSE_TTL_SEMANTIC_SCHOLAR", str(TTL))
+    monkeypatch.setenv("RA_RESPONSE_STALE_SEMANTIC_SCHOLAR", str(STALE))
+    return lambda **kwargs: ResponseCache(path=str(tmp_path / "responses.sqlite"), **kwargs)
+
+
+def body(value, padding=0):
+    return json.dumps({"data": value, "padding": "x" * padding})
+
+
+def test_cache_key_ignores_the_api_key():
+    params = {"engine": "google_scholar", "q": "graph  networks", "num": 3}
+    key = cache_key("GET", SERPAPI_URL, dict(params, api_key="secret"))
+    assert key == cache_key("GET", SERPAPI_URL, dict(params, api_key="another"))
+    assert key == cache_key("GET", SERPAPI_URL + "?api_key=secret", params)
+    # Parameter order, whitespace and the method's case do not matter either
+    assert key == cache_key("get", SERPAPI_URL, {"num": "3", "q": "graph networks", "engine": "google_scholar"})
+    assert key != cache_key("GET", SERPAPI_URL, dict(params, num=5))
+    assert cache_key("POST", SEARCH_URL, json_body={"ids": ["a"]}) != cache_key("POST", SEARCH_URL, json_body={"ids": ["b"]})
+
+
+def test_api_key_is_not_stored(make_cache):
+    cache = make_cache()
+    assert cache.put("GET", SERPAPI_URL, {"q": "graph networks", "api_key": "secret"}, body=body(1))
+    with open(cache.path, "rb") as f:
+        assert b"secret" not in f.read()
+    assert cache.get("GET", SERPAPI_URL, {"q": "graph networks", "api_key": "other"}) == (body(1), "fresh")
+
+
+def test_entries_expire_after_ttl_and_stale_window(clock, make_cache):
+    cache = make_cache()
+    params = {"query": "graph networks"}
+    assert cache.get("GET", SEARCH_URL, params) is None
+    assert cache.put("GET", SEARCH_URL, params, body=body(1))
+
+    clock.now += TTL - 1
+    assert cache.get("GET", SEARCH_URL, params) == (body(1), "fresh")
+    clock.now += 2
+    assert cache.get("GET", SEARCH_URL, params) == (body(1), "stale")
+    clock.now += STALE
+    assert cache.get("GET", SEARCH_URL, params) is None
+
+    counters = cache.stats()["sources"]["SEMANTIC_SCHOLAR"]
+    assert (counters["hits"], counters["stale_hits"], counters["misses"], counters["stores"]) == (1, 1, 2, 1)
+
+
+def test_only_known_sources_and_successful_bodies_are_cached(make_cache):
+    cache = make_cache()
+    assert not cache.caches("GET", "https://example.org/search")
+    assert not cache.put("GET", "https://example.org/search", body=body(1))
+    # SerpAPI reports errors with status 200
+    assert not cache.put("GET", SERPAPI_URL, {"q": "x"}, body=json.dumps({"error": "Invalid API key."}))
+    assert not cache.put("GET", SERPAPI_URL, {"q": "x"}, body="<html>")
+    assert cache.stats()["entries"] == 0
+
+
+def test_stale_entry_is_served_while_it_is_revalidated(clock, make_cache):
+    cache = make_cache()
+    params = {"query": "graph networks"}
+    cache.put("GET", SEARCH_URL, params, body=body(1))
+    clock.now += TTL + 1
+
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return body(2)
+
+    # The stale copy is returned without waiting for the refresh
+    assert cache.get("GET", SEARCH_URL, params, refresh=refresh) == (body(1), "stale")
+    assert started.wait(5)
+    # A refresh already in flight is not started again
+    assert cache.get("GET", SEARCH_URL, params, refresh=refresh) == (body(1), "stale")
+    release.set()
+    cache._refresh_executor.shutdown(wait=True)
+
+    assert len(calls) == 1
+    assert cache.get("GET", SEARCH_URL, params) == (body(2), "fresh")
+    assert cache.stats()["sources"]["SEMANTIC_SCHOLAR"]["refreshes"] == 1
+
+
+def test_failed_revalidation_keeps_the_stale_entry(clock, make_cache):
+    cache = make_cache()
+    params = {"query": "graph networks"}
+    cache.put("GET", SEARCH_URL, params, body=body(1))
+    clock.now += TTL + 1
+
+    assert cache.get("GET", SEARCH_URL, params, refresh=lambda: None) == (body(1), "stale")
+    cache._refresh_executor.shutdown(wait=True)
+
+    assert cache.get("GET", SEARCH_URL, params) == (body(1), "stale")
+    assert cache.stats()["sources"]["SEMANTIC_SCHOLAR"]["refresh_failures"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(clock, make_cache):
+    entry_size = len(body(0, padding=200))
+    cache = make_cache(max_bytes=entry_size * 5)
+    for i in range(5):
+        clock.now += 1
+        cache.put("GET", SEARCH_URL, {"query": f"query {i}"}, body=body(i, padding=200))
+    # Reading the oldest entry makes it the most recently used
+    clock.now += 1
+    assert cache.get("GET", SEARCH_URL, {"query": "query 0"}) is not None
+
+    clock.now += 1
+    cache.put("GET", SEARCH_URL, {"query": "query 5"}, body=body(5, padding=200))
+
+    stats = cache.stats()
+    assert stats["bytes"] <= stats["max_bytes"] * 0.9
+    kept = [i for i in range(6) if cache.get("GET", SEARCH_URL, {"query": f"query {i}"}) is not None]
+    assert kept == [0, 3, 4, 5]
+    assert stats["sources"]["SEMANTIC_SCHOLAR"]["evictions"] == 2
+
+
+def test_cache_survives_reopening(make_cache):
+    cache = make_cache()
+    cache.put("GET", SEARCH_URL, {"query": "graph networks"}, body=body(1))
+
+    reopened = make_cache()
+    assert reopened.get("GET", SEARCH_URL, {"query": "graph networks"}) == (body(1), "fresh")
+    assert reopened.stats()["bytes"] == len(body(1))
+
+
+def test_in_memory_cache_is_shared_between_threads(clock, monkeypatch):
+    monkeypatch.setenv("RA_RESPONSE_TTL_SEMANTIC_SCHOLAR", str(TTL))
+    cache = ResponseCache(path=":memory:")
+    params = {"query": "graph networks"}
+    cache.put("GET", SEARCH_URL, params, body=body(1))
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(cache.get("GET", SEARCH_URL, params)))
+    thread.start()
+    thread.join()
+    assert results == [(body(1), "fresh")]
+
+    # Revalidation runs on the cache's own worker threads
+    clock.now += TTL + 1
+    assert cache.get("GET", SEARCH_URL, params, refresh=lambda: body(2)) == (body(1), "stale")
+    cache._refresh_executor.shutdown(wait=True)
+    assert cache.get("GET", SEARCH_URL, params) == (body(2), "fresh")
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,250 @@
+"""
+Search API endpoints with retrieval stubbed out:
+
+    python -m pytest tests/test_search_api.py
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from conftest import make_papers
+from research_assistant.retrieval import identity
+
+QUERIES = ["graph networks", "message passing", "node classification"]
+
+
+def test_batch_ranks_every_query(api, monkeypatch):
+    client, app_module = api
+    calls = []
+
+    async def search_many(queries, max_results=3):
+        calls.append((list(queries), max_results))
+        return [make_papers(4 + i, prefix=f"Q{i}") for i in range(len(queries))]
+
+    monkeypatch.setattr(app_module, "search_papers_many_async", search_many)
+    response = client.post('/api/search/batch', json={'queries': QUERIES, 'max_results': 5, 'page_size': 3})
+
+    assert response.status_code == 200
+    batches = response.get_json()["batches"]
+    # All live searches go out together
+    assert calls == [(QUERIES, 5)]
+    assert [batch["query"] for batch in batches] == QUERIES
+    assert [batch["total"] for batch in batches] == [4, 5, 6]
+    for i, batch in enumerate(batches):
+        assert len(batch["results"]) == 3 and batch["next_cursor"]
+        assert all(paper["title"].startswith(f"Q{i} ") for paper in batch["results"])
+        scores = [paper["score"] for paper in batch["results"]]
+        assert scores == sorted(scores, reverse=True)
+
+    # Every query gets its own session to page through
+    page = client.post('/api/search', json={'cursor': batches[1]["next_cursor"], 'page_size': 3}).get_json()
+    assert page["session_id"] == batches[1]["session_id"]
+    assert len(page["results"]) == 2 and page["next_cursor"] is None
+
+
+def test_batch_prunes_only_when_asked(api, monkeypatch):
+    client, app_module = api
+    from research_assistant.ranking import paper_ranker
+    pruned = []
+    prune_candidates = paper_ranker.prune_candidates
+
+    def counting_prune(papers, query, config=None, lexical_model=None):
+        pruned.append(query)
+        return prune_candidates(papers, query, config, lexical_model)
+
+    async def search_many(queries, max_results=3):
+        return [make_papers(6, prefix=f"Q{i}") for i in range(len(queries))]
+
+    monkeypatch.setattr(app_module, "search_papers_many_async", search_many)
+    monkeypatch.setattr(paper_ranker, "prune_candidates", counting_prune)
+
+    batches = client.post('/api/search/batch', json={'queries': QUERIES}).get_json()["batches"]
+    assert [batch["total"] for batch in batches] == [6, 6, 6]
+    assert pruned == []
+
+    batches = client.post('/api/search/batch', json={'queries': QUERIES, 'prune_depth': 2}).get_json()["batches"]
+    assert [batch["total"] for batch in batches] == [2, 2, 2]
+    assert pruned == QUERIES
+
+
+def test_failed_query_gets_an_empty_result(api, monkeypatch):
+    client, app_module = api
+    from research_assistant.retrieval import lit_review_engine
+
+    async def search(query, max_results=3, backend=None, timeout=None):
+        if query == "message passing":
+            raise RuntimeError("upstream unavailable")
+        return make_papers(4)
+
+    monkeypatch.setattr(lit_review_engine, "search_papers_async", search)
+    response = client.post('/api/search/batch', json={'queries': QUERIES})
+
+    assert response.status_code == 200
+    batches = response.get_json()["batches"]
+    assert [batch["total"] for batch in batches] == [4, 0, 4]
+    assert batches[1] == {"query": "message passing", "results": [], "session_id": None,
+                          "next_cursor": None, "total": 0}
+
+
+def test_batch_rejects_invalid_requests(api, monkeypatch):
+    client, app_module = api
+    monkeypatch.setattr(app_module, "MAX_BATCH_QUERIES", 2)
+
+    def status(body):
+        return client.post('/api/search/batch', json=body).status_code
+
+    response = client.post('/api/search/batch', json={'queries': QUERIES})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "At most 2 queries per batch"
+    assert status({'queries': []}) == 400
+    assert status({'queries': ["graph", " "]}) == 400
+    assert status({'queries': "graph"}) == 400
+    assert status({'queries': ["graph"], 'source': 'elsewhere'}) == 400
+    assert status({'queries': ["graph"], 'page_size': True}) == 400
+    assert status({'queries': ["graph"], 'max_results': 10 ** 6}) == 400
+
+
+def test_search_rejects_booleans_as_integers(api, monkeypatch):
+    client, app_module = api
+    monkeypatch.setattr(app_module, "_retrieve_candidates", lambda query, source, max_results: make_papers(6))
+
+    def search(**fields):
+        return client.post('/api/search', json={'query': 'graph networks', **fields})
+
+    for field in ('page_size', 'max_results', 'prune_depth'):
+        for value in (True, False, "3", 2.5, -1):
+            response = search(**{field: value})
+            assert response.status_code == 400, (field, value)
+            assert field in response.get_json()["error"]
+    # prune_depth 0 disables pruning; 2 keeps the two lexically best papers
+    assert search(prune_depth=0).get_json()["total"] == 6
+    assert search(prune_depth=2).get_json()["total"] == 2
+
+
+def test_relevance_weights_are_normalized(api, monkeypatch):
+    client, app_module = api
+    monkeypatch.setattr(app_module, "_retrieve_candidates", lambda query, source, max_results: make_papers(6))
+
+    def scores(weights):
+        results = client.post('/api/search', json={'query': 'graph networks', 'weights': weights}).get_json()["results"]
+        return [(paper["title"], paper["score"]) for paper in results]
+
+    assert scores({'similarity': 5, 'citation': 5, 'recency': 5}) == scores({'similarity': 1, 'citation': 1, 'recency': 1})
+
+    session_id = client.post('/api/search', json={'query': 'graph networks'}).get_json()["session_id"]
+    reranked = client.post('/api/search/rerank', json={'session_id': session_id, 'weights': {'citation': 40}})
+    assert reranked.status_code == 200
+    assert scores({'citation': 40}) == [(paper["title"], paper["score"]) for paper in reranked.get_json()["results"]]
+
+
+def test_cache_stats_report_the_response_cache(api, monkeypatch):
+    client, app_module = api
+    from research_assistant.retrieval import response_cache
+    # A fresh process-wide cache under the test's cache directory
+    monkeypatch.setattr(response_cache, "_cache", None)
+
+    stats = client.get('/api/search/cache-stats').get_json()
+    assert "query_cache" in stats
+    assert stats["response_cache"]["entries"] == 0
+
+    monkeypatch.setenv("RA_RESPONSE_CACHE", "0")
+    assert client.get('/api/search/cache-stats').get_json()["response_cache"] is None
+
+
+def stream(client, **payload):
+    response = client.post('/api/search/stream', json=payload)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_sends_papers_and_rankings_before_the_final_page(api, monkeypatch):
+    client, app_module = api
+    papers = make_papers(6)
+    calls = []
+
+    def search_papers_stream(query, max_results=3):
+        calls.append((query, max_results))
+        yield "semantic_scholar", papers[:3]
+        yield "google_scholar", papers[3:4]
+        # A Google Scholar hit that found nothing new
+        yield "google_scholar", []
+        yield "google_scholar", papers[4:]
+        yield "done", papers
+
+    monkeypatch.setattr(app_module, "search_papers_stream", search_papers_stream)
+    monkeypatch.setattr(app_module, "STREAM_RANKING_INTERVAL", 0)
+    monkeypatch.setattr(identity, "_resolver", identity.IdentityResolver(":memory:"))
+
+    events = stream(client, query='graph networks', max_results=4, page_size=4)
+
+    assert calls == [('graph networks', 4)]
+    assert [event["event"] for event in events] == ["papers", "ranking", "papers", "ranking", "papers", "ranking", "done"]
+    assert [event["source"] for event in events if event["event"] == "papers"] == \
+        ["semantic_scholar", "google_scholar", "google_scholar"]
+    assert [event["total"] for event in events if event["event"] == "ranking"] == [3, 4, 6]
+
+    done = events[-1]
+    assert done["total"] == 6 and len(done["results"]) == 4
+    # The final ranking is a session that /api/search pages through
+    rest = client.post('/api/search', json={'cursor': done["next_cursor"], 'page_size': 4}).get_json()
+    assert rest["session_id"] == done["session_id"]
+    assert rest["next_cursor"] is None
+    assert sorted(paper["title"] for paper in done["results"] + rest["results"]) == \
+        sorted(paper["title"] for paper in papers)
+
+
+def test_stream_reports_failures_as_events(api, monkeypatch):
+    client, app_module = api
+
+    def nothing_found(query, max_results=3):
+        yield "done", []
+
+    def failing(query, max_results=3):
+        yield "semantic_scholar", make_papers(2)
+        raise RuntimeError("upstream unavailable")
+
+    monkeypatch.setattr(app_module, "search_papers_stream", nothing_found)
+    assert stream(client, query='graph networks') == [
+        {"event": "done", "results": [], "session_id": None, "next_cursor": None, "total": 0}]
+
+    monkeypatch.setattr(app_module, "search_papers_stream", failing)
+    events = stream(client, query='graph networks')
+    assert [event["event"] for event in events][-1] == "error"
+    assert events[0]["event"] == "papers"
+    assert "upstream unavailable" in events[-1]["error"]
+
+
+def test_stream_rejects_invalid_requests(api):
+    client, _ = api
+    for payload in ({'query': ''}, {'query': 'graph networks', 'source': 'web'},
+                    {'query': 'graph networks', 'max_results': 0}, {'query': 'graph networks', 'page_size': 'ten'}):
+        response = client.post('/api/search/stream', json=payload)
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+
+def test_index_source_answers_from_the_paper_index(api, monkeypatch):
+    client, app_module = api
+    indexed = [dict(paper, ann_score=0.9) for paper in make_papers(4, prefix="Indexed")]
+    monkeypatch.setattr(app_module, "search_local_papers", lambda query, k=10: indexed[:k])
+    monkeypatch.setattr(app_module, "search_papers", lambda query, max_results=3: pytest.fail("went live"))
+    monkeypatch.setattr(identity, "_resolver", identity.IdentityResolver(":memory:"))
+
+    response = client.post('/api/search', json={'query': 'graph networks', 'source': 'index'})
+    assert response.status_code == 200
+    assert sorted(paper["title"] for paper in response.get_json()["results"]) == \
+        sorted(paper["title"] for paper in indexed)
+
+    events = stream(client, query='graph networks', source='index')
+    assert events[0]["event"] == "papers" and events[0]["source"] == "index"
+    assert events[-1]["total"] == 4
+
+    # "local" names the FTS5 corpus backend (RA_RETRIEVAL_BACKEND), not a source
+    assert client.post('/api/search', json={'query': 'graph networks', 'source': 'local'}).status_code == 400
@@ -0,0 +1,189 @@
+"""
+Batch-lookup enrichment of Google Scholar results against a local stand-in
+for the Semantic Scholar Graph API:
+
+    python -m pytest tests/test_semantic_scholar_batch.py
+"""
+
+import os
+import sys
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+# SearchGoogleScholar reads the key at import time
+os.environ.setdefault("SERPAPI_KEY", '="test"')
+
+from research_assistant.retrieval import identity
+from research_assistant.retrieval.SearchGoogleScholar import enrich_gs_results_parallel, extract_paper_id
+from research_assistant.retrieval.SearchSemanticScholar import get_semantic_scholar_papers
+
+PAPERS = {
+    "ARXIV:1706.03762": {"title": "Attention is All you Need", "year": 2017, "venue": "NeurIPS",
+                         "authors": [{"name": "Ashish Vaswani"}], "url": "https://s2/1",
+                         "abstract": "The dominant sequence transduction models...", "citationCount": 100000},
+    "DOI:10.1145/2939672.2939785": {"title": "XGBoost: A Scalable Tree Boosting System", "year": 2016,
+                                    "venue": "KDD", "authors": [{"name": "Tianqi Chen"}], "url": "https://s2/2",
+                                    "abstract": "Tree boosting is a highly effective...", "citationCount": 30000},
+}
+SEARCH_RESULT = {"title": "Deep Residual Learning for Image Recognition", "year": 2016, "venue": "CVPR",
+                 "authors": [{"name": "Kaiming He"}], "url": "https://s2/3", "abstract": "Deeper neural networks...",
+                 "citationCount": 150000}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        ids = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["ids"]
+        self.requests_seen.append(("POST", url.path, ids))
+        assert "citationCount" in parse_qs(url.query)["fields"][0]
+        self._send([PAPERS.get(paper_id) for paper_id in ids])
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)["query"][0]
+        self.requests_seen.append(("GET", url.path, query))
+        self._send({"data": [SEARCH_RESULT] if query == SEARCH_RESULT["title"] else []})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    StandInHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("RA_SEMANTIC_SCHOLAR_URL", f"http://127.0.0.1:{server.server_port}/graph/v1")
+    # Papers resolved in earlier runs would otherwise not be looked up again
+    monkeypatch.setattr(identity, "_resolver", identity.IdentityResolver(":memory:"))
+    yield StandInHandler.requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+def test_extract_paper_id():
+    assert extract_paper_id({"link": "https://arxiv.org/abs/1706.03762v7"}) == "ARXIV:1706.03762"
+    assert extract_paper_id({"link": "https://dl.acm.org/doi/abs/10.1145/2939672.2939785"}) == "DOI:10.1145/2939672.2939785"
+    assert extract_paper_id({"link": "https://example.org/paper",
+                             "resources": [{"link": "https://arxiv.org/pdf/2005.14165.pdf"}]}) == "ARXIV:2005.14165"
+    assert extract_paper_id({"link": "https://aclanthology.org/N19-1423/"}) == "URL:https://aclanthology.org/N19-1423/"
+    assert extract_paper_id({"link": "https://ieeexplore.ieee.org/document/7780459"}) is None
+
+
+def test_batch_lookup_returns_none_for_unknown_ids(stand_in):
+    papers = get_semantic_scholar_papers(["ARXIV:1706.03762", "DOI:10.9999/missing"])
+    assert papers[0]["title"] == "Attention is All you Need"
+    assert papers[0]["authors"] == "Ashish Vaswani"
+    assert papers[1] is None
+    assert len(stand_in) == 1
+
+
+def test_enrichment_uses_one_batch_request(stand_in):
+    gs_results = [
+        {"title": "Attention is all you need", "link": "https://arxiv.org/abs/1706.03762"},
+        {"title": "Xgboost: A scalable tree boosting system", "link": "https://dl.acm.org/doi/10.1145/2939672.2939785"},
+        {"title": "Deep Residual Learning for Image Recognition", "link": "https://ieeexplore.ieee.org/document/7780459"},
+        {"title": "Unknown preprint", "link": "https://arxiv.org/abs/2101.00001", "snippet": "snippet",
+         "publication_info": {"summary": "A Author - arXiv, 2021"}},
+        {"title": "Already found", "link": "https://arxiv.org/abs/1512.03385"},
+    ]
+    sem_results = [{"title": "Already found"}]
+
+    enriched = enrich_gs_results_parallel(gs_results, sem_results)
+
+    assert [paper["title"] for paper in enriched] == [
+        "Attention is All you Need",
+        "XGBoost: A Scalable Tree Boosting System",
+        "Deep Residual Learning for Image Recognition",
+        "Unknown preprint",
+    ]
+    assert enriched[1]["citations"] == 30000
+    # Not known to Semantic Scholar: keeps the Google Scholar data
+    assert enriched[3]["abstract"] == "snippet"
+    assert enriched[3]["authors"] == "A Author - arXiv, 2021"
+
+    batches = [r for r in stand_in if r[0] == "POST"]
+    searches = [r for r in stand_in if r[0] == "GET"]
+    assert len(batches) == 1
+    assert batches[0][1] == "/graph/v1/paper/batch"
+    assert batches[0][2] == ["ARXIV:1706.03762", "DOI:10.1145/2939672.2939785", "ARXIV:2101.00001"]
+    # Title searches only for the result without an identifier and the unknown preprint
+    assert sorted(r[2] for r in searches) == ["Deep Residual Learning for Image Recognition", "Unknown preprint"]
+
+
+def test_batch_hit_for_another_paper_is_not_accepted(stand_in):
+    # The resource link carries the arXiv id of a different (e.g. citing) paper
+    gs_results = [{"title": "Deep Residual Learning for Image Recognition",
+                   "link": "https://ieeexplore.ieee.org/document/7780459",
+                   "resources": [{"link": "https://arxiv.org/pdf/1706.03762.pdf"}]}]
+
+    enriched = enrich_gs_results_parallel(gs_results, [])
+
+    assert [paper["title"] for paper in enriched] == ["Deep Residual Learning for Image Recognition"]
+    assert enriched[0]["citations"] == 150000
+    # The mismatched batch hit fell back to the title search
+    assert [r[0] for r in stand_in] == ["POST", "GET"]
+
+    pytest.importorskip("aiohttp")
+    from research_assistant.retrieval.async_search import client_scope, enrich_gs_results_async
+
+    async def enrich_async():
+        async with client_scope():
+            return await enrich_gs_results_async(gs_results, [])
+
+    assert [paper["citations"] for paper in asyncio.run(enrich_async())] == [150000]
+
+
+def test_async_search_keeps_sqlite_off_the_event_loop(stand_in, monkeypatch, tmp_path):
+    pytest.importorskip("aiohttp")
+    from research_assistant.retrieval import async_search, response_cache
+
+    # Cache the stand-in's answers as if it were Semantic Scholar
+    monkeypatch.setenv("RA_RESPONSE_CACHE_DB", str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(response_cache, "source_for_url", lambda url: "SEMANTIC_SCHOLAR")
+    response_cache.reset()
+    gs_results = [{"title": "Attention is all you need", "link": "https://arxiv.org/abs/1706.03762"}]
+
+    async def fetch_gs(query, max_results=3):
+        return gs_results
+
+    monkeypatch.setattr(async_search, "fetch_googlescholar_raw_async", fetch_gs)
+
+    calls = []
+    for cls, name in ((response_cache.ResponseCache, "get"), (response_cache.ResponseCache, "put"),
+                      (identity.IdentityResolver, "known_record"), (identity.IdentityResolver, "resolve")):
+        def recording(self, *args, _method=getattr(cls, name), _name=name, **kwargs):
+            calls.append((_name, threading.current_thread()))
+            return _method(self, *args, **kwargs)
+        monkeypatch.setattr(cls, name, recording)
+
+    try:
+        # The second search is answered from the cache
+        for _ in range(2):
+            papers = asyncio.run(async_search.search_live_async(SEARCH_RESULT["title"]))
+            assert [paper["title"] for paper in papers] == [SEARCH_RESULT["title"], "Attention is All you Need"]
+    finally:
+        response_cache.reset()
+
+    assert {name for name, _ in calls} == {"get", "put", "known_record", "resolve"}
+    # asyncio.run drives the event loop on this thread
+    assert all(thread is not threading.current_thread() for _, thread in calls)
@@ -0,0 +1,155 @@
+"""
+Ranking sessions and the cursors used to page through them:
+
+    python -m pytest tests/test_sessions.py
+"""
+
+import os
+import sys
+import base64
+
+import numpy as np
+import pytest
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking import sessions
+from research_assistant.ranking.paper_ranker import RankingScores
+from research_assistant.ranking.sessions import (
+    DEFAULT_MAX_SESSIONS, DEFAULT_TTL_SECONDS, InvalidCursorError, RankingSessionStore, decode_cursor,
+    encode_cursor,
+)
+
+from conftest import make_papers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sessions.time, "monotonic", clock)
+    return clock
+
+
+def ranked_session(store, count=10):
+    papers = make_papers(count)
+    relevance = np.array([float((7 * i) % count) for i in range(count)])
+    scores = RankingScores(np.zeros(count), np.zeros(count), np.zeros(count), relevance)
+    return store.create("graph networks", papers, scores), relevance
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("abc123", 20)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("abc123", 20)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    "e30",  # {}
+    base64.urlsafe_b64encode(b'{"s": "abc", "o": "x"}').decode(),
+    base64.urlsafe_b64encode(b'["abc", 3]').decode(),
+    encode_cursor("abc", -5),
+    "é",
+    42,
+])
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_page_boundaries():
+    store = RankingSessionStore()
+    session, relevance = ranked_session(store)
+    order = list(np.argsort(-relevance, kind="stable"))
+
+    page, cursor = session.page(0, 4)
+    assert [p["title"] for p in page] == [session.papers[i]["title"] for i in order[:4]]
+    assert decode_cursor(cursor) == (session.session_id, 4)
+
+    page, cursor = session.page(4, 4)
+    assert [p["title"] for p in page] == [session.papers[i]["title"] for i in order[4:8]]
+    # The last page is short and has no next cursor
+    page, cursor = session.page(8, 4)
+    assert len(page) == 2 and cursor is None
+    # A page ending exactly at the last paper has no next cursor either
+    assert session.page(6, 4)[1] is None
+    assert session.page(10, 4) == ([], None)
+    assert session.page(25, 4) == ([], None)
+    # Without a limit, everything from the offset on
+    page, cursor = session.page(3)
+    assert len(page) == 7 and cursor is None
+    assert page[0]["relevance_score"] == relevance[order[3]]
+
+
+def test_sessions_expire(clock):
+    store = RankingSessionStore()
+    session, _ = ranked_session(store)
+    cursor = session.page(0, 4)[1]
+
+    clock.now += DEFAULT_TTL_SECONDS - 1
+    assert store.resolve(cursor) == (session, 4)
+    # Every access extends the lifetime
+    clock.now += DEFAULT_TTL_SECONDS - 1
+    assert store.get(session.session_id) is session
+    clock.now += DEFAULT_TTL_SECONDS + 1
+    with pytest.raises(InvalidCursorError):
+        store.resolve(cursor)
+    # Expired sessions are dropped
+    assert session.session_id not in store._sessions
+
+
+def test_least_recently_used_sessions_are_evicted():
+    store = RankingSessionStore()
+    first, _ = ranked_session(store)
+    second, _ = ranked_session(store)
+    for _ in range(DEFAULT_MAX_SESSIONS - 2):
+        ranked_session(store)
+    # Touching the first session makes the second one the least recently used
+    store.get(first.session_id)
+    ranked_session(store)
+
+    assert len(store._sessions) == DEFAULT_MAX_SESSIONS
+    assert store.get(first.session_id) is first
+    with pytest.raises(InvalidCursorError):
+        store.get(second.session_id)
+
+
+def test_search_pages_through_a_session(api, monkeypatch):
+    client, app_module = api
+    papers = make_papers(12)
+    calls = []
+
+    def retrieve(query, source, max_results):
+        calls.append(query)
+        return list(papers)
+
+    monkeypatch.setattr(app_module, "_retrieve_candidates", retrieve)
+    first = client.post('/api/search', json={'query': 'graph networks', 'page_size': 5}).get_json()
+    assert first['total'] == 12 and len(first['results']) == 5
+
+    seen = [paper['title'] for paper in first['results']]
+    cursor = first['next_cursor']
+    while cursor:
+        response = client.post('/api/search', json={'cursor': cursor, 'page_size': 5}).get_json()
+        assert response['session_id'] == first['session_id']
+        seen += [paper['title'] for paper in response['results']]
+        cursor = response['next_cursor']
+
+    # Later pages come from the session; retrieval ran once
+    assert calls == ['graph networks']
+    assert sorted(seen) == sorted(paper['title'] for paper in papers)
+    scores = [paper['score'] for paper in
+              client.post('/api/search', json={'query': 'graph networks'}).get_json()['results']]
+    assert scores == sorted(scores, reverse=True)
+
+    assert client.post('/api/search', json={'cursor': 'garbage'}).status_code == 400
+    assert client.post('/api/search', json={'cursor': first['next_cursor'], 'page_size': True}).status_code == 400
@@ -0,0 +1,64 @@
+"""
+The trigram title index must flag exactly the titles the pairwise
+SequenceMatcher scan flags:
+
+    python -m pytest tests/test_title_dedup.py
+"""
+
+import os
+import sys
+import random
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.utils.utils import TitleIndex, is_duplicate, similar
+
+WORDS = ("deep learning graph neural network attention transformer retrieval ranking "
+         "language model survey efficient scalable robust sparse embedding a of for the on").split()
+
+
+def perturb(title, rng):
+    """Apply a few character edits, case changes and whitespace changes."""
+    chars = list(title)
+    for _ in range(rng.randint(0, 6)):
+        op = rng.random()
+        position = rng.randrange(len(chars) + 1)
+        if op < 0.3 and chars:
+            del chars[min(position, len(chars) - 1)]
+        elif op < 0.6:
+            chars.insert(position, rng.choice("abcdefgh -:"))
+        elif chars:
+            chars[min(position, len(chars) - 1)] = rng.choice("xyz ")
+    text = "".join(chars)
+    return text.upper() if rng.random() < 0.1 else text
+
+
+def random_titles(n, rng):
+    titles = []
+    for _ in range(n):
+        if titles and rng.random() < 0.5:
+            titles.append(perturb(rng.choice(titles), rng))
+        else:
+            titles.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))))
+    return titles
+
+
+def test_matches_pairwise_scan():
+    rng = random.Random(7)
+    for threshold in (0.9, 0.8):
+        indexed = random_titles(150, rng) + ["", "a", "ab", "abc"]
+        queries = [perturb(title, rng) for title in rng.sample(indexed, 100)] + random_titles(100, rng)
+        queries += ["", "a", "b", "abd", "ABC"]
+        index = TitleIndex(indexed, threshold=threshold)
+        for query in queries:
+            expected = [i for i, title in enumerate(indexed) if similar(query, title) >= threshold]
+            assert index.find_similar(query) == expected, query
+            assert index.contains_similar(query) == bool(expected)
+
+
+def test_is_duplicate_accepts_index():
+    sem_results = [{"title": "Attention Is All You Need"}, {"title": "BERT: Pre-training of Deep Bidirectional Transformers"}]
+    index = TitleIndex(paper["title"] for paper in sem_results)
+    for title in ("Attention is all you need.", "Attention Is All You Want", "Deep Residual Learning"):
+        assert is_duplicate(title, index) == is_duplicate(title, sem_results)
@@ -0,0 +1,98 @@
+"""
+Recall of the local paper index against an exact scan, with the quantizer
+trained in the background while papers keep arriving:
+
+    python -m pytest tests/test_vector_index.py
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+
+# Add src to the path so the package imports without being installed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from research_assistant.ranking import vector_index
+from research_assistant.ranking.vector_index import PaperIndex, recall_at_k
+
+DIM = 64
+
+
+def synthetic_embeddings(count, clusters=40, noise=0.6, seed=0):
+    """Generate clustered vectors resembling topic-grouped paper embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIM))
+    return (centers[rng.integers(0, clusters, count)] + noise * rng.normal(size=(count, DIM))).astype(np.float32)
+
+
+def build_index(vectors, batch=250, **kwargs):
+    index = PaperIndex(min_train_size=1000, **kwargs)
+    for offset in range(0, len(vectors), batch):
+        ids = range(offset, min(offset + batch, len(vectors)))
+        index.add([f"paper-{i}" for i in ids], vectors[offset:offset + batch],
+                  [{"title": f"Paper {i}"} for i in ids])
+    index.wait_for_training()
+    return index
+
+
+def query_vectors(vectors, count=100, seed=1):
+    rng = np.random.default_rng(seed)
+    return vectors[rng.choice(len(vectors), count, replace=False)] + 0.3 * rng.normal(size=(count, DIM))
+
+
+def test_recall_at_k():
+    vectors = synthetic_embeddings(6000)
+    index = build_index(vectors)
+    queries = query_vectors(vectors)
+
+    assert index.is_trained
+    # Every paper sits in exactly one cell, including those added during training
+    ids = sorted(i for cell in index._lists for i in cell)
+    assert ids == list(range(len(vectors)))
+
+    assert recall_at_k(index, queries, k=10)['recall_at_k'] >= 0.9
+    # Scanning every cell is an exact search
+    assert recall_at_k(index, queries, k=10, nprobe=len(index._lists))['recall_at_k'] == 1.0
+
+
+def test_recall_survives_save_and_load(tmp_path):
+    vectors = synthetic_embeddings(3000, seed=2)
+    index = build_index(vectors, background_training=False)
+    queries = query_vectors(vectors, seed=3)
+    index.save(str(tmp_path))
+    assert not index.dirty
+
+    loaded = PaperIndex.load(str(tmp_path))
+    assert len(loaded) == len(index)
+    assert recall_at_k(loaded, queries, k=10)['recall_at_k'] == recall_at_k(index, queries, k=10)['recall_at_k']
+    ids, _ = loaded.search(vectors[17], k=1)
+    assert loaded._papers[ids[0]]["title"] == "Paper 17"
+
+
+def test_search_is_not_blocked_by_training(monkeypatch):
+    vectors = synthetic_embeddings(1200, seed=4)
+    index = PaperIndex(min_train_size=1000)
+    started, release = threading.Event(), threading.Event()
+    kmeans = vector_index._spherical_kmeans
+
+    def slow_kmeans(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return kmeans(*args, **kwargs)
+
+    monkeypatch.setattr(vector_index, "_spherical_kmeans", slow_kmeans)
+    index.add([f"paper-{i}" for i in range(1200)], vectors, [{"title": f"Paper {i}"} for i in range(1200)])
+    assert started.wait(5)
+
+    # Training is stuck in k-means; searches and inserts still go through
+    ids, _ = index.search(vectors[3], k=1)
+    assert ids[0] == 3
+    assert index.add(["late"], vectors[:1] + 1, [{"title": "Late paper"}]) == 1
+    assert not index.is_trained
+
+    release.set()
+    index.wait_for_training()
+    assert index.is_trained
+    assert sum(len(cell) for cell in index._lists) == 1201